@@ -0,0 +1,272 @@
+import os
+import json
+import math
+import time
+import random
+import argparse
+import threading
+import config
+import tpch_queries
+from measurement import _percentile
+from executor import get_executor, postgres_only
+from candidate_generator import load_candidates
+from training_data_generator import manage_index
+from refresh_functions import ensure_update_sets, snapshot_deleted, rf1, rf2, abort, undo_refresh
+
+# --- TPC-H GÜÇ VE VERİM (THROUGHPUT) TESTİ ---
+# Güç testi: RF1 -> akış 0'ın 22 sorgusu (tek oturum) -> RF2.
+# Verim testi: S adet eşzamanlı sorgu akışı (her biri kendi bağlantısıyla,
+# permute.h sırasıyla) ve yanında S yenileme çifti çalıştıran bir yenileme akışı.
+# Yenileme çiftleri dbgen -U setlerini kullanır (güç testi set 1, verim testi
+# 2..S+1); test bitince veritabanı eski haline döndürülür.
+# Sonuç: QphH@Size, sorgu başına gecikme yüzdelikleri ve akış zaman çizelgeleri (JSON).
+# SF=1'de güç testinden önce, yenileme uygulanmamış veri üzerinde ayrı bir
+# yeterlilik (qualification) koşusu qgen varsayılan parametreleriyle yapılır ve
+# sonuçlar dbgen/answers/q*.out ile karşılaştırılır (süreleri sonuca girmez).
+
+def get_connection(settings=None):
+    conn = get_executor().connect()
+    cur = conn.cursor()
+    cur.execute("SET statement_timeout = 0;")
+    # Karşılaştırılan Postgres ayarları (örn. work_mem) her oturumda uygulanır
+    for key, value in (settings or {}).items():
+        cur.execute(f"SET {key} = %s", (value,))
+    cur.close()
+    return conn
+
+def run_query(conn, sql):
+    # Dönüş: (süre ms, satırlar)
+    statement = tpch_queries.prepared_statement(conn, sql) if config.USE_PREPARED_STATEMENTS else sql
+    cur = conn.cursor()
+    start = time.perf_counter()
+    cur.execute(statement)
+    rows = cur.fetchall() if cur.description else []
+    elapsed = (time.perf_counter() - start) * 1000
+    cur.close()
+    return elapsed, rows
+
+def refresh_pair(conn, n, undo):
+    # dbgen güncelleme seti n için RF1 + RF2; geri alma bilgisi undo listesine eklenir
+    snapshot = snapshot_deleted(conn, n)
+    timings = {}
+    try:
+        timings["RF1"] = rf1(conn, n)[0]
+        timings["RF2"] = rf2(conn, n)[0]
+    finally:
+        abort(conn)
+        undo.append((n, snapshot if "RF2" in timings else None, "RF1" in timings))
+    return timings
+
+# --- Sonuç doğrulama (dbgen/answers) ---
+
+def read_answer(qnum):
+    path = os.path.join(config.DBGEN_DIR, "answers", f"q{qnum}.out")
+    if not os.path.exists(path):
+        return None
+    with open(path, encoding="utf-8") as f:
+        lines = [line.rstrip("\n") for line in f if line.strip()]
+    # İlk satır başlık; değerler '|' ile ayrılmış ve boşlukla hizalanmış
+    return [[v.strip() for v in line.split("|")] for line in lines[1:]]
+
+def _values_match(actual, expected):
+    try:
+        # Cevap dosyalarında sayılar 2 haneye yuvarlanmıştır
+        return abs(float(actual) - float(expected)) <= 0.0101
+    except (TypeError, ValueError):
+        return str(actual).strip() == expected
+
+def check_answer(qnum, rows):
+    expected = read_answer(qnum)
+    if expected is None:
+        return "skipped"
+    if len(rows) != len(expected):
+        return f"mismatch: {len(rows)} satır (beklenen {len(expected)})"
+    for n, (row, exp) in enumerate(zip(rows, expected)):
+        if len(row) != len(exp) or not all(_values_match(a, e) for a, e in zip(row, exp)):
+            return f"mismatch: satır {n + 1}"
+    return "ok"
+
+# --- Akışlar ---
+
+def query_stream(stream, t0, timeline, settings, validate=False, errors=None):
+    # Tek oturumda permute.h sırasıyla 22 sorgu; zaman çizelgesine olay yazar
+    rng = random.Random(config.BENCH_SEED + stream)
+    timings, validation = {}, {}
+    conn = get_connection(settings)
+    try:
+        for qnum in tpch_queries.stream_order(stream):
+            params = tpch_queries.VALIDATION_PARAMS[qnum] if validate else tpch_queries.generate_params(qnum, rng)
+            start = time.perf_counter() - t0
+            elapsed, rows = run_query(conn, tpch_queries.render(qnum, params))
+            timings[qnum] = elapsed
+            timeline.append({"stream": stream, "event": f"Q{qnum}", "start_s": start, "end_s": start + elapsed / 1000})
+            if validate:
+                validation[qnum] = check_answer(qnum, rows)
+    except Exception as e:
+        if errors is not None:
+            errors.append(f"Akış {stream}: {e}")
+        else:
+            raise
+    finally:
+        conn.close()
+    return timings, validation
+
+def refresh_stream(pairs, t0, timeline, settings, results, errors, undo):
+    conn = get_connection(settings)
+    try:
+        for n in range(pairs):
+            start = time.perf_counter() - t0
+            timings = refresh_pair(conn, n + 2, undo)
+            results.append(timings)
+            timeline.append({"stream": "refresh", "event": f"RF pair {n + 1}", "start_s": start,
+                             "end_s": start + sum(timings.values()) / 1000})
+    except Exception as e:
+        errors.append(f"Yenileme akışı: {e}")
+    finally:
+        conn.close()
+
+def qualification(settings):
+    # RF1 öncesi veri = cevap dosyalarının üretildiği veri; süreler raporlanmaz
+    print("--- YETERLİLİK (CEVAP KONTROLÜ) ---")
+    _, validation = query_stream(0, time.perf_counter(), [], settings, validate=True)
+    for qnum in sorted(validation):
+        print(f"   Q{qnum:<2} [{validation[qnum]}]")
+    failed = [q for q, v in validation.items() if v.startswith("mismatch")]
+    print(f"   {'✅' if not failed else '⚠️'} {len(validation) - len(failed)}/{len(validation)} sorgu cevapla uyumlu")
+    return {f"Q{q}": v for q, v in validation.items()}
+
+def power_test(settings, undo):
+    print("--- GÜÇ TESTİ ---")
+    t0 = time.perf_counter()
+    timeline = []
+    conn = get_connection(settings)
+    refresh = {}
+    if config.BENCH_REFRESH:
+        snapshot = snapshot_deleted(conn, 1)
+        refresh["RF1"] = rf1(conn, 1)[0]
+        undo.append((1, None, True))
+    timings, _ = query_stream(0, t0, timeline, settings)
+    if config.BENCH_REFRESH:
+        refresh["RF2"] = rf2(conn, 1)[0]
+        undo.append((1, snapshot, False))
+    conn.close()
+
+    # Power@Size = 3600 * SF / (sorgu ve RF sürelerinin [sn] geometrik ortalaması)
+    seconds = [ms / 1000 for ms in list(timings.values()) + list(refresh.values())]
+    geo_mean = math.exp(sum(math.log(max(s, 1e-3)) for s in seconds) / len(seconds))
+    power = 3600 * config.SCALE_FACTOR / geo_mean
+    for qnum in sorted(timings):
+        print(f"   Q{qnum:<2} {timings[qnum]:10.1f} ms")
+    print(f"   ✅ Power@{config.SCALE_FACTOR}: {power:.1f}")
+    return {"queries": {f"Q{q}": ms for q, ms in timings.items()}, "refresh": refresh,
+            "power_at_size": power, "timeline": timeline}
+
+def throughput_test(streams, settings, undo):
+    print(f"--- VERİM TESTİ ({streams} akış) ---")
+    t0 = time.perf_counter()
+    timeline, refresh_results, errors = [], [], []
+    stream_results = {}
+
+    def run(stream):
+        stream_results[stream] = query_stream(stream, t0, timeline, settings, errors=errors)[0]
+
+    threads = [threading.Thread(target=run, args=(s,)) for s in range(1, streams + 1)]
+    if config.BENCH_REFRESH:
+        threads.append(threading.Thread(target=refresh_stream, args=(streams, t0, timeline, settings, refresh_results, errors, undo)))
+    for t in threads: t.start()
+    for t in threads: t.join()
+    elapsed = time.perf_counter() - t0
+
+    for e in errors:
+        print(f"   ⚠️ {e}")
+    # Throughput@Size = S * 22 * 3600 / Ts * SF; yalnızca tamamlanan sorgular sayılır,
+    # hata alan akış varsa koşu geçersizdir (güç testindeki gibi)
+    completed = sum(len(r) for r in stream_results.values())
+    throughput = completed * 3600 / elapsed * config.SCALE_FACTOR
+    valid = not errors and completed == streams * tpch_queries.QUERY_COUNT
+    print(f"   {'✅' if valid else '❌ GEÇERSİZ'} Throughput@{config.SCALE_FACTOR}: {throughput:.1f} "
+          f"({completed}/{streams * tpch_queries.QUERY_COUNT} sorgu, {elapsed:.1f} s)")
+    return {"elapsed_s": elapsed, "throughput_at_size": throughput, "streams": streams,
+            "completed_queries": completed, "valid": valid,
+            "queries": {str(s): {f"Q{q}": ms for q, ms in r.items()} for s, r in stream_results.items()},
+            "refresh": refresh_results, "errors": errors,
+            "timeline": sorted(timeline, key=lambda e: e["start_s"])}
+
+def latency_summary(*stream_timings):
+    # Tüm akışlardaki gözlemlerden sorgu başına yüzdelikler
+    samples = {}
+    for timings in stream_timings:
+        for q, ms in timings.items():
+            samples.setdefault(q, []).append(ms)
+    return {q: {"count": len(v), "p50": _percentile(v, 0.5), "p95": _percentile(v, 0.95),
+                "p99": _percentile(v, 0.99), "mean": sum(v) / len(v)} for q, v in sorted(samples.items())}
+
+def main():
+    parser = argparse.ArgumentParser(description="TPC-H güç + verim benchmark'ı")
+    parser.add_argument("--streams", type=int, default=config.BENCH_STREAMS)
+    parser.add_argument("--indexes", default="", help="Test süresince kurulacak aday indeks isimleri (virgülle)")
+    parser.add_argument("--set", action="append", default=[], metavar="AYAR=DEĞER",
+                        help="Oturum ayarı (örn. work_mem=256MB), tekrar edilebilir")
+    parser.add_argument("--no-validate", action="store_true", help="SF=1'de cevap kontrolünü atla")
+    parser.add_argument("--out", default=config.BENCH_RESULT_FILE)
+    args = parser.parse_args()
+
+    settings = dict(s.split("=", 1) for s in args.set)
+    validate = config.SCALE_FACTOR == 1 and not args.no_validate
+    names = [n.strip() for n in args.indexes.split(",") if n.strip()]
+    indexes = [c for c in load_candidates() if c[0] in names]
+
+    print(f"--- TPC-H BENCHMARK (SF={config.SCALE_FACTOR}) ---")
+    if not postgres_only("Benchmark (RF1/RF2, oturum ayarları)"): return
+    print(f"İndeksler: {[i[0] for i in indexes] or 'yok'} | Ayarlar: {settings or 'varsayılan'}")
+
+    try:
+        conn = get_connection()
+    except Exception as e:
+        print(f"Bağlantı hatası: {e}")
+        return
+    for idx in indexes:
+        manage_index(conn, "CREATE", idx)
+    if indexes:
+        conn.cursor().execute("ANALYZE;")
+
+    if config.BENCH_REFRESH and not ensure_update_sets(args.streams + 1):
+        conn.close()
+        return
+
+    undo = []
+    try:
+        validation = qualification(settings) if validate else {}
+        power = power_test(settings, undo)
+        throughput = throughput_test(args.streams, settings, undo)
+    finally:
+        # Yenileme fonksiyonlarının etkisi ters sırayla geri alınır
+        abort(conn)
+        for n, snapshot, inserted in reversed(undo):
+            undo_refresh(conn, n, snapshot, inserted)
+        for idx in indexes:
+            manage_index(conn, "DROP", idx)
+        conn.close()
+
+    qphh = math.sqrt(power["power_at_size"] * throughput["throughput_at_size"])
+    report = {
+        "scale_factor": config.SCALE_FACTOR,
+        "indexes": [i[0] for i in indexes],
+        "settings": settings,
+        "prepared_statements": config.USE_PREPARED_STATEMENTS,
+        "qphh_at_size": qphh,
+        "valid": throughput["valid"],
+        "validation": validation,
+        "power": power,
+        "throughput": throughput,
+        "latency": latency_summary(power["queries"], *throughput["queries"].values()),
+    }
+    with open(args.out, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    if throughput["valid"]:
+        print(f"\n🚀 QphH@{config.SCALE_FACTOR}: {qphh:.1f} -> {args.out}")
+    else:
+        print(f"\n❌ Verim testinde hata: QphH@{config.SCALE_FACTOR}={qphh:.1f} geçersiz -> {args.out}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,253 @@
+import re
+import os
+import json
+import hashlib
+from datetime import date, timedelta
+from collections import Counter
+import config
+from stats_cache import get_column_distinct
+from executor import get_executor
+
+# --- OTOMATİK ADAY İNDEKS ÜRETİCİ ---
+# İş yükü SQL'i ayrıştırılır; predikat (eşitlik/aralık), join, GROUP BY ve
+# ORDER BY kolonları çıkarılır. Bunlardan tek kolonlu, çok kolonlu
+# (eşitlik kolonları önce, aralık kolonu sonra) ve INCLUDE'lu kapsayan
+# (covering) adaylar üretilir, sonra sıklık ve seçicilikle budanır.
+#
+# İndeks tanımı: (isim, tablo, "kolon1, kolon2"[, "include1, include2"[, yöntem[, predikat]]])
+# Eski 3'lü (isim, tablo, kolon) tanımlar aynen geçerlidir.
+# Yöntem: "btree" (varsayılan), "brin" veya "partition" (tarih kolonuna göre yıllık
+# aralık bölümleme, partitioning.py). Predikat verilirse kısmi indeks (WHERE ...) olur.
+
+PREFIX_TABLES = {"l": "lineitem", "o": "orders", "c": "customer", "p": "part",
+                 "ps": "partsupp", "s": "supplier", "n": "nation", "r": "region"}
+COLUMN_PATTERN = re.compile(r"\b((?:l|o|c|p|ps|s|n|r)_[a-z]+)\b")
+CLAUSE_PATTERN = re.compile(r"\b(SELECT|FROM|WHERE|GROUP\s+BY|HAVING|ORDER\s+BY|LIMIT)\b", re.I)
+RANGE_PATTERN = re.compile(r"(<|>|\bBETWEEN\b|\bLIKE\b)", re.I)
+
+def column_table(column):
+    return PREFIX_TABLES.get(column.split("_")[0])
+
+def index_columns(index_def):
+    return [c.strip() for c in index_def[2].split(",")]
+
+def index_include(index_def):
+    return [c.strip() for c in index_def[3].split(",")] if len(index_def) > 3 and index_def[3] else []
+
+def index_method(index_def):
+    return index_def[4] if len(index_def) > 4 and index_def[4] else "btree"
+
+def index_predicate(index_def):
+    return index_def[5] if len(index_def) > 5 and index_def[5] else None
+
+def index_ddl(index_def, with_name=True):
+    name, table = index_def[0], index_def[1]
+    method = index_method(index_def)
+    if method == "partition":
+        # Çalıştırılabilir DDL değildir; depo anahtarı ve raporlar için tanım metni
+        return f"PARTITION {table} BY RANGE ({index_def[2]})"
+    using = f"USING {method} " if method != "btree" else ""
+    ddl = f"CREATE INDEX {'IF NOT EXISTS ' + name + ' ' if with_name else ''}ON {table} {using}({index_def[2]})"
+    if index_include(index_def):
+        ddl += f" INCLUDE ({index_def[3]})"
+    if method == "brin":
+        ddl += f" WITH (pages_per_range = {config.BRIN_PAGES_PER_RANGE})"
+    if index_predicate(index_def):
+        ddl += f" WHERE {index_predicate(index_def)}"
+    return ddl
+
+def index_name(table, columns, include, suffix=""):
+    # INCLUDE kolonları da isme girer: aynı anahtarlı farklı kapsayan adaylar ayrı isim alır
+    short = lambda cols: "_".join(c.split("_", 1)[1] for c in cols)
+    name = f"idx_{table}_{short(columns)}" + (f"_cov_{short(include)}" if include else "") + suffix
+    # Postgres isim sınırı 63 karakter
+    if len(name) > 63:
+        name = name[:54] + "_" + hashlib.md5(name.encode()).hexdigest()[:8]
+    return name
+
+def _split_clauses(sql):
+    # Üst seviye cümlecikleri ayır (alt sorgular kaba olarak aynı metne dahil kalır)
+    parts = {}
+    matches = list(CLAUSE_PATTERN.finditer(sql))
+    for i, m in enumerate(matches):
+        key = " ".join(m.group(1).upper().split())
+        end = matches[i + 1].start() if i + 1 < len(matches) else len(sql)
+        parts[key] = parts.get(key, "") + " " + sql[m.end():end]
+    return parts
+
+def parse_query_columns(sql):
+    # Dönüş: {tablo: {"eq": [...], "range": [...], "join": [...], "group": [...], "order": [...], "select": [...]}}
+    parts = _split_clauses(sql)
+    usage = {}
+
+    def add(kind, col):
+        table = column_table(col)
+        if not table: return
+        slot = usage.setdefault(table, {k: [] for k in ("eq", "range", "join", "group", "order", "select")})
+        if col not in slot[kind]:
+            slot[kind].append(col)
+
+    for conjunct in re.split(r"\bAND\b", parts.get("WHERE", ""), flags=re.I):
+        cols = COLUMN_PATTERN.findall(conjunct)
+        if len({column_table(c) for c in cols}) > 1 and "=" in conjunct:
+            for c in cols: add("join", c)
+        elif len(cols) == 1:
+            add("range" if RANGE_PATTERN.search(conjunct) else "eq", cols[0])
+    for c in COLUMN_PATTERN.findall(parts.get("GROUP BY", "")): add("group", c)
+    for c in COLUMN_PATTERN.findall(parts.get("ORDER BY", "")): add("order", c)
+    for c in COLUMN_PATTERN.findall(parts.get("SELECT", "")): add("select", c)
+    return usage
+
+def query_candidates(sql):
+    candidates = set()
+    for table, u in parse_query_columns(sql).items():
+        # Tek kolonlu adaylar
+        for col in u["eq"] + u["range"] + u["join"]:
+            candidates.add((table, (col,), ()))
+
+        # Çok kolonlu: eşitlik kolonları önce, en fazla bir aralık kolonu sonda. İlk aralık
+        # kolonundan sonraki kolonlar taramayı daraltmaz: diğer filtreler INCLUDE'da süzülür
+        key = (u["eq"] + u["range"][:1])[:config.CANDIDATE_MAX_WIDTH]
+        filters = [c for c in u["eq"] + u["range"] if c not in key]
+        if len(key) > 1 or filters:
+            candidates.add((table, tuple(key), tuple(filters[:config.CANDIDATE_MAX_INCLUDE])))
+        # Aralık kolonu önde olan varyant (tarih aralığı gibi geniş taramalar için)
+        if u["range"] and len(key) > 1:
+            reordered = tuple([u["range"][0]] + [c for c in key if c != u["range"][0]])
+            candidates.add((table, reordered, ()))
+        # Join kolonu + filtre kolonu (örn. (o_custkey, o_orderdate))
+        for jc in u["join"]:
+            for fc in u["eq"] + u["range"]:
+                candidates.add((table, (jc, fc), ()))
+        # GROUP BY / ORDER BY
+        if u["group"]:
+            candidates.add((table, tuple(u["group"][:config.CANDIDATE_MAX_WIDTH]), ()))
+        if u["order"]:
+            candidates.add((table, tuple(u["order"][:config.CANDIDATE_MAX_WIDTH]), ()))
+
+        # Kapsayan indeks: anahtar dışında kalan az sayıda kolon INCLUDE edilir (index-only scan)
+        if key:
+            rest = [c for c in dict.fromkeys(filters + u["select"] + u["group"] + u["order"] + u["join"]) if c not in key]
+            if 0 < len(rest) <= config.CANDIDATE_MAX_INCLUDE:
+                candidates.add((table, tuple(key), tuple(rest)))
+    return candidates
+
+def existing_unique_keys(conn):
+    # Mevcut PK / tekil indeks anahtarları: {tablo: [(kolon, ...), ...]}
+    keys = {}
+    try:
+        for table, columns in get_executor().unique_keys(conn):
+            keys.setdefault(table, []).append(tuple(columns))
+    except Exception as e:
+        print(f"\n   ⚠️ Tekil anahtarlar okunamadı: {e}")
+    return keys
+
+def covered_by_unique(key, unique_keys):
+    # Anahtar mevcut bir PK/tekil indeksin önekiyse aday aynı erişim yolunu tekrarlar
+    return any(tuple(u[:len(key)]) == tuple(key) for u in unique_keys)
+
+def generate_candidates(sqls, conn=None):
+    counts = Counter()
+    for sql in sqls:
+        counts.update(query_candidates(sql))
+    unique = existing_unique_keys(conn) if conn is not None else {}
+
+    result, names = [], set()
+    for (table, key, include), freq in counts.most_common():
+        # Budama: nadir adaylar, mevcut PK/tekil indeksin öneki olan anahtarlar ve
+        # düşük seçicilikli (az farklı değerli) tek kolonlar
+        if freq < config.CANDIDATE_MIN_FREQ:
+            continue
+        if covered_by_unique(key, unique.get(table, [])):
+            continue
+        if conn is not None and len(key) == 1 and not include:
+            n_distinct = get_column_distinct(conn, table, key[0])
+            if 0 < n_distinct < config.CANDIDATE_MIN_DISTINCT:
+                continue
+        name = index_name(table, key, include)
+        if name in names:
+            continue
+        names.add(name)
+        result.append((name, table, ", ".join(key)) + ((", ".join(include),) if include else ()))
+        if len(result) >= config.CANDIDATE_MAX_COUNT:
+            break
+    return result
+
+# --- FİZİKSEL TASARIM ADAYLARI (BRIN / KISMİ İNDEKS / BÖLÜMLEME) ---
+# STRUCTURE_COLUMNS'taki tarih kolonlarında (l_shipdate, o_orderdate) aralık
+# taraması yapan sorgular yeterince sıksa B-tree adaylarına ek olarak üretilir.
+
+DATE_BOUND_PATTERN = re.compile(
+    r"\b(\w+)\s*(>=|<=|>|<)\s*date\s*'(\d{4}-\d{2}-\d{2})'"
+    r"(?:\s*([+-])\s*(?:interval\s*'(\d+)'\s*(year|month|day)|integer\s*'(\d+)'))?", re.I)
+
+def _shift(d, sign, amount, unit):
+    amount = amount if sign == "+" else -amount
+    if unit == "day":
+        return d + timedelta(days=amount)
+    months = d.year * 12 + d.month - 1 + (amount * 12 if unit == "year" else amount)
+    return date(months // 12, months % 12 + 1, min(d.day, 28))
+
+def date_range(sql, column):
+    # Sorgunun kolon üzerindeki [alt, üst] tarih sınırları (tek taraflıysa tanım aralığının ucu)
+    lo, hi = [date.fromisoformat(d) for d in config.STRUCTURE_DATE_DOMAIN]
+    found = False
+    for col, op, literal, sign, amount, unit, days in DATE_BOUND_PATTERN.findall(sql):
+        if col.lower() != column: continue
+        bound = date.fromisoformat(literal)
+        if sign:
+            bound = _shift(bound, sign, int(amount or days), unit.lower() or "day")
+        if op.startswith(">"):
+            lo = max(lo, bound)
+        else:
+            hi = min(hi, bound)
+        found = True
+    return (lo, hi) if found else None
+
+def partial_predicate(sqls, column):
+    # İş yükündeki aralıkların birleşimi; tanım aralığının ucuna dayanan taraf predikata yazılmaz
+    # (yoksa tek taraflı sorgular predikatı ima edemez ve kısmi indeks kullanılamaz)
+    ranges = [r for r in (date_range(sql, column) for sql in sqls) if r]
+    if not ranges:
+        return None
+    domain_lo, domain_hi = [date.fromisoformat(d) for d in config.STRUCTURE_DATE_DOMAIN]
+    lo, hi = min(r[0] for r in ranges), max(r[1] for r in ranges)
+    if (hi - lo).days > config.PARTIAL_MAX_FRACTION * (domain_hi - domain_lo).days:
+        return None
+    parts = []
+    if lo > domain_lo: parts.append(f"{column} >= DATE '{lo}'")
+    if hi < domain_hi: parts.append(f"{column} <= DATE '{hi}'")
+    return " AND ".join(parts) or None
+
+def structure_candidates(sqls):
+    result = []
+    for table, column in config.STRUCTURE_COLUMNS.items():
+        scans = [sql for sql in sqls if column in parse_query_columns(sql).get(table, {}).get("range", [])]
+        if len(scans) < config.CANDIDATE_MIN_FREQ:
+            continue
+        short = column.split("_", 1)[1]
+        result.append((index_name(table, (column,), (), "_brin"), table, column, "", "brin"))
+        result.append((f"part_{table}_{short}", table, column, "", "partition"))
+
+        # Kısmi indeks anahtarı: tarih dışı en sık filtre kolonları, yoksa join kolonu
+        keys = Counter()
+        for sql in scans:
+            u = parse_query_columns(sql)[table]
+            key = [c for c in u["eq"] + u["range"] if c != column][:config.CANDIDATE_MAX_WIDTH] or u["join"][:1]
+            if key: keys[tuple(key)] += 1
+        predicate = partial_predicate(scans, column)
+        if keys and predicate:
+            key = keys.most_common(1)[0][0]
+            result.append((index_name(table, key, (), "_partial"), table, ", ".join(key), "", "btree", predicate))
+    return result
+
+def save_candidates(candidates, path=None):
+    with open(path or config.CANDIDATES_FILE, "w", encoding="utf-8") as f:
+        json.dump([list(c) for c in candidates], f, indent=2)
+
+def load_candidates(path=None):
+    path = path or config.CANDIDATES_FILE
+    if config.CANDIDATE_MODE == "auto" and os.path.exists(path):
+        with open(path, encoding="utf-8") as f:
+            return [tuple(c) for c in json.load(f)]
+    return list(config.CANDIDATE_INDEXES)
@@ -1,3 +1,5 @@
+import os
+
 # --- PROJE KONFİGÜRASYONU ---
 
 # ÖLÇEK FAKTÖRÜ (1 veya 10)
@@ -8,30 +10,123 @@ SCALE_FACTOR = 10
 # SF=1 için 200-500 yapılabilir.
 QUERY_COUNT = 50
 
+# PARALEL TOPLAMA: İşçi süreç sayısı (1 = eski seri mod)
+WORKER_COUNT = 1
+# Aynı tabloya aynı anda sorgu çalıştırabilecek en fazla işçi
+MAX_WORKERS_PER_TABLE = 2
+# İşçileri ayrı CPU çekirdeklerine sabitle (Linux)
+PIN_WORKERS = True
+
 # Veritabanı Ayarları
 DB_HOST = "localhost"
 DB_USER = "postgres"
 DB_PASS = "1991"
 DB_PORT = "5432"
 
+# ÇALIŞTIRMA ARKA UCU (executor.py)
+# "postgres": yukarıdaki sunucu | "duckdb": dbgen çıktısından küçük ölçekte yüklenen gömülü
+# dosya (sunucusuz; topla -> eğit -> öner hattını saniyelerde denemek / CI için)
+# TPCH_BACKEND ortam değişkeni dosyayı değiştirmeden arka uç seçer
+BACKEND = os.environ.get("TPCH_BACKEND", "postgres")
+EMBEDDED_SCALE_FACTOR = 0.01
+
 # Scale Factor'e göre otomatik değişen ayarlar
-if SCALE_FACTOR == 10:
+if BACKEND == "duckdb":
+    # Gömülü arka uç kendi ölçeğinde koşar; dosyaları Postgres sonuçlarına karışmaz
+    SCALE_FACTOR = EMBEDDED_SCALE_FACTOR
+    # DuckDB veritabanı dosyası (tpch_loader.py oluşturur)
+    DB_NAME = "tpch_embedded.duckdb"
+    DATA_FILE = "training_data_embedded.csv"
+    MODEL_FILE = "model_embedded_xgboost.pkl"
+    FAST_MODEL_FILE = "model_embedded_fast.npz"
+    MODEL_VERSIONS_DIR = "model_versions_embedded"
+    META_FEATURES = "meta_features_embedded.pkl"
+    META_LABELS = "meta_labels_embedded.pkl"
+    META_CANDIDATES = "meta_candidates_embedded.pkl"
+    CANDIDATES_FILE = "candidates_embedded.json"
+    RESULT_STORE = "results_embedded.sqlite"
+    BENCH_RESULT_FILE = "benchmark_embedded.json"
+    REFRESH_DIR = "refresh_embedded"
+    RESULT_CACHE_FILE = "measure_cache_embedded.sqlite"
+    INSTRUMENT_FILE = "instrumentation_embedded.jsonl"
+    INSTRUMENT_METRICS_FILE = "instrumentation_embedded.openmetrics"
+    BENCH_STREAMS = 2
+    IMPROVEMENT_THRESHOLD = 0.90
+elif SCALE_FACTOR == 10:
     DB_NAME = "tpch_db_10"
     DATA_FILE = "training_data_sf10.csv"
     MODEL_FILE = "model_sf10_xgboost.pkl"
+    # Pickle/xgboost gerektirmeyen düz ağaç dizileri (fast_model.py)
+    FAST_MODEL_FILE = "model_sf10_fast.npz"
+    # Çevrimiçi öğrenme model sürümleri (online_learning.py)
+    MODEL_VERSIONS_DIR = "model_versions_sf10"
     META_FEATURES = "meta_features_sf10.pkl"
     META_LABELS = "meta_labels_sf10.pkl"
+    META_CANDIDATES = "meta_candidates_sf10.pkl"
+    CANDIDATES_FILE = "candidates_sf10.json"
+    RESULT_STORE = "results_sf10.sqlite"
+    BENCH_RESULT_FILE = "benchmark_sf10.json"
+    # dbgen -U güncelleme setlerinin (RF1/RF2) dizini
+    REFRESH_DIR = "refresh_sf10"
+    RESULT_CACHE_FILE = "measure_cache_sf10.sqlite"
+    INSTRUMENT_FILE = "instrumentation_sf10.jsonl"
+    INSTRUMENT_METRICS_FILE = "instrumentation_sf10.openmetrics"
+    # TPC-H'nin bu ölçek için öngördüğü en az eşzamanlı sorgu akışı
+    BENCH_STREAMS = 3
     # SF=10'da %5 iyileşme bile kabul edilir (disk I/O kazancı)
     IMPROVEMENT_THRESHOLD = 0.95 
 else:
     DB_NAME = "tpch_db"
     DATA_FILE = "training_data_sf1.csv"
     MODEL_FILE = "model_sf1_xgboost.pkl"
+    # Pickle/xgboost gerektirmeyen düz ağaç dizileri (fast_model.py)
+    FAST_MODEL_FILE = "model_sf1_fast.npz"
+    # Çevrimiçi öğrenme model sürümleri (online_learning.py)
+    MODEL_VERSIONS_DIR = "model_versions_sf1"
     META_FEATURES = "meta_features_sf1.pkl"
     META_LABELS = "meta_labels_sf1.pkl"
+    META_CANDIDATES = "meta_candidates_sf1.pkl"
+    CANDIDATES_FILE = "candidates_sf1.json"
+    RESULT_STORE = "results_sf1.sqlite"
+    BENCH_RESULT_FILE = "benchmark_sf1.json"
+    # dbgen -U güncelleme setlerinin (RF1/RF2) dizini
+    REFRESH_DIR = "refresh_sf1"
+    RESULT_CACHE_FILE = "measure_cache_sf1.sqlite"
+    INSTRUMENT_FILE = "instrumentation_sf1.jsonl"
+    INSTRUMENT_METRICS_FILE = "instrumentation_sf1.openmetrics"
+    # TPC-H'nin bu ölçek için öngördüğü en az eşzamanlı sorgu akışı
+    BENCH_STREAMS = 2
     # SF=1'de indeksin gerçekten değmesi için %10 iyileşme bekleyelim
     IMPROVEMENT_THRESHOLD = 0.90
 
+# ÖLÇÜM MOTORU (measurement.py)
+# Önbellek modu: "warm" (pg_prewarm + ısınma koşuları) veya "cold" (her koşu öncesi buffer boşaltma)
+MEASURE_CACHE = "warm"
+MEASURE_WARMUP = 1
+# Güven aralığı (%95) yarı genişliği ortalamanın bu oranına inene kadar tekrar edilir
+MEASURE_MIN_RUNS = 3
+MEASURE_MAX_RUNS = 10
+MEASURE_CI_TARGET = 0.05
+# Eşikli ölçümde tek koşu eşiğin bu katında kesilir; erken çıkış için %95 GA alt sınırı eşiği aşmalı
+MEASURE_TIMEOUT_FACTOR = 3
+# Kalıcı ölçüm önbelleği (result_cache.py): parmak izi + indeks kümesi + veri sürümü anahtarlı, LRU
+RESULT_CACHE = True
+RESULT_CACHE_MAX_ENTRIES = 20000
+# Her ölçümde pg_stat_statements farkından koşu başına buffer/temp/WAL kaydı (instrumentation.py, ek koşu yok)
+INSTRUMENT = True
+# Ölçümlerin bu oranında ek bir EXPLAIN (ANALYZE, BUFFERS, WAL) koşusuyla düğüm başına q-hatası da kaydedilir
+INSTRUMENT_ANALYZE_SAMPLE = 0.1
+
+# İstatistik önbelleği (stats_cache.py) yüklenemezse yeniden deneme aralığı (sn)
+STATS_RETRY_S = 30
+
+# İŞ YÜKÜ (workload.py / tpch_queries.py)
+# "tpch22": dbgen/queries şablonlarından 22 sorguluk TPC-H karışımı, "classic": yalnızca Q1/Q3/Q6
+WORKLOAD_MIX = "tpch22"
+# TPC-H sorguları sunucu tarafı hazır ifade (PREPARE/EXECUTE) olarak ölçülür,
+# böylece ayrıştırma/planlama yükü süreye karışmaz
+USE_PREPARED_STATEMENTS = True
+
 # Aday İndeks Listesi (Tüm scriptler ortak kullansın)
 CANDIDATE_INDEXES = [
     ("idx_lineitem_shipdate", "lineitem", "l_shipdate"),
@@ -42,6 +137,112 @@ CANDIDATE_INDEXES = [
     ("idx_orders_custkey", "orders", "o_custkey")
 ]
 
+# YÜKLEYİCİ (tpch_loader.py): dbgen dizini, paralel işçi ve tablo başına parça sayısı
+DBGEN_DIR = "dbgen"
+LOAD_WORKERS = 8
+LOAD_CHUNKS = 8
+
+# ADAY İNDEKS ÜRETİMİ (candidate_generator.py)
+# "auto": adaylar iş yükü SQL'inden üretilir, "static": CANDIDATE_INDEXES kullanılır
+CANDIDATE_MODE = "auto"
+CANDIDATE_MAX_WIDTH = 3
+CANDIDATE_MAX_INCLUDE = 3
+CANDIDATE_MIN_FREQ = 2
+# Bu değerden az farklı değeri olan kolonlar tek başına aday olmaz (örn. l_returnflag)
+CANDIDATE_MIN_DISTINCT = 20
+CANDIDATE_MAX_COUNT = 20
+
+# FİZİKSEL TASARIM ADAYLARI: tarih kolonlarında BRIN, kısmi indeks ve yıllık aralık bölümleme
+STRUCTURE_CANDIDATES = True
+STRUCTURE_COLUMNS = {"lineitem": "l_shipdate", "orders": "o_orderdate"}
+# TPC-H tarih tanım aralığı (bölümler yıl yıl bu aralıktan kurulur)
+STRUCTURE_DATE_DOMAIN = ("1992-01-01", "1998-12-31")
+BRIN_PAGES_PER_RANGE = 32
+# Kısmi indeks, iş yükü aralıklarının birleşimi tanım aralığının bu oranından darsa üretilir
+PARTIAL_MAX_FRACTION = 0.6
+
+# MODEL EĞİTİMİ (model_trainer.py): k-katlı CV + erken durdurma + parametre araması
+TRAIN_FOLDS = 5
+TRAIN_MAX_ESTIMATORS = 500
+TRAIN_EARLY_STOPPING = 20
+TRAIN_PARAM_GRID = {
+    "max_depth": [3, 4, 6],
+    "learning_rate": [0.05, 0.1],
+    "min_child_weight": [1, 5],
+}
+# "classify": indeks başına iyileşme etiketi (0/1)
+# "regress": base süre + indeks başına indeksli/base süre oranı; öneriler mutlak kazanca göre sıralanır
+MODEL_MODE = "classify"
+# Etiketleri paralel eğiten süreç sayısı (None: çekirdek sayısı)
+TRAIN_WORKERS = None
+# İndeks başına eşik ayarında F-beta (beta < 1: gereksiz indeks önermemek için kesinlik öncelikli)
+TRAIN_THRESHOLD_BETA = 0.5
+
+# ÇEVRİMİÇİ ÖĞRENME (online_learning.py): doğrulama/üretim ölçümleriyle model güncelleme
+# "continue": XGBoost devam eğitimi (mevcut ağaçlara ONLINE_ROUNDS ağaç), "retrain": kayan pencere yeniden eğitimi
+ONLINE_STRATEGY = "continue"
+ONLINE_ROUNDS = 20
+# Güncelleme için gereken en az yeni örnek ve "retrain"in kullandığı en son örnek penceresi
+ONLINE_MIN_SAMPLES = 20
+ONLINE_WINDOW = 2000
+# Unutmayı azaltmak için eğitim CSV'sinden eklenen satır sayısı
+ONLINE_REPLAY_ROWS = 500
+# Yeni örneklerin doğrulamaya ayrılan (en yeni) kısmı ve kabul edilen en fazla skor düşüşü
+ONLINE_HOLDOUT = 0.25
+ONLINE_MAX_DROP = 0.02
+ONLINE_INTERVAL_S = 3600
+# index_recommender doğrulama ölçümleri örnek olarak kaydedilir
+ONLINE_RECORD_VALIDATION = True
+
+# ÖNERİ SİSTEMİ: olasılık eşiği ve servis modu (--serve) portu
+# Etiket başına ayarlanmış eşiği olmayan (eski) modeller için genel eşik
+RECOMMEND_THRESHOLD = 0.4
+RECOMMEND_PORT = 8765
+# Varsa model_sf*_fast.npz kullanılır (pickle yüklemeden milisaniyede başlar)
+USE_FAST_MODEL = True
+
+# İŞ YÜKÜ DANIŞMANI (workload_advisor.py)
+ADVISOR_DISK_BUDGET_MB = 2048
+# DML'in değiştirdiği her satır için indeks başına bakım maliyeti (planlayıcı maliyet birimi)
+INDEX_MAINTENANCE_COST_PER_ROW = 5.0
+# Kurulum süresi tahmini için kaba okuma/sıralama ve yazma hızları
+INDEX_BUILD_ROWS_PER_SEC = 2000000
+INDEX_BUILD_MB_PER_SEC = 100
+
+# What-if modu: İndeksler HypoPG ile sanal olarak tanımlanır, etiketler
+# planlayıcı maliyetinden çıkarılır (fiziksel CREATE INDEX yapılmaz). Süre oranı
+# (ratio_*) yalnızca doğrulanan satırlarda yazılır, diğerlerinde boş (NaN) kalır.
+# Varsayılan fiziksel ölçümdür; what-if sonuçları depoda veri sürümüyle anahtarlanır.
+WHATIF_MODE = False
+# Fiziksel kurulum + süre ölçümü ile doğrulanacak sorgu sayısı
+WHATIF_VERIFY_SAMPLE = 5
+
+# BENCHMARK (benchmark_runner.py): güç + verim testi
+# Akış parametreleri bu tohumdan türetilir (tekrarlanabilir karşılaştırma)
+BENCH_SEED = 42
+# Sorgu akışlarının yanında yenileme (refresh) akışı da çalışsın
+BENCH_REFRESH = True
+
+# ÇEKİŞME TEKRARI (contention_replay.py): eşzamanlı okuma/yazma karışımı
+# Saniyedeki hedef istek sayısı (Poisson varış), oturum sayısı ve süre
+CONTENTION_RATE = 20.0
+CONTENTION_SESSIONS = 16
+CONTENTION_DURATION = 60
+# İsteklerin DML olma oranı
+CONTENTION_WRITE_RATIO = 0.5
+CONTENTION_SEED = 7
+# Oturum başına statement_timeout (ms): takılan istek oturumu kilitlemez, zaman aşımı olarak sayılır
+CONTENTION_STATEMENT_TIMEOUT_MS = 30000
+# İndeksle DML p95 gecikmesi bu kattan fazla artıyorsa indeks etiketlerde/öneride elenir
+CONTENTION_MAX_DML_SLOWDOWN = 1.5
+
+# YENİLEME FONKSİYONLARI (refresh_functions.py): RF1/RF2 ile gerçek DML yükü
+REFRESH_SETS = 3
+# RF2'de tek DELETE ifadesindeki sipariş anahtarı sayısı
+REFRESH_DELETE_BATCH = 1000
+# İndeksle RF1+RF2 süresi bu kattan fazla artıyorsa indeksin etiketleri sıfırlanır
+REFRESH_MAX_SLOWDOWN = 1.5
+
 def get_db_config():
     return {
         "dbname": DB_NAME,
@@ -0,0 +1,209 @@
+import math
+import json
+import time
+import random
+import asyncio
+import hashlib
+import argparse
+import config
+from workload import WorkloadGenerator
+from measurement import _percentile
+from executor import get_executor, postgres_only
+from candidate_generator import load_candidates
+from training_data_generator import manage_index
+from result_store import open_store, config_key, put_contention, dml_slowdown
+
+# --- EŞZAMANLI OKUMA/YAZMA ÇEKİŞME TEKRARI ---
+# WorkloadGenerator karışımı, hedef varış hızında (Poisson) çok sayıda
+# eşzamanlı oturumla (psycopg 3 async bağlantılar) tekrar oynatılır.
+# Her konfigürasyon (indekssiz + her aday) aynı varış dizisini görür.
+# SELECT ve DML için gecikme histogramları (kuyruk bekleme dahil), WAL hacmi,
+# HOT güncelleme oranı, kilit bekleyen oturum sayısı ve zaman aşımları
+# (oturum başına statement_timeout) ölçülür; sonuçlar
+# depoya yazılır ve eğitim etiketleri ile öneri sistemi tarafından kullanılır.
+
+def build_schedule(rate, duration, write_ratio, seed):
+    # [(varış zamanı sn, "SELECT"/"DML", sql), ...] - tohumla tekrarlanabilir
+    rng = random.Random(seed)
+    state = random.getstate()
+    random.seed(seed)
+    gen = WorkloadGenerator()
+    schedule, t = [], 0.0
+    while True:
+        t += rng.expovariate(rate)
+        if t >= duration: break
+        if rng.random() < write_ratio:
+            schedule.append((t, "DML", gen._get_random_dml()[0]))
+        else:
+            schedule.append((t, "SELECT", gen._get_random_select()[0]))
+    random.setstate(state)
+    return schedule
+
+def run_key(schedule, sessions):
+    text = f"{sessions}\n" + "\n".join(f"{t:.4f} {sql}" for t, _, sql in schedule)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+def histogram(samples):
+    # 2'nin kuvveti ms kovaları: {"<=1": n, "<=2": n, "<=4": n, ...}
+    buckets = {}
+    for ms in samples:
+        upper = 2 ** max(math.ceil(math.log2(max(ms, 1e-3))), 0)
+        buckets[upper] = buckets.get(upper, 0) + 1
+    return {f"<={k}": buckets[k] for k in sorted(buckets)}
+
+def latency_stats(samples):
+    if not samples:
+        return {"count": 0}
+    return {"count": len(samples), "p50": _percentile(samples, 0.5), "p95": _percentile(samples, 0.95),
+            "p99": _percentile(samples, 0.99), "max": max(samples), "histogram": histogram(samples)}
+
+def server_counters(conn, tables):
+    # WAL konumu ve tablo başına güncelleme / HOT güncelleme sayaçları
+    cur = conn.cursor()
+    cur.execute("SELECT pg_stat_clear_snapshot()")
+    cur.execute("SELECT pg_current_wal_lsn()")
+    lsn = cur.fetchone()[0]
+    cur.execute("SELECT coalesce(sum(n_tup_upd), 0), coalesce(sum(n_tup_hot_upd), 0) FROM pg_stat_user_tables WHERE relname = ANY(%s)",
+                (list(tables),))
+    upd, hot = cur.fetchone()
+    cur.close()
+    return lsn, int(upd), int(hot)
+
+def wal_bytes(conn, start_lsn, end_lsn):
+    cur = conn.cursor()
+    cur.execute("SELECT pg_wal_lsn_diff(%s, %s)", (end_lsn, start_lsn))
+    diff = cur.fetchone()[0]
+    cur.close()
+    return float(diff)
+
+async def _replay(schedule, sessions):
+    import psycopg
+
+    queue = asyncio.Queue()
+    latencies = {"SELECT": [], "DML": []}
+    errors = {"SELECT": 0, "DML": 0}
+    timeouts = {"SELECT": 0, "DML": 0}
+    lock_samples = []
+    done = asyncio.Event()
+
+    async def session():
+        async with await psycopg.AsyncConnection.connect(autocommit=True, **config.get_db_config()) as conn:
+            await conn.execute(f"SET statement_timeout = {int(config.CONTENTION_STATEMENT_TIMEOUT_MS)}")
+            while True:
+                item = await queue.get()
+                if item is None: return
+                arrival, kind, sql = item
+                try:
+                    cur = await conn.execute(sql)
+                    if cur.description:
+                        await cur.fetchall()
+                    # Yanıt süresi = kuyrukta bekleme + çalışma
+                    latencies[kind].append((time.perf_counter() - arrival) * 1000)
+                except psycopg.errors.QueryCanceled:
+                    # Kesilen istek süresi sansürlü örnek olarak kalır: p95 zaman aşımını gizlemez
+                    latencies[kind].append((time.perf_counter() - arrival) * 1000)
+                    timeouts[kind] += 1
+                except Exception:
+                    errors[kind] += 1
+
+    async def lock_sampler():
+        async with await psycopg.AsyncConnection.connect(autocommit=True, **config.get_db_config()) as conn:
+            while not done.is_set():
+                cur = await conn.execute("SELECT count(*) FROM pg_stat_activity WHERE wait_event_type = 'Lock' AND datname = current_database()")
+                lock_samples.append((await cur.fetchone())[0])
+                await asyncio.sleep(0.1)
+
+    workers = [asyncio.create_task(session()) for _ in range(sessions)]
+    sampler = asyncio.create_task(lock_sampler())
+    start = time.perf_counter()
+    # Açık döngü: istekler önceki isteklerin bitmesini beklemeden zamanında kuyruğa girer
+    for t, kind, sql in schedule:
+        delay = start + t - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        queue.put_nowait((time.perf_counter(), kind, sql))
+    for _ in workers:
+        queue.put_nowait(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+
+    return {
+        "elapsed_s": elapsed,
+        "throughput": sum(len(v) for v in latencies.values()) / elapsed,
+        "select": latency_stats(latencies["SELECT"]),
+        "dml": latency_stats(latencies["DML"]),
+        "errors": errors,
+        "timeouts": timeouts,
+        "lock_waiters_avg": sum(lock_samples) / len(lock_samples) if lock_samples else 0,
+        "lock_waiters_max": max(lock_samples, default=0),
+    }
+
+def replay_config(conn, schedule, sessions, tables):
+    lsn_start, upd_start, hot_start = server_counters(conn, tables)
+    stats = asyncio.run(_replay(schedule, sessions))
+    # İstatistik sayaçları gecikmeli yazılır
+    time.sleep(1)
+    lsn_end, upd_end, hot_end = server_counters(conn, tables)
+    updates = upd_end - upd_start
+    stats["wal_bytes"] = wal_bytes(conn, lsn_start, lsn_end)
+    stats["hot_update_ratio"] = (hot_end - hot_start) / updates if updates else None
+    return stats
+
+def main():
+    parser = argparse.ArgumentParser(description="Eşzamanlı okuma/yazma çekişme tekrarı")
+    parser.add_argument("--rate", type=float, default=config.CONTENTION_RATE, help="Saniyedeki istek sayısı")
+    parser.add_argument("--sessions", type=int, default=config.CONTENTION_SESSIONS)
+    parser.add_argument("--duration", type=float, default=config.CONTENTION_DURATION, help="Saniye")
+    parser.add_argument("--write-ratio", type=float, default=config.CONTENTION_WRITE_RATIO)
+    parser.add_argument("--out", help="Sonuçları ayrıca JSON olarak yaz")
+    args = parser.parse_args()
+
+    if not postgres_only("Çekişme tekrarı"): return
+    try:
+        import psycopg
+    except ImportError:
+        print("Hata: Async tekrar için psycopg 3 gerekli (pip install psycopg).")
+        return
+
+    print(f"--- ÇEKİŞME TEKRARI (SF={config.SCALE_FACTOR}) ---")
+    try:
+        conn = get_executor().connect()
+    except Exception as e:
+        print(f"Bağlantı hatası: {e}")
+        return
+
+    schedule = build_schedule(args.rate, args.duration, args.write_ratio, config.CONTENTION_SEED)
+    key = run_key(schedule, args.sessions)
+    store = open_store()
+    candidates = load_candidates()
+    tables = {idx[1] for idx in candidates} | {"lineitem"}
+    print(f"{len(schedule)} istek | {args.sessions} oturum | {args.rate:.0f} istek/sn | {len(candidates)} aday")
+
+    report = {}
+    for idx in [None] + candidates:
+        name = idx[0] if idx else "base"
+        print(f"\n▶ {name}")
+        if idx: manage_index(conn, "CREATE", idx)
+        try:
+            stats = replay_config(conn, schedule, args.sessions, tables)
+        finally:
+            if idx: manage_index(conn, "DROP", idx)
+        put_contention(store, key, config_key(idx), stats)
+        report[name] = stats
+        slowdown = dml_slowdown(stats, report["base"])
+        print(f"   SELECT p95={stats['select'].get('p95', 0):.0f} ms | DML p95={stats['dml'].get('p95', 0):.0f} ms"
+              f" | WAL={stats['wal_bytes'] / 1024 ** 2:.1f} MB | kilit bekleyen≈{stats['lock_waiters_avg']:.1f}"
+              + (f" | DML yavaşlama x{slowdown:.2f}" if idx and slowdown else "")
+              + (f" | zaman aşımı {sum(stats['timeouts'].values())}" if any(stats["timeouts"].values()) else ""))
+
+    store.close()
+    conn.close()
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump({"run_key": key, "results": report}, f, indent=2)
+    print(f"\n✅ Sonuçlar depoya yazıldı ({config.RESULT_STORE}, run={key[:8]})")
+
+if __name__ == "__main__":
+    main()
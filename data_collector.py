@@ -1,68 +1,47 @@
-import psycopg2
 import json
 import time
 import os
 from workload import WorkloadGenerator
-
-DB_CONFIG = {
-    "dbname": "tpch_db",
-    "user": "postgres",
-    "password": "1991",
-    "host": "localhost",
-    "port": "5432"
-}
+from measurement import measure_query
+from stats_cache import get_table_stats, refresh_if_stale
+from executor import get_executor
 
 def get_db_connection():
+    # Bağlantı config.BACKEND arka ucundan (config.get_db_config() / gömülü dosya)
     try:
-        conn = psycopg2.connect(**DB_CONFIG)
-        conn.autocommit = True
-        return conn
+        return get_executor().connect()
     except Exception as e:
         print(f"Bağlantı hatası: {e}")
         return None
 
-def get_table_stats(conn, table_name):
-    try:
-        cur = conn.cursor()
-        sql = "SELECT reltuples::bigint, pg_size_pretty(pg_total_relation_size(oid)) FROM pg_class WHERE relname = %s"
-        cur.execute(sql, (table_name,))
-        res = cur.fetchone()
-        cur.close()
-        return res if res else (0, "0 MB")
-    except:
-        return 0, "Error"
-
-def analyze_query(conn, query_sql, query_type):
+def analyze_query(conn, query_sql, query_type, tables=()):
     try:
-        cur = conn.cursor()
+        cost, node_type = 0, "UPDATE (Heap Access)"
         if query_type == "SELECT":
-            cur.execute(f"EXPLAIN (ANALYZE, COSTS, FORMAT JSON) {query_sql}")
-            res = cur.fetchone()
-            plan = res[0][0]
-            exec_time = plan.get('Execution Time')
-            cost = plan['Plan'].get('Total Cost')
-            node_type = plan['Plan'].get('Node Type')
+            # Plan bilgisi EXPLAIN'den (arka ucun Postgres biçimli planı), süre ortak ölçüm motorundan (medyan)
+            plan = get_executor().explain(conn, query_sql)
+            cost = plan.get('Total Cost')
+            node_type = plan.get('Node Type')
             # Join tiplerini yakalamak için detay (Nested Loop, Hash Join vs)
-            if 'Plans' in plan['Plan']:
-                 child_node = plan['Plan']['Plans'][0].get('Node Type')
+            if 'Plans' in plan:
+                 child_node = plan['Plans'][0].get('Node Type')
                  node_type = f"{node_type} -> {child_node}"
-            return exec_time, cost, node_type
-        elif query_type == "UPDATE":
-            start = time.time()
-            cur.execute(query_sql)
-            exec_time = (time.time() - start) * 1000
-            return exec_time, 0, "UPDATE (Heap Access)"
+        result = measure_query(conn, query_sql, tables)
+        if result is None:
+            return None, None, "Error", None
+        return result["median"], cost, node_type, result.get("instrumentation")
     except Exception as e:
         print(f"Err: {e}")
-        return None, None, "Error"
-    finally:
-        cur.close()
+        return None, None, "Error", None
 
-def log_to_file(filename, set_name, q_idx, q_type, sql, meta, stats, time_ms, cost, node):
+def log_to_file(filename, set_name, q_idx, q_type, sql, meta, stats, time_ms, cost, node, inst=None):
     with open(filename, "a", encoding="utf-8") as f:
         f.write(f"--- {set_name} | Query #{q_idx+1} [{q_type}] ---\n")
         f.write(f"SQL: {sql[:150]}... \n")
         f.write(f"📊 Stats: Time={time_ms:.2f}ms | Cost={cost} | Method={node}\n")
+        if inst:
+            f.write(f"💽 I/O: hit={inst['shared_hit']} read={inst['shared_read']} temp={inst['temp_read']}/{inst['temp_written']} "
+                    f"WAL={inst['wal_bytes']}B" + (f" | max q-error={inst['max_q_error']:.1f}" if inst['max_q_error'] is not None else "") + "\n")
         f.write(f"ℹ️  Meta: Tables={meta['tables']} | JoinCount={meta['join_count']}\n")
         for tbl in meta['tables']:
             rows, size = stats.get(tbl, (0,'0'))
@@ -90,18 +69,21 @@ def main():
     for set_name, workload in scenarios:
         print(f"\n🚀 Başlatılıyor: {set_name}")
         
+        # Set başında tek sorguyla sürüm kontrolü (DML sonrası istatistikler değişmiş olabilir)
+        refresh_if_stale(conn)
+
         for i, (q_type, sql, meta) in enumerate(workload):
             print(f"   Running Q{i+1} [{q_type}]...", end="", flush=True)
             
-            # Tablo istatistiklerini al
+            # Tablo istatistiklerini al (önbellekten)
             current_stats = {tbl: get_table_stats(conn, tbl) for tbl in meta.get('tables', [])}
             
             # Çalıştır
-            t_ms, cost, node = analyze_query(conn, sql, q_type)
+            t_ms, cost, node, inst = analyze_query(conn, sql, q_type, meta.get('tables', []))
             
             if t_ms is not None:
                 print(f" Done! {t_ms:.2f}ms ({node})")
-                log_to_file(result_file, set_name, i, q_type, sql, meta, current_stats, t_ms, cost, node)
+                log_to_file(result_file, set_name, i, q_type, sql, meta, current_stats, t_ms, cost, node, inst)
             else:
                 print(" Fail.")
                 
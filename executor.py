@@ -0,0 +1,351 @@
+import os
+import json
+import threading
+import config
+
+# --- ÇALIŞTIRMA ARKA UCU (config.BACKEND) ---
+# Ölçüm (measurement.py), indeks kurma/silme (manage_index), plan (EXPLAIN) ve
+# katalog istatistikleri (stats_cache.py, result_cache.py) bu arayüz üzerinden yapılır:
+#   "postgres": config.get_db_config() sunucusu (HypoPG, paralel işçi, PREPARE, EXPLAIN ANALYZE)
+#   "duckdb"  : dbgen çıktısından küçük ölçekte yüklenmiş gömülü dosya (tpch_loader.py).
+#               Sunucu gerekmez; topla -> eğit -> öner hattı saniyeler içinde uçtan uca koşar.
+# Plan her iki arka uçta da Postgres EXPLAIN (FORMAT JSON) biçiminde döner, böylece
+# plan_features ve whatif değişmeden çalışır. Sürücüler (psycopg2 / duckdb) ilk kullanımda yüklenir.
+
+STATS_COLUMNS_SQL = "SELECT tablename, attname, n_distinct FROM pg_stats WHERE schemaname = 'public'"
+STATS_TABLES_SQL = """SELECT relname, reltuples::bigint, pg_total_relation_size(oid), pg_size_pretty(pg_total_relation_size(oid))
+                      FROM pg_class WHERE relkind IN ('r', 'p') AND relnamespace = 'public'::regnamespace"""
+STATS_INDEXES_SQL = """SELECT c.relname, t.relname, pg_relation_size(c.oid)
+                       FROM pg_index i JOIN pg_class c ON c.oid = i.indexrelid JOIN pg_class t ON t.oid = i.indrelid
+                       WHERE t.relnamespace = 'public'::regnamespace"""
+# Birincil / tekil indekslerin anahtar kolonları (INCLUDE ve kısmi indeksler hariç), sırasıyla
+UNIQUE_KEYS_SQL = """
+    SELECT t.relname, array_agg(a.attname::text ORDER BY k.ord)
+    FROM pg_index i JOIN pg_class t ON t.oid = i.indrelid
+    CROSS JOIN LATERAL unnest(i.indkey) WITH ORDINALITY k(attnum, ord)
+    JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = k.attnum
+    WHERE i.indisunique AND i.indpred IS NULL AND k.ord <= i.indnkeyatts
+      AND t.relnamespace = 'public'::regnamespace
+    GROUP BY i.indexrelid, t.relname
+"""
+
+VERSION_SQL = """
+    SELECT s.relname,
+           greatest(s.last_analyze, s.last_autoanalyze)::text,
+           s.n_tup_ins + s.n_tup_upd + s.n_tup_del,
+           (SELECT string_agg(i.indexrelid::text, ',' ORDER BY i.indexrelid) FROM pg_index i WHERE i.indrelid = s.relid)
+    FROM pg_stat_user_tables s
+"""
+
+# Veri sürümü: son ANALYZE + relpages/reltuples + ANALYZE'den beri değişen satır sayısı.
+# n_mod_since_analyze yalnızca COMMIT edilen değişiklikleri sayar: RF1/RF2 ve ANALYZE'siz DML
+# sürümü değiştirir, geri alınan (ROLLBACK) ölçüm DML'i değiştirmez
+SIGNATURE_SQL = """
+    SELECT s.relname,
+           greatest(s.last_analyze, s.last_autoanalyze)::text,
+           (SELECT c.relpages || ':' || c.reltuples::bigint FROM pg_class c WHERE c.oid = s.relid) || ':' || s.n_mod_since_analyze,
+           (SELECT string_agg(d.def, '; ' ORDER BY d.def)
+            FROM (SELECT regexp_replace(pg_get_indexdef(i.indexrelid), '^CREATE (UNIQUE )?INDEX \\S+ ', 'CREATE \\1INDEX ') AS def
+                  FROM pg_index i WHERE i.indrelid = s.relid) d)
+    FROM pg_stat_user_tables s
+    WHERE s.relname = ANY(%s)
+    ORDER BY s.relname
+"""
+
+# DuckDB fiziksel operatörü -> Postgres düğüm tipi (plan_features'ın saydığı adlar)
+DUCKDB_NODES = {
+    "SEQ_SCAN": "Seq Scan", "TABLE_SCAN": "Seq Scan",
+    "HASH_JOIN": "Hash Join", "PIECEWISE_MERGE_JOIN": "Merge Join",
+    "NESTED_LOOP_JOIN": "Nested Loop", "BLOCKWISE_NL_JOIN": "Nested Loop", "CROSS_PRODUCT": "Nested Loop",
+    "ORDER_BY": "Sort", "TOP_N": "Sort",
+    "HASH_GROUP_BY": "Aggregate", "PERFECT_HASH_GROUP_BY": "Aggregate", "UNGROUPED_AGGREGATE": "Aggregate",
+    "UPDATE": "ModifyTable", "DELETE": "ModifyTable", "INSERT": "ModifyTable",
+}
+# DuckDB extra_info anahtarı -> Postgres koşul anahtarı (plan_features.CONDITION_KEYS)
+DUCKDB_KEYS = {"Filters": "Filter", "Conditions": "Hash Cond", "Groups": "Group Key", "Order By": "Sort Key"}
+
+class PostgresExecutor:
+    name = "postgres"
+    parallel = True
+    whatif = True
+    prepared = True
+    instrument = True
+
+    def connect(self):
+        import psycopg2
+        conn = psycopg2.connect(**config.get_db_config())
+        conn.autocommit = True
+        return conn
+
+    @property
+    def timeout_error(self):
+        import psycopg2
+        return psycopg2.extensions.QueryCanceledError
+
+    def set_timeout(self, cur, ms):
+        cur.execute(f"SET statement_timeout = {max(int(ms), 1)};")
+
+    def clear_timeout(self, cur):
+        cur.execute("SET statement_timeout = 0;")
+
+    def execute(self, cur, sql):
+        cur.execute(sql)
+        if cur.description:
+            cur.fetchall()
+
+    def prewarm(self, conn, tables):
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_prewarm;")
+            for tbl in tables:
+                cur.execute("SELECT pg_prewarm(%s)", (tbl,))
+            cur.close()
+        except Exception as e:
+            print(f"\n   ⚠️ pg_prewarm hatası: {e}")
+
+    def evict(self, conn, tables):
+        # PG17+ pg_buffercache_evict ile tablonun shared buffer sayfaları boşaltılır.
+        # İşletim sistemi sayfa önbelleği SQL'den temizlenemez.
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_buffercache;")
+            for tbl in tables:
+                cur.execute("""SELECT count(pg_buffercache_evict(bufferid)) FROM pg_buffercache
+                               WHERE relfilenode = pg_relation_filenode(%s::regclass)""", (tbl,))
+            cur.close()
+        except Exception as e:
+            print(f"\n   ⚠️ Buffer boşaltma hatası: {e}")
+
+    def explain(self, conn, sql):
+        cur = conn.cursor()
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = cur.fetchone()[0][0]["Plan"]
+        cur.close()
+        return plan
+
+    def supports(self, index_def):
+        return True
+
+    def create_index(self, conn, index_def):
+        from candidate_generator import index_ddl, index_method
+        from partitioning import create_partitioned
+        cur = conn.cursor()
+        cur.execute("SET statement_timeout = 0;")
+        if index_method(index_def) == "partition":
+            create_partitioned(conn, index_def)
+        else:
+            cur.execute(index_ddl(index_def))
+        cur.close()
+
+    def index_size(self, conn, index_def):
+        from candidate_generator import index_method
+        from partitioning import partitioned_size
+        if index_method(index_def) == "partition":
+            return partitioned_size(conn, index_def)
+        cur = conn.cursor()
+        cur.execute("SELECT pg_relation_size(%s::regclass)", (index_def[0],))
+        size = cur.fetchone()[0]
+        cur.close()
+        return size
+
+    def drop_index(self, conn, index_def):
+        from candidate_generator import index_method
+        from partitioning import drop_partitioned
+        cur = conn.cursor()
+        cur.execute("SET statement_timeout = 0;")
+        if index_method(index_def) == "partition":
+            drop_partitioned(conn, index_def)
+        else:
+            cur.execute(f"DROP INDEX IF EXISTS {index_def[0]}")
+        cur.close()
+
+    def load_stats(self, conn):
+        # Dönüş: ({(tablo, kolon): n_distinct}, {tablo: (satır, bayt, okunur boyut)}, {indeks: (tablo, bayt)})
+        cur = conn.cursor()
+        cur.execute(STATS_COLUMNS_SQL)
+        columns = {(t, c): n for t, c, n in cur.fetchall()}
+        cur.execute(STATS_TABLES_SQL)
+        tables = {name: (rows, size, pretty) for name, rows, size, pretty in cur.fetchall()}
+        cur.execute(STATS_INDEXES_SQL)
+        indexes = {name: (table, size) for name, table, size in cur.fetchall()}
+        cur.close()
+        return columns, tables, indexes
+
+    def unique_keys(self, conn):
+        # Dönüş: [(tablo, (kolon1, kolon2, ...)), ...] (PK ve tekil indeksler)
+        cur = conn.cursor()
+        cur.execute(UNIQUE_KEYS_SQL)
+        keys = [(table, tuple(columns)) for table, columns in cur.fetchall()]
+        cur.close()
+        return keys
+
+    def data_version(self, conn):
+        cur = conn.cursor()
+        cur.execute(VERSION_SQL)
+        version = {row[0]: row[1:] for row in cur.fetchall()}
+        cur.close()
+        return version
+
+    def table_signature(self, conn, tables):
+        # Dönüş: [(tablo, son ANALYZE, sayfa:satır:değişen satır, isimsiz indeks tanımları), ...]
+        cur = conn.cursor()
+        cur.execute(SIGNATURE_SQL, (sorted(set(tables)),))
+        rows = cur.fetchall()
+        cur.close()
+        return rows
+
+def duckdb_plan(node):
+    # DuckDB EXPLAIN (FORMAT JSON) düğümü -> Postgres plan sözlüğü
+    info = node.get("extra_info", {})
+    children = [duckdb_plan(child) for child in node.get("children", [])]
+    name = node["name"].strip()
+    rows = int(info.get("Estimated Cardinality") or 0)
+    plan = {"Node Type": "Index Scan" if info.get("Type") == "Index Scan" else DUCKDB_NODES.get(name, name),
+            "Plan Rows": rows,
+            # DuckDB maliyet modeli dışa vermez: alt ağaçtaki tahmini satır toplamı maliyet yerine geçer
+            "Total Cost": rows + sum(child["Total Cost"] for child in children),
+            "Plans": children}
+    if info.get("Table"):
+        plan["Relation Name"] = info["Table"].split(".")[-1]
+    if info.get("Join Type"):
+        plan["Join Type"] = info["Join Type"].title()
+    for key, pg_key in DUCKDB_KEYS.items():
+        value = info.get(key)
+        if value:
+            plan[pg_key] = " AND ".join(value) if isinstance(value, list) else value
+    return plan
+
+class DuckDBExecutor:
+    name = "duckdb"
+    # Dosya tek yazıcı süreçle açılabilir: paralel işçi yok. HypoPG, PREPARE/EXECUTE ve
+    # pg_stat_statements karşılığı yok; ölçümler literal SQL ile yapılır.
+    parallel = False
+    whatif = False
+    prepared = False
+    instrument = False
+
+    def __init__(self):
+        self.limits = {}
+        self.sizes = {}
+
+    def connect(self):
+        import duckdb
+        if not os.path.exists(config.DB_NAME):
+            raise FileNotFoundError(f"{config.DB_NAME} bulunamadı: önce 'python tpch_loader.py' ile yükleyin")
+        return duckdb.connect(config.DB_NAME)
+
+    @property
+    def timeout_error(self):
+        import duckdb
+        return duckdb.InterruptException
+
+    def set_timeout(self, cur, ms):
+        self.limits[id(cur)] = max(int(ms), 1)
+
+    def clear_timeout(self, cur):
+        self.limits.pop(id(cur), None)
+
+    def execute(self, cur, sql):
+        # statement_timeout karşılığı: süre dolunca sorgu interrupt() ile kesilir
+        limit = self.limits.get(id(cur))
+        timer = threading.Timer(limit / 1000, cur.interrupt) if limit else None
+        if timer:
+            timer.start()
+        try:
+            cur.execute(sql)
+            if cur.description:
+                cur.fetchall()
+        finally:
+            if timer:
+                timer.cancel()
+
+    def prewarm(self, conn, tables):
+        # Gömülü dosya küçüktür; ısınma koşuları tabloları belleğe almaya yeter
+        pass
+
+    def evict(self, conn, tables):
+        # DuckDB buffer yöneticisini SQL'den boşaltmanın yolu yok: "cold" modu "warm" gibi davranır
+        pass
+
+    def explain(self, conn, sql):
+        cur = conn.cursor()
+        cur.execute(f"EXPLAIN (FORMAT JSON) {sql}")
+        plan = json.loads(cur.fetchone()[1])[0]
+        cur.close()
+        return duckdb_plan(plan)
+
+    def supports(self, index_def):
+        # ART indeksi: INCLUDE, BRIN, kısmi indeks ve bölümleme karşılığı yok
+        from candidate_generator import index_include, index_method, index_predicate
+        return index_method(index_def) == "btree" and not index_include(index_def) and not index_predicate(index_def)
+
+    def _used_bytes(self, conn):
+        conn.execute("CHECKPOINT")
+        used, block = conn.execute("SELECT used_blocks, block_size FROM pragma_database_size()").fetchone()
+        return used * block
+
+    def create_index(self, conn, index_def):
+        from candidate_generator import index_ddl
+        # Boyut, kurulum öncesi ve sonrası dosyada kullanılan blok farkıdır
+        self.sizes[index_def[0]] = self._used_bytes(conn)
+        conn.execute(index_ddl(index_def))
+
+    def index_size(self, conn, index_def):
+        return max(self._used_bytes(conn) - self.sizes.pop(index_def[0], 0), 0)
+
+    def drop_index(self, conn, index_def):
+        conn.execute(f"DROP INDEX IF EXISTS {index_def[0]}")
+
+    def load_stats(self, conn):
+        # n_distinct yerine SUMMARIZE'ın yaklaşık farklı değer sayısı; boyut depolama bloklarından
+        columns, tables, indexes = {}, {}, {}
+        block = conn.execute("SELECT block_size FROM pragma_database_size()").fetchone()[0]
+        for table, rows in conn.execute("SELECT table_name, estimated_size FROM duckdb_tables()").fetchall():
+            for column, distinct in conn.execute(f"SELECT column_name, approx_unique FROM (SUMMARIZE {table})").fetchall():
+                columns[(table, column)] = distinct
+            size = conn.execute(f"SELECT count(DISTINCT block_id) FROM pragma_storage_info('{table}')").fetchone()[0] * block
+            tables[table] = (rows, size, f"{size // 1024} kB")
+        for name, table in conn.execute("SELECT index_name, table_name FROM duckdb_indexes()").fetchall():
+            indexes[name] = (table, 0)
+        return columns, tables, indexes
+
+    def unique_keys(self, conn):
+        # Gömülü yükleyici dss.ri kısıtlarını kurmaz; tanımlanmışsa PRIMARY KEY / UNIQUE kısıtları
+        return [(table, tuple(columns)) for table, columns in conn.execute("""
+            SELECT table_name, constraint_column_names FROM duckdb_constraints()
+            WHERE constraint_type IN ('PRIMARY KEY', 'UNIQUE')""").fetchall()]
+
+    def data_version(self, conn):
+        # DuckDB değişiklik sayacı tutmaz: satır sayısı + indeks listesi sürüm damgasıdır
+        return {table: (None, rows, indexes) for table, rows, indexes in conn.execute("""
+            SELECT t.table_name, t.estimated_size,
+                   (SELECT string_agg(i.index_name, ',' ORDER BY i.index_name) FROM duckdb_indexes() i WHERE i.table_name = t.table_name)
+            FROM duckdb_tables() t""").fetchall()}
+
+    def table_signature(self, conn, tables):
+        rows = conn.execute("""
+            SELECT t.table_name, NULL, t.estimated_size,
+                   (SELECT string_agg(d.def, '; ' ORDER BY d.def)
+                    FROM (SELECT regexp_replace(i.sql, '^CREATE (UNIQUE )?INDEX \\S+ ', 'CREATE \\1INDEX ') AS def
+                          FROM duckdb_indexes() i WHERE i.table_name = t.table_name) d)
+            FROM duckdb_tables() t WHERE list_contains(?, t.table_name)
+            ORDER BY t.table_name""", (sorted(set(tables)),)).fetchall()
+        return rows
+
+def postgres_only(tool):
+    # HypoPG, RF1/RF2, WAL sayaçları ve async oturumlar gibi sunucu özelliklerine dayanan araçlar
+    if config.BACKEND == "postgres":
+        return True
+    print(f"Hata: {tool} yalnızca Postgres arka ucunda çalışır (BACKEND={config.BACKEND}, TPCH_BACKEND=postgres ile çalıştırın).")
+    return False
+
+_executors = {"postgres": PostgresExecutor, "duckdb": DuckDBExecutor}
+_executor = None
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        if config.BACKEND not in _executors:
+            raise ValueError(f"Bilinmeyen arka uç: {config.BACKEND} ({', '.join(_executors)})")
+        _executor = _executors[config.BACKEND]()
+    return _executor
@@ -0,0 +1,138 @@
+import os
+import json
+import math
+import numpy as np
+import config
+
+# --- HIZLI BAŞLANGIÇLI ÇIKARIM (pickle / xgboost / sklearn / pandas olmadan) ---
+# model_trainer eğitimden sonra MultiOutputClassifier içindeki her XGBoost
+# ağacını düz dizilere açar ve tek bir .npz dosyasına yazar:
+#   feature / threshold / left / right / missing / value : (etiket, ağaç, düğüm)
+#   base_margin : (etiket,)   meta : özellik, etiket, aday listesi ve eşikler (JSON)
+# FastModel yalnızca NumPy ile yükler ve predict_proba'yı MultiOutputClassifier
+# ile aynı biçimde döndürür: etiket başına (satır, 2) olasılık dizisi.
+# Regresyon modelinde (MODEL_MODE = "regress") predict MultiOutputRegressor gibi (satır, hedef) döner.
+# Bölme kuralı XGBoost ile aynıdır: x < eşik -> sol, NaN -> missing, float32 karşılaştırma.
+
+def _flatten_tree(tree, feature_index):
+    # get_dump(json) iç içe düğümleri -> nodeid ile indekslenen diziler
+    nodes = {}
+    stack = [(tree, 0)]
+    depth = 0
+    while stack:
+        node, d = stack.pop()
+        nodes[node["nodeid"]] = node
+        depth = max(depth, d)
+        for child in node.get("children", []):
+            stack.append((child, d + 1))
+    size = max(nodes) + 1
+    arrays = {"feature": np.full(size, -1, dtype=np.int32), "threshold": np.zeros(size, dtype=np.float32),
+              "left": np.zeros(size, dtype=np.int32), "right": np.zeros(size, dtype=np.int32),
+              "missing": np.zeros(size, dtype=np.int32), "value": np.zeros(size, dtype=np.float32)}
+    for nid, node in nodes.items():
+        if "leaf" in node:
+            arrays["value"][nid] = node["leaf"]
+            continue
+        arrays["feature"][nid] = feature_index[node["split"]]
+        arrays["threshold"][nid] = node["split_condition"]
+        arrays["left"][nid] = node["yes"]
+        arrays["right"][nid] = node["no"]
+        arrays["missing"][nid] = node["missing"]
+    return arrays, depth
+
+def _base_margin(booster):
+    # binary:logistic için base_score olasılıktır; marj = logit(base_score)
+    # reg:squarederror için base_score doğrudan marjdır
+    learner = json.loads(booster.save_config())["learner"]
+    param = learner["learner_model_param"]["base_score"]
+    if learner["objective"]["name"] != "binary:logistic":
+        return float(str(param).strip("[]"))
+    # Tek sınıflı etiketlerde base_score 0/1 olabilir: sonsuz marjdan kaçın
+    p = min(max(float(str(param).strip("[]")), 1e-7), 1 - 1e-7)
+    return math.log(p / (1 - p))
+
+def export_fast_model(model, features, labels, candidates, path=None):
+    feature_index = {name: i for i, name in enumerate(features)}
+    feature_index.update({f"f{i}": i for i in range(len(features))})
+
+    trees, margins, depth = [], [], 0
+    for estimator in model.estimators_:
+        booster = estimator.get_booster()
+        label_trees = []
+        for dump in booster.get_dump(dump_format="json"):
+            arrays, d = _flatten_tree(json.loads(dump), feature_index)
+            label_trees.append(arrays)
+            depth = max(depth, d)
+        trees.append(label_trees)
+        margins.append(_base_margin(booster))
+
+    # Tüm ağaçlar aynı boyuta doldurulur: (etiket, ağaç, düğüm)
+    n_trees = max(len(t) for t in trees)
+    n_nodes = max(len(a["feature"]) for t in trees for a in t)
+    packed = {"feature": np.full((len(trees), n_trees, n_nodes), -1, dtype=np.int32)}
+    for key, dtype in [("threshold", np.float32), ("left", np.int32), ("right", np.int32),
+                       ("missing", np.int32), ("value", np.float32)]:
+        packed[key] = np.zeros((len(trees), n_trees, n_nodes), dtype=dtype)
+    for i, label_trees in enumerate(trees):
+        for j, arrays in enumerate(label_trees):
+            for key, values in arrays.items():
+                packed[key][i, j, :len(values)] = values
+
+    meta = {"features": list(features), "labels": list(labels),
+            "candidates": [list(c) for c in candidates], "depth": depth,
+            "thresholds": getattr(model, "thresholds_", {}), "kind": getattr(model, "kind_", "classify")}
+    path = path or config.FAST_MODEL_FILE
+    np.savez(path, base_margin=np.array(margins, dtype=np.float64), meta=np.array(json.dumps(meta)), **packed)
+    return path
+
+class FastModel:
+    def __init__(self, path=None):
+        data = np.load(path or config.FAST_MODEL_FILE, allow_pickle=False)
+        self.arrays = {key: data[key] for key in ("feature", "threshold", "left", "right", "missing", "value")}
+        self.base_margin = data["base_margin"]
+        meta = json.loads(str(data["meta"]))
+        self.features = meta["features"]
+        self.labels = meta["labels"]
+        self.candidates = [tuple(c) for c in meta["candidates"]]
+        self.depth = meta["depth"]
+        # model_trainer'ın etiket başına ayarladığı öneri eşikleri
+        self.thresholds_ = meta.get("thresholds", {})
+        self.kind_ = meta.get("kind", "classify")
+
+    def margins(self, X):
+        # Dönüş: (etiket, satır) ham marjlar; tüm ağaçlar ve satırlar birlikte ilerletilir
+        X = np.asarray(X, dtype=np.float32)
+        if X.ndim == 1:
+            X = X[None, :]
+        a = self.arrays
+        n_labels, n_trees, _ = a["feature"].shape
+        rows = np.arange(len(X))[None, :]
+        trees = np.arange(n_trees)[:, None]
+        out = np.empty((n_labels, len(X)))
+        for i in range(n_labels):
+            feature, threshold = a["feature"][i], a["threshold"][i]
+            node = np.zeros((n_trees, len(X)), dtype=np.int32)
+            for _ in range(self.depth):
+                f = feature[trees, node]
+                x = X[rows, np.maximum(f, 0)]
+                step = np.where(np.isnan(x), a["missing"][i][trees, node],
+                                np.where(x < threshold[trees, node], a["left"][i][trees, node], a["right"][i][trees, node]))
+                node = np.where(f >= 0, step, node)
+            out[i] = a["value"][i][trees, node].sum(axis=0) + self.base_margin[i]
+        return out
+
+    def predict(self, X):
+        # Regresyon: MultiOutputRegressor ile aynı (satır, hedef) dizisi
+        return self.margins(X).T
+
+    def predict_proba(self, X):
+        # MultiOutputClassifier ile aynı: etiket başına (satır, 2) dizisi
+        p = 1 / (1 + np.exp(-self.margins(X)))
+        return [np.column_stack([1 - row, row]) for row in p]
+
+def is_fresh(path=None):
+    # Hızlı model, pickle modelden eski değilse kullanılabilir
+    path = path or config.FAST_MODEL_FILE
+    if not os.path.exists(path):
+        return False
+    return not os.path.exists(config.MODEL_FILE) or os.path.getmtime(path) >= os.path.getmtime(config.MODEL_FILE)
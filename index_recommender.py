@@ -1,123 +1,383 @@
-import psycopg2
-import pandas as pd
-import joblib
-import time
+import numpy as np
 import os
-from workload import WorkloadGenerator
+import sys
+import json
+import time
+import argparse
+import threading
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
 import config # YENİ
+from fast_model import FastModel, is_fresh
+from plan_features import extract_plan_features
+from stats_cache import refresh_if_stale
+from executor import get_executor
+from candidate_generator import load_candidates, index_columns, index_method, index_predicate
+from result_store import open_store, config_key, latest_contention, dml_slowdown, get_build, BASE_CONFIG
 
-def measure_time(conn, sql):
-    cur = conn.cursor()
-    start = time.time()
-    cur.execute(sql)
-    elapsed = (time.time() - start) * 1000
-    cur.close()
-    return elapsed
-
-def get_column_stats(conn, table, column):
-    try:
-        cur = conn.cursor()
-        cur.execute(f"SELECT n_distinct FROM pg_stats WHERE tablename = '{table}' AND attname = '{column}'")
-        res = cur.fetchone()
-        cur.close()
-        if res and res[0]:
-            return res[0] if res[0] > 0 else 100000 
-        return 1000
-    except: return 0
-
-def main():
-    print(f"--- AKILLI ÖNERİ SİSTEMİ (SF={config.SCALE_FACTOR}) ---")
-    
+def load_model():
+    # Önce düz ağaç dizileri: pickle, xgboost, sklearn ve pandas hiç yüklenmez
+    if config.USE_FAST_MODEL and is_fresh():
+        model = FastModel()
+        return model, model.features, model.labels, model.candidates
     if not os.path.exists(config.MODEL_FILE):
         print(f"Hata: {config.MODEL_FILE} bulunamadı.")
-        return
-
+        return None
+    import joblib
     # Model ve Ayarları Yükle
     model = joblib.load(config.MODEL_FILE)
     features_col = joblib.load(config.META_FEATURES)
     labels_col = joblib.load(config.META_LABELS)
-    
-    # DB Bağlantısı
+    candidates = joblib.load(config.META_CANDIDATES) if os.path.exists(config.META_CANDIDATES) else load_candidates()
+    return model, features_col, labels_col, candidates
+
+def load_contention(candidates):
+    # contention_replay.py sonuçları: {indeks adı: DML p95 yavaşlama katı}
+    if not os.path.exists(config.RESULT_STORE):
+        return {}
+    store = open_store()
+    contention = latest_contention(store)
+    store.close()
+    base = contention.get(BASE_CONFIG)
+    slowdowns = {}
+    for idx in candidates:
+        slowdown = dml_slowdown(contention.get(config_key(idx)), base)
+        if slowdown is not None:
+            slowdowns[idx[0]] = slowdown
+    return slowdowns
+
+def load_builds(candidates):
+    # Toplayıcının ölçtüğü kurulum süresi / boyut: {indeks adı: {"build_ms", "size_bytes"}}
+    if not os.path.exists(config.RESULT_STORE):
+        return {}
+    store = open_store()
+    builds = {idx[0]: get_build(store, config_key(idx)) for idx in candidates}
+    store.close()
+    return {name: build for name, build in builds.items() if build}
+
+def get_connection():
     try:
-        conn = psycopg2.connect(**config.get_db_config())
-        conn.autocommit = True
-    except:
-        print("DB Bağlantı Hatası!")
+        return get_executor().connect()
+    except Exception as e:
+        print(f"DB Bağlantı Hatası! {e}")
+        return None
+
+def recommend_matrix(model, labels_col, candidates, X, slowdowns=None):
+    # Tek predict_proba çağrısıyla tüm satırlar skorlanır.
+    # Dönüş: her satır için [(indeks tanımı, olasılık), ...]
+    # Eşzamanlı yazma yükünde DML'i fazla yavaşlatan indeksler önerilmez
+    slowdowns = slowdowns or {}
+    if model_kind(model) == "regress":
+        return [prefer_structures(recs) for recs in recommend_savings(model, labels_col, candidates, X, slowdowns)]
+    # Label isminden indeks tanımını bulmak için aday listesi sözlüğe çevrilir
+    idx_map = {f"label_{x[0]}": x for x in candidates}
+    probs = model.predict_proba(X)
+    # Eğitimde etiket başına ayarlanan eşik; eski modellerde genel eşik
+    thresholds = getattr(model, "thresholds_", {})
+
+    results = [[] for _ in range(len(X))]
+    for i, prob_array in enumerate(probs):
+        label_name = labels_col[i]
+        if label_name not in idx_map: continue
+        if slowdowns.get(idx_map[label_name][0], 0) > config.CONTENTION_MAX_DML_SLOWDOWN: continue
+        for j in np.nonzero(prob_array[:, 1] >= thresholds.get(label_name, config.RECOMMEND_THRESHOLD))[0]:
+            results[j].append((idx_map[label_name], float(prob_array[j, 1])))
+    # Olasılıklar kazanç büyüklüğü değildir: yapı/B-tree seçimi yalnızca regresyon modunda yapılır
+    return results
+
+def is_plain_btree(index_def):
+    return index_method(index_def) == "btree" and not index_predicate(index_def)
+
+def prefer_structures(recs):
+    # BRIN / kısmi indeks / bölümleme, aynı tablo ve öncü kolondaki B-tree'yi
+    # en az onun kadar kazandırıyorsa (daha küçük yapı) B-tree yerine önerilir; aksi halde elenir.
+    # score tahmini kazanılan süredir (ms, base x (1 - oran)); olasılıklarla kullanılmaz
+    plain = [r for r in recs if is_plain_btree(r[0])]
+    drop = set()
+    for index_def, score in recs:
+        if is_plain_btree(index_def): continue
+        rivals = [p for p in plain if p[0][1] == index_def[1] and index_columns(p[0])[0] == index_columns(index_def)[0]]
+        if any(p[1] > score for p in rivals):
+            drop.add(index_def[0])
+        else:
+            drop.update(p[0][0] for p in rivals)
+    return [r for r in recs if r[0][0] not in drop]
+
+def model_kind(model):
+    # Eski modellerde kind_ yoktur: sınıflandırıcı
+    return getattr(model, "kind_", "classify")
+
+def recommend_savings(model, labels_col, candidates, X, slowdowns):
+    # Regresyon modeli: beklenen kazanç = tahmini base süre x (1 - tahmini oran)
+    # Dönüş: her satır için kazanca göre azalan [(indeks tanımı, kazanılan ms), ...]
+    idx_map = {f"ratio_{x[0]}": x for x in candidates}
+    preds = model.predict(X)
+    base_ms = np.expm1(preds[:, labels_col.index("base_time")])
+    results = [[] for _ in range(len(X))]
+    for i, target in enumerate(labels_col):
+        if target not in idx_map: continue
+        if slowdowns.get(idx_map[target][0], 0) > config.CONTENTION_MAX_DML_SLOWDOWN: continue
+        ratio = np.clip(preds[:, i], 0, 1)
+        # İyileşme eşiği sınıflandırma etiketleriyle aynı anlamı taşır
+        for j in np.nonzero(ratio < config.IMPROVEMENT_THRESHOLD)[0]:
+            results[j].append((idx_map[target], float(base_ms[j] * (1 - ratio[j]))))
+    return [sorted(recs, key=lambda r: -r[1]) for recs in results]
+
+def rank_workload(results):
+    # İş yükü genelinde indeks başına toplam beklenen kazanç (ms), azalan sırada
+    totals = {}
+    for recs in results:
+        for index_def, saved in recs:
+            total, count = totals.get(index_def[0], (0.0, 0))
+            totals[index_def[0]] = (total + saved, count + 1)
+    return sorted(((name, total, count) for name, (total, count) in totals.items()), key=lambda r: -r[1])
+
+def rec_json(index_def, score, slowdowns=None, kind="classify", builds=None):
+    build = (builds or {}).get(index_def[0]) or {}
+    return {"index": index_def[0], "table": index_def[1], "columns": index_def[2],
+            "include": index_def[3] if len(index_def) > 3 and index_def[3] else None,
+            "method": index_method(index_def), "predicate": index_predicate(index_def),
+            ("saved_ms" if kind == "regress" else "probability"): score,
+            "dml_slowdown": (slowdowns or {}).get(index_def[0]),
+            "build_ms": build.get("build_ms"), "size_bytes": build.get("size_bytes")}
+
+def read_queries(path):
+    # .jsonl: her satır {"id": ..., "sql": ...} | .sql: ';' ile ayrılmış sorgular
+    queries = []
+    with open(path, encoding="utf-8") as f:
+        if path.endswith(".jsonl"):
+            for n, line in enumerate(f):
+                if not line.strip(): continue
+                item = json.loads(line)
+                queries.append((item.get("id", n), item["sql"]))
+        else:
+            for n, stmt in enumerate(s.strip() for s in f.read().split(";")):
+                if stmt: queries.append((n, stmt))
+    return queries
+
+def run_batch(path, out_path=None):
+    loaded = load_model()
+    if not loaded: return
+    model, features_col, labels_col, candidates = loaded
+    slowdowns = load_contention(candidates)
+    builds = load_builds(candidates)
+    conn = get_connection()
+    if not conn: return
+
+    queries = read_queries(path)
+    print(f"--- TOPLU ÖNERİ: {len(queries)} sorgu ({path}) ---", file=sys.stderr)
+
+    refresh_if_stale(conn)
+    ids, rows = [], []
+    for n, (q_id, sql) in enumerate(queries):
+        print(f"   [{n+1}/{len(queries)}] Plan özellikleri çıkarılıyor...", end="\r", file=sys.stderr)
+        features, _ = extract_plan_features(conn, sql)
+        if features is None: continue
+        ids.append(q_id)
+        rows.append([features.get(c, 0) for c in features_col])
+    conn.close()
+
+    if not rows:
+        print("\nHata: Skorlanabilir sorgu yok.", file=sys.stderr)
         return
 
+    start = time.perf_counter()
+    results = recommend_matrix(model, labels_col, candidates, np.array(rows, dtype=float), slowdowns)
+    elapsed = (time.perf_counter() - start) * 1000
+    print(f"\n   ✅ {len(rows)} sorgu tek çağrıda skorlandı: {elapsed:.1f} ms", file=sys.stderr)
+
+    if model_kind(model) == "regress":
+        print("   📊 İş yükü genelinde beklenen kazanç:", file=sys.stderr)
+        for name, total, count in rank_workload(results):
+            print(f"      {name:<40} {total:10.0f} ms ({count} sorgu)", file=sys.stderr)
+
+    out = open(out_path, "w", encoding="utf-8") if out_path else sys.stdout
+    for q_id, recs in zip(ids, results):
+        out.write(json.dumps({"id": q_id, "recommendations": [rec_json(r, p, slowdowns, model_kind(model), builds) for r, p in recs]}) + "\n")
+    if out_path: out.close()
+
+def score_features(text):
+    # DB'siz tek çağrı: {"özellik": değer, ...} JSON'u doğrudan skorlanır
+    loaded = load_model()
+    if not loaded: return
+    model, features_col, labels_col, candidates = loaded
+    slowdowns = load_contention(candidates)
+    builds = load_builds(candidates)
+    features = json.loads(text)
+    start = time.perf_counter()
+    recs = recommend_matrix(model, labels_col, candidates, np.array([[features.get(c, 0) for c in features_col]], dtype=float), slowdowns)[0]
+    print(json.dumps({"recommendations": [rec_json(r, p, slowdowns, model_kind(model), builds) for r, p in recs],
+                      "inference_ms": (time.perf_counter() - start) * 1000}))
+
+def model_mtime():
+    # Servis modunda çevrimiçi öğrenmenin yazdığı yeni sürümü fark etmek için
+    path = config.FAST_MODEL_FILE if config.USE_FAST_MODEL and os.path.exists(config.FAST_MODEL_FILE) else config.MODEL_FILE
+    return os.path.getmtime(path) if os.path.exists(path) else None
+
+def serve(port):
+    # Model bellekte kalır; POST /recommend {"sql": ...} veya {"features": {...}}
+    # POST /feedback {"sql" | "features", "base_ms", "indexes": {ad: ms}}: üretim ölçümü (online_learning.py)
+    loaded = load_model()
+    if not loaded: return
+    state = {"loaded": loaded, "mtime": model_mtime()}
+    slowdowns = load_contention(loaded[3])
+    builds = load_builds(loaded[3])
+    conn = get_connection()
+    if not conn: return
+    db_lock = threading.Lock()
+    model_lock = threading.Lock()
+
+    def current_model():
+        # Model dosyası değiştiyse (yeni sürüm / geri alma) yeniden yüklenir
+        with model_lock:
+            mtime = model_mtime()
+            if mtime != state["mtime"]:
+                state["loaded"] = load_model() or state["loaded"]
+                state["mtime"] = mtime
+            return state["loaded"]
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            if self.path not in ("/recommend", "/feedback"):
+                self.send_error(404)
+                return
+            try:
+                body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+                features = body.get("features")
+                if features is None:
+                    with db_lock:
+                        refresh_if_stale(conn)
+                        features, _ = extract_plan_features(conn, body["sql"])
+                if features is None:
+                    raise ValueError("Sorgu planı alınamadı")
+                if self.path == "/feedback":
+                    from online_learning import record_sample
+                    store = open_store()
+                    record_sample(store, "feed", body.get("sql"), features, body["base_ms"], body.get("indexes", {}))
+                    store.close()
+                    self.respond(200, {"recorded": True})
+                    return
+                model, features_col, labels_col, candidates = current_model()
+                start = time.perf_counter()
+                recs = recommend_matrix(model, labels_col, candidates, np.array([[features.get(c, 0) for c in features_col]], dtype=float), slowdowns)[0]
+                payload = {"recommendations": [rec_json(r, p, slowdowns, model_kind(model), builds) for r, p in recs],
+                           "inference_ms": (time.perf_counter() - start) * 1000}
+                code = 200
+            except Exception as e:
+                payload, code = {"error": str(e)}, 400
+            self.respond(code, payload)
+
+        def respond(self, code, payload):
+            data = json.dumps(payload).encode()
+            self.send_response(code)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", port), Handler)
+    print(f"--- ÖNERİ SERVİSİ: http://127.0.0.1:{port}/recommend ---")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        conn.close()
+
+def main():
+    from workload import WorkloadGenerator
+    from measurement import measure_time
+    from training_data_generator import manage_index
+    print(f"--- AKILLI ÖNERİ SİSTEMİ (SF={config.SCALE_FACTOR}) ---")
+
+    loaded = load_model()
+    if not loaded: return
+    model, features_col, labels_col, candidates = loaded
+
+    # DB Bağlantısı
+    conn = get_connection()
+    if not conn: return
+
     # Yeni Sorgu Üret
     gen = WorkloadGenerator()
     sql, meta = gen.generate_q6()
     print(f"\nSorgu Tipi: {meta['query_type_label']}")
     print(f"SQL: {sql[:80]}...")
 
-    # Canlı Feature Çıkarımı
-    col_distinct = 0
-    if meta.get("tables"):
-        tbl = meta["tables"][0]
-        col = "l_shipdate" if tbl == "lineitem" else "c_mktsegment"
-        col_distinct = get_column_stats(conn, tbl, col)
-
-    row = {
-        "query_type": 1,
-        "table_lineitem": 1 if "lineitem" in meta["tables"] else 0,
-        "table_orders": 1 if "orders" in meta["tables"] else 0,
-        "table_customer": 1 if "customer" in meta["tables"] else 0,
-        "join_count": meta.get("join_count", 0),
-        "filter_range_width": meta.get("filter_range_days", 0),
-        "col_distinct_count": col_distinct
-    }
-    
-    df = pd.DataFrame([row])[features_col]
-    
+    # Canlı Feature Çıkarımı (EXPLAIN planından, her SQL için çalışır)
+    row, _ = extract_plan_features(conn, sql)
+    if row is None:
+        print("Hata: Sorgu planı alınamadı.")
+        conn.close()
+        return
+
+    X = np.array([[row.get(c, 0) for c in features_col]], dtype=float)
+
     # Tahmin
     print("Analiz ediliyor...")
-    probs = model.predict_proba(df)
-    recs = []
-    
-    # Label isminden indeks tanımını bulmak için tersine mühendislik
-    # config.CANDIDATE_INDEXES listesini sözlüğe çevirelim
-    idx_map = {f"label_{x[0]}": x for x in config.CANDIDATE_INDEXES}
-
-    for i, prob_array in enumerate(probs):
-        if prob_array[0][1] > 0.4: # %40 eşik
-            label_name = labels_col[i]
-            if label_name in idx_map:
-                recs.append(idx_map[label_name])
+    recs = [r for r, _ in recommend_matrix(model, labels_col, candidates, X, load_contention(candidates))[0]]
 
     if not recs:
         print("❌ Öneri Yok (Mevcut yapı yeterli).")
     else:
         print(f"✅ Tavsiye: {[r[0] for r in recs]}")
-        
+
         # Test
         print("   -> Base ölçülüyor...", end="")
-        base = measure_time(conn, sql)
+        base = measure_time(conn, sql, meta["tables"])
+        if base is None:
+            print(" ölçülemedi.")
+            conn.close()
+            return
         print(f" {base:.0f} ms")
 
         print("   -> İndeksler kuruluyor...")
         for r in recs:
-            cur = conn.cursor()
-            cur.execute("SET statement_timeout = 0;")
-            cur.execute(f"CREATE INDEX IF NOT EXISTS {r[0]} ON {r[1]} ({r[2]})")
-            cur.close()
-        
+            manage_index(conn, "CREATE", r)
+
         print("   -> Optimize süre ölçülüyor...", end="")
-        opt = measure_time(conn, sql)
-        print(f" {opt:.0f} ms")
+        opt = measure_time(conn, sql, meta["tables"])
+        print(f" {opt:.0f} ms" if opt is not None else " ölçülemedi.")
 
         # Temizlik
         for r in recs:
-            cur = conn.cursor()
-            cur.execute(f"DROP INDEX IF EXISTS {r[0]}")
-            cur.close()
+            manage_index(conn, "DROP", r)
 
-        if base > opt:
+        if opt is None:
+            print("⚠️ Optimize süre alınamadı.")
+        elif base > opt:
             print(f"🚀 HIZLANMA: %{((base-opt)/base)*100:.1f}")
         else:
             print("⚠️ Hızlanma yok.")
 
+        # Doğrulama ölçümü çevrimiçi öğrenme için etiketli örnek olur. Birden fazla indeks
+        # birlikte kurulduysa süre tek bir indekse atanamaz: yalnızca base süre kaydedilir
+        if config.ONLINE_RECORD_VALIDATION and base and opt:
+            from online_learning import record_sample
+            store = open_store()
+            record_sample(store, "validation", sql, row, base, {recs[0][0]: opt} if len(recs) == 1 else {})
+            store.close()
+            print("   💾 Doğrulama sonucu örnek olarak kaydedildi.")
+
     conn.close()
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    parser = argparse.ArgumentParser(description="İndeks öneri sistemi")
+    parser.add_argument("--batch", help="Toplu mod: .jsonl veya .sql sorgu dosyası")
+    parser.add_argument("--out", help="Toplu mod çıktısı (JSONL, varsayılan: stdout)")
+    parser.add_argument("--serve", action="store_true", help="Modeli bellekte tutan HTTP servisi başlat")
+    parser.add_argument("--port", type=int, default=config.RECOMMEND_PORT)
+    parser.add_argument("--features", help="DB'siz skorlama: özellik sözlüğü (JSON)")
+    args = parser.parse_args()
+
+    if args.features:
+        score_features(args.features)
+    elif args.batch:
+        run_batch(args.batch, args.out)
+    elif args.serve:
+        serve(args.port)
+    else:
+        main()
@@ -0,0 +1,251 @@
+import os
+import sys
+import json
+import time
+import argparse
+import config
+from result_store import query_fingerprint, is_dml
+
+# --- ORTAK ÇALIŞTIRMA ENSTRÜMANTASYONU ---
+# measure_query her ölçümde tek tip bir kayıt üretir:
+#   "pgss"   : ölçülen koşuların pg_stat_statements farkı, koşu başına shared hit/read,
+#              temp I/O, WAL (her ölçümde; sorgu tekrar çalıştırılmaz)
+#   "explain": ölçümlerin INSTRUMENT_ANALYZE_SAMPLE kadarında ek bir
+#              EXPLAIN (ANALYZE, BUFFERS, WAL) koşusu; düğüm başına tahmini/gerçek satır (q-hatası)
+# Kayıtlar JSONL'e eklenir; OpenMetrics metin dosyası JSONL'den üretilir. Böylece bir
+# hızlanmanın daha az sayfa okumasından mı yoksa sıcak önbellekten mi geldiği, hangi
+# düğümde kardinalite hatası olduğu görülür. EXPLAIN ANALYZE sorguyu gerçekten
+# çalıştırır: DML BEGIN/ROLLBACK içinde koşar (veri ve kalıcı etki değişmez).
+
+PGSS_SQL = """
+SELECT coalesce(sum(calls), 0), coalesce(sum(total_exec_time), 0),
+       coalesce(sum(shared_blks_hit), 0), coalesce(sum(shared_blks_read), 0),
+       coalesce(sum(temp_blks_read), 0), coalesce(sum(temp_blks_written), 0),
+       coalesce(sum(wal_bytes), 0)
+FROM pg_stat_statements
+WHERE dbid = (SELECT oid FROM pg_database WHERE datname = current_database())
+"""
+PGSS_FIELDS = ["calls", "exec_time_ms", "shared_hit", "shared_read", "temp_read", "temp_written", "wal_bytes"]
+
+# OpenMetrics'e aktarılan kayıt alanları: (metrik adı, alan, açıklama)
+METRICS = [
+    ("tpch_query_execution_ms", "execution_ms", "Execution time (EXPLAIN ANALYZE or pg_stat_statements per run)"),
+    ("tpch_query_planning_ms", "planning_ms", "EXPLAIN ANALYZE planning time"),
+    ("tpch_query_shared_hit_blocks", "shared_hit", "Shared buffer hits"),
+    ("tpch_query_shared_read_blocks", "shared_read", "Shared blocks read from disk or OS cache"),
+    ("tpch_query_temp_read_blocks", "temp_read", "Temp blocks read"),
+    ("tpch_query_temp_written_blocks", "temp_written", "Temp blocks written"),
+    ("tpch_query_wal_bytes", "wal_bytes", "WAL bytes generated"),
+    ("tpch_query_max_q_error", "max_q_error", "Worst per-node row misestimate (q-error)"),
+]
+
+_pgss = {}
+
+def pgss_available(conn):
+    # Uzantı shared_preload_libraries'de değilse sessizce devre dışı kalır (bağlantı başına bir kez denenir)
+    key = id(conn)
+    if key not in _pgss:
+        try:
+            cur = conn.cursor()
+            cur.execute("CREATE EXTENSION IF NOT EXISTS pg_stat_statements;")
+            cur.execute(PGSS_SQL)
+            cur.close()
+            _pgss[key] = True
+        except Exception:
+            _pgss[key] = False
+    return _pgss[key]
+
+def pgss_snapshot(conn):
+    cur = conn.cursor()
+    cur.execute(PGSS_SQL)
+    row = cur.fetchone()
+    cur.close()
+    return dict(zip(PGSS_FIELDS, (float(v) for v in row)))
+
+def q_error(estimated, actual):
+    # max(tahmin/gerçek, gerçek/tahmin); 0 satırlar 1'e yuvarlanır
+    estimated, actual = max(estimated, 1), max(actual, 1)
+    return max(estimated / actual, actual / estimated)
+
+def plan_nodes(plan, out=None):
+    out = [] if out is None else out
+    loops = plan.get("Actual Loops", 1) or 1
+    estimated = plan.get("Plan Rows", 0) * loops
+    actual = plan.get("Actual Rows", 0) * loops
+    out.append({
+        "node": plan.get("Node Type"),
+        "relation": plan.get("Relation Name"),
+        "index": plan.get("Index Name"),
+        "estimated_rows": estimated,
+        "actual_rows": actual,
+        "loops": loops,
+        "q_error": q_error(estimated, actual),
+        "shared_hit": plan.get("Shared Hit Blocks", 0),
+        "shared_read": plan.get("Shared Read Blocks", 0),
+    })
+    for child in plan.get("Plans", []):
+        plan_nodes(child, out)
+    return out
+
+def _runner():
+    return os.path.splitext(os.path.basename(sys.argv[0] or "interactive"))[0]
+
+def _hit_ratio(record):
+    # Önbellek isabet oranı: hızlanma sayfa okumasından mı sıcak önbellekten mi?
+    pages = record["shared_hit"] + record["shared_read"]
+    return record["shared_hit"] / pages if pages else None
+
+def begin_runs(conn):
+    # Ölçülen koşulardan önceki pg_stat_statements anlık görüntüsü (uzantı yoksa None)
+    try:
+        return pgss_snapshot(conn) if pgss_available(conn) else None
+    except Exception as e:
+        print(f"\n   ⚠️ Enstrümantasyon hatası: {e}")
+        return None
+
+def end_runs(conn, sql, before, runs):
+    # Ölçülen koşuların koşu başına pgss farkı; kayıt JSONL'e eklenir
+    try:
+        after = pgss_snapshot(conn)
+        delta = {k: (after[k] - before[k]) / max(runs, 1) for k in PGSS_FIELDS}
+        record = {
+            "ts": time.time(),
+            "runner": _runner(),
+            "source": "pgss",
+            "fingerprint": query_fingerprint(sql),
+            "sql": sql[:200],
+            "runs": runs,
+            "execution_ms": delta["exec_time_ms"],
+            "planning_ms": None,
+            "shared_hit": delta["shared_hit"],
+            "shared_read": delta["shared_read"],
+            "temp_read": delta["temp_read"],
+            "temp_written": delta["temp_written"],
+            "wal_bytes": delta["wal_bytes"],
+            "indexes_used": [],
+            "max_q_error": None,
+            "nodes": [],
+            # Veritabanı geneli fark: eşzamanlı oturumlar varsa gürültü içerir
+            "pgss_delta": delta,
+        }
+        record["hit_ratio"] = _hit_ratio(record)
+        append_record(record)
+        return record
+    except Exception as e:
+        print(f"\n   ⚠️ Enstrümantasyon hatası: {e}")
+        return None
+
+def instrument(conn, sql, statement=None):
+    # sql: parmak izi için literal SQL, statement: çalıştırılan biçim (örn. EXECUTE tpch_q6 (...))
+    statement = statement or sql
+    use_pgss = pgss_available(conn)
+    before = pgss_snapshot(conn) if use_pgss else None
+    dml = is_dml(sql)
+    cur = conn.cursor()
+    if dml:
+        cur.execute("BEGIN")
+    try:
+        cur.execute(f"EXPLAIN (ANALYZE, BUFFERS, WAL, FORMAT JSON) {statement}")
+        explain = cur.fetchone()[0][0]
+    finally:
+        if dml:
+            cur.execute("ROLLBACK")
+        cur.close()
+    after = pgss_snapshot(conn) if use_pgss else None
+
+    # Kök düğümdeki sayaçlar alt düğümleri (ve paralel işçileri) kapsar
+    plan = explain["Plan"]
+    nodes = plan_nodes(plan)
+    record = {
+        "ts": time.time(),
+        "runner": _runner(),
+        "source": "explain",
+        "fingerprint": query_fingerprint(sql),
+        "sql": sql[:200],
+        "execution_ms": explain.get("Execution Time"),
+        "planning_ms": explain.get("Planning Time"),
+        "total_cost": plan.get("Total Cost"),
+        "shared_hit": plan.get("Shared Hit Blocks", 0),
+        "shared_read": plan.get("Shared Read Blocks", 0),
+        "shared_dirtied": plan.get("Shared Dirtied Blocks", 0),
+        "shared_written": plan.get("Shared Written Blocks", 0),
+        "temp_read": plan.get("Temp Read Blocks", 0),
+        "temp_written": plan.get("Temp Written Blocks", 0),
+        "wal_records": plan.get("WAL Records", 0),
+        "wal_bytes": plan.get("WAL Bytes", 0),
+        "wal_fpi": plan.get("WAL FPI", 0),
+        "indexes_used": sorted({n["index"] for n in nodes if n["index"]}),
+        "max_q_error": max(n["q_error"] for n in nodes),
+        "nodes": nodes,
+        # Veritabanı geneli fark: eşzamanlı oturumlar varsa gürültü içerir
+        "pgss_delta": {k: after[k] - before[k] for k in PGSS_FIELDS} if use_pgss else None,
+    }
+    record["hit_ratio"] = _hit_ratio(record)
+    return record
+
+def append_record(record, path=None):
+    # Tek satırlık O_APPEND yazımı paralel işçiler arasında bölünmez
+    with open(path or config.INSTRUMENT_FILE, "a", encoding="utf-8") as f:
+        f.write(json.dumps(record) + "\n")
+
+def capture(conn, sql, statement=None):
+    # Ölçüm motorunun çağırdığı giriş noktası; hata ölçümü bozmaz
+    try:
+        record = instrument(conn, sql, statement)
+        append_record(record)
+        return record
+    except Exception as e:
+        print(f"\n   ⚠️ Enstrümantasyon hatası: {e}")
+        return None
+
+def read_records(path=None):
+    path = path or config.INSTRUMENT_FILE
+    if not os.path.exists(path):
+        return []
+    with open(path, encoding="utf-8") as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+def _label(value):
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+def export_openmetrics(records, path=None):
+    # (runner, kaynak, parmak izi, kullanılan indeksler) başına en son kayıt gauge olarak yazılır
+    latest = {}
+    for r in records:
+        latest[(r["runner"], r.get("source", "explain"), r["fingerprint"], ",".join(r["indexes_used"]))] = r
+    lines = []
+    for name, field, help_text in METRICS:
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"# HELP {name} {help_text}")
+        for (runner, source, fingerprint, indexes), r in sorted(latest.items()):
+            if r.get(field) is None: continue
+            labels = f'runner="{_label(runner)}",source="{source}",fingerprint="{fingerprint[:12]}",indexes="{_label(indexes)}"'
+            lines.append(f"{name}{{{labels}}} {float(r[field])} {r['ts']:.3f}")
+    lines.append("# EOF")
+    with open(path or config.INSTRUMENT_METRICS_FILE, "w", encoding="utf-8") as f:
+        f.write("\n".join(lines) + "\n")
+    return len(latest)
+
+def main():
+    parser = argparse.ArgumentParser(description="Enstrümantasyon kayıtlarını OpenMetrics'e aktar")
+    parser.add_argument("--input", default=config.INSTRUMENT_FILE)
+    parser.add_argument("--out", default=config.INSTRUMENT_METRICS_FILE)
+    parser.add_argument("--misestimates", type=float, default=10.0, help="Bu q-hatasının üzerindeki düğümleri listele")
+    args = parser.parse_args()
+
+    records = read_records(args.input)
+    if not records:
+        print(f"Hata: {args.input} boş veya yok.")
+        return
+    series = export_openmetrics(records, args.out)
+    print(f"✅ {len(records)} kayıt -> {series} seri: {args.out}")
+
+    # İndeks seçimini yanıltabilecek kardinalite hataları
+    worst = sorted(((n["q_error"], r["fingerprint"][:12], n) for r in records for n in r["nodes"]
+                    if n["q_error"] >= args.misestimates), key=lambda x: -x[0])
+    for err, fp, n in worst[:20]:
+        print(f"   ⚠️ q-hata={err:.0f} {fp} {n['node']} {n['relation'] or ''} {n['index'] or ''} "
+              f"(tahmin {n['estimated_rows']:.0f} / gerçek {n['actual_rows']:.0f})")
+
+if __name__ == "__main__":
+    main()
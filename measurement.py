@@ -0,0 +1,141 @@
+import time
+import math
+import random
+import statistics
+import config
+from executor import get_executor
+from tpch_queries import prepared_statement
+from result_store import is_dml
+from instrumentation import capture, begin_runs, end_runs
+import result_cache
+
+# --- ORTAK ÖLÇÜM MOTORU ---
+# data_collector, training_data_generator ve index_recommender aynı ölçüm
+# kurallarını kullanır: önbellek kontrolü, ısınma, güven aralığı daralana kadar
+# tekrar, medyan/p95 ve eşiği istatistiksel olarak geçemeyecek koşularda erken çıkış
+# (statement_timeout yalnızca tek koşunun süresini eşiğin birkaç katıyla sınırlar).
+# DML (UPDATE/INSERT/DELETE) ısınmasız, tek koşu olarak geri alınan (ROLLBACK) bir işlemde
+# ölçülür: tekrarlar veriyi değiştirip sonraki SELECT ölçümlerini bozmasın.
+# Sorgu çalıştırma, zaman aşımı ve önbellek işlemleri arka uca (executor.py) devredilir.
+
+def _run_sql(cur, sql):
+    get_executor().execute(cur, sql)
+
+def prewarm(conn, tables):
+    get_executor().prewarm(conn, tables)
+
+def evict_cache(conn, tables):
+    get_executor().evict(conn, tables)
+
+def _percentile(values, p):
+    ordered = sorted(values)
+    k = (len(ordered) - 1) * p
+    lo, hi = math.floor(k), math.ceil(k)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+def _ci_is_tight(samples):
+    # %95 güven aralığının yarı genişliği / ortalama
+    if len(samples) < 2:
+        return False
+    mean = statistics.mean(samples)
+    if mean == 0:
+        return True
+    half_width = 1.96 * statistics.stdev(samples) / math.sqrt(len(samples))
+    return half_width / mean <= config.MEASURE_CI_TARGET
+
+def _cannot_beat(samples, limit_ms):
+    # %95 güven aralığının alt sınırı bile eşiğin üstündeyse eşik istatistiksel olarak geçilemez
+    if len(samples) < 2:
+        return False
+    lower = statistics.mean(samples) - 1.96 * statistics.stdev(samples) / math.sqrt(len(samples))
+    return lower > limit_ms
+
+def measure_query(conn, sql, tables=(), cache=None, limit_ms=None):
+    # Dönüş: {"median", "p95", "mean", "runs", "timed_out"} veya hata durumunda None
+    cache = cache or config.MEASURE_CACHE
+    executor = get_executor()
+    literal_sql = sql
+    dml = is_dml(sql)
+    # Aynı SQL + aynı indeks kümesi + değişmemiş veri: kalıcı önbellekten dön
+    cache_entry = None
+    if config.RESULT_CACHE and tables and result_cache.cacheable(sql):
+        try:
+            cache_entry = result_cache.cache_key(conn, sql, tables, cache)
+            cached = result_cache.lookup(cache_entry[0])
+            if cached is not None:
+                return cached
+        except Exception as e:
+            print(f"\n   ⚠️ Sonuç önbelleği hatası: {e}")
+            cache_entry = None
+    if config.USE_PREPARED_STATEMENTS and executor.prepared:
+        sql = prepared_statement(conn, sql)
+    samples = []
+    timed_out = False
+    cur = None
+    pgss_before = None
+    # Tek koşu üst sınırı: eşiğin MEASURE_TIMEOUT_FACTOR katı (umutsuz koşuların maliyetini sınırlar)
+    cap = limit_ms * config.MEASURE_TIMEOUT_FACTOR if limit_ms else None
+    try:
+        cur = conn.cursor()
+        if cache == "warm" and not dml:
+            prewarm(conn, tables)
+            for _ in range(config.MEASURE_WARMUP):
+                _run_sql(cur, sql)
+
+        # Zaman aşımı ısınmadan sonra kurulur: yavaş bir ısınma koşusu örnekleri silmez
+        if cap:
+            executor.set_timeout(cur, cap)
+        if config.INSTRUMENT and executor.instrument:
+            pgss_before = begin_runs(conn)
+        while len(samples) < (1 if dml else config.MEASURE_MAX_RUNS):
+            if cache == "cold":
+                evict_cache(conn, tables)
+            if dml:
+                cur.execute("BEGIN")
+            start = time.perf_counter()
+            try:
+                _run_sql(cur, sql)
+                samples.append((time.perf_counter() - start) * 1000)
+            except executor.timeout_error:
+                # Kesilen koşu üst sınır değeriyle (sansürlü) örneğe girer
+                samples.append(cap)
+            finally:
+                if dml:
+                    cur.execute("ROLLBACK")
+            # Erken çıkış yalnızca örnekler eşiğin geçilemeyeceğini gösterdiğinde
+            if limit_ms and _cannot_beat(samples, limit_ms):
+                timed_out = True
+                break
+            if len(samples) >= config.MEASURE_MIN_RUNS and _ci_is_tight(samples):
+                break
+    except Exception:
+        return None
+    finally:
+        if cap and cur is not None:
+            try:
+                executor.clear_timeout(cur)
+            except Exception:
+                pass
+
+    # Her ölçümde koşu başına pgss kaydı; örneklenen ölçümlerde ek EXPLAIN (ANALYZE, BUFFERS, WAL) koşusu
+    inst = end_runs(conn, literal_sql, pgss_before, len(samples)) if pgss_before else None
+    if timed_out:
+        return {"median": limit_ms, "p95": limit_ms, "mean": limit_ms, "runs": len(samples), "timed_out": True}
+    if config.INSTRUMENT and executor.instrument and random.random() < config.INSTRUMENT_ANALYZE_SAMPLE:
+        inst = capture(conn, literal_sql, sql) or inst
+    result = {
+        "median": statistics.median(samples),
+        "p95": _percentile(samples, 0.95),
+        "mean": statistics.mean(samples),
+        "runs": len(samples),
+        "timed_out": False,
+        "instrumentation": inst,
+    }
+    # Zaman aşımına uğrayan koşular (eşiğe bağlı) önbelleğe yazılmaz
+    if cache_entry:
+        result_cache.store(*cache_entry, result)
+    return result
+
+def measure_time(conn, sql, tables=(), limit_ms=None):
+    result = measure_query(conn, sql, tables, limit_ms=limit_ms)
+    return result["median"] if result else None
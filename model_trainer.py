@@ -1,10 +1,132 @@
+import os
+import itertools
 import pandas as pd
+import numpy as np
 import joblib
-from sklearn.model_selection import train_test_split
-from sklearn.metrics import accuracy_score
-from xgboost import XGBClassifier
-from sklearn.multioutput import MultiOutputClassifier
+from concurrent.futures import ProcessPoolExecutor
+from sklearn.model_selection import train_test_split, StratifiedKFold, KFold
+from sklearn.metrics import accuracy_score, precision_score, recall_score, brier_score_loss, log_loss, fbeta_score, mean_absolute_error, mean_squared_error, r2_score
+from xgboost import XGBClassifier, XGBRegressor
+from sklearn.multioutput import MultiOutputClassifier, MultiOutputRegressor
 import config # YENİ
+from candidate_generator import load_candidates
+from fast_model import export_fast_model, FastModel
+
+# --- EĞİTİM HATTI ---
+# Her etiket (indeks) ayrı bir süreçte eğitilir (ProcessPoolExecutor):
+#   1. TRAIN_PARAM_GRID'deki her kombinasyon için k-katlı CV, katlarda erken durdurma
+#   2. En düşük CV log-loss'lu parametreler + ortalama en iyi iterasyon sayısı seçilir
+#   3. Katlar dışı (out-of-fold) olasılıklardan indeks başına eşik ayarlanır (F-beta)
+#   4. Son model tüm eğitim kümesiyle eğitilir
+# XGBoost 'hist' ağaç kurucuyla koşar; çekirdekler süreçler arasında paylaştırılır.
+# MODEL_MODE = "regress": ikili etiketler yerine log(1 + base süre) ve indeks başına
+# indeksli/base süre oranı (ratio_*) tahmin edilir; öneri sistemi mutlak kazanca göre sıralar.
+
+def _is_classifier(label):
+    return label.startswith("label_")
+
+def _xgb(params, n_estimators, threads, early_stopping=None, classify=True):
+    model_class = XGBClassifier if classify else XGBRegressor
+    return model_class(n_estimators=n_estimators, tree_method="hist", n_jobs=threads, random_state=42,
+                         early_stopping_rounds=early_stopping, **params)
+
+def _cross_validate(X, y, params, folds, threads, classify=True):
+    # Dönüş: (log-loss / MSE, ortalama en iyi iterasyon, katlar dışı tahminler)
+    oof = np.zeros(len(y))
+    iterations = []
+    splitter = StratifiedKFold if classify else KFold
+    for train_idx, val_idx in splitter(n_splits=folds, shuffle=True, random_state=42).split(X, y):
+        clf = _xgb(params, config.TRAIN_MAX_ESTIMATORS, threads, config.TRAIN_EARLY_STOPPING, classify)
+        clf.fit(X[train_idx], y[train_idx], eval_set=[(X[val_idx], y[val_idx])], verbose=False)
+        oof[val_idx] = clf.predict_proba(X[val_idx])[:, 1] if classify else clf.predict(X[val_idx])
+        iterations.append(clf.best_iteration + 1)
+    loss = log_loss(y, oof, labels=[0, 1]) if classify else mean_squared_error(y, oof)
+    return loss, int(np.mean(iterations)), oof
+
+def tune_threshold(y, prob):
+    # Katlar dışı olasılıklarda F-beta'yı en büyükleyen eşik (beta < 1: kesinlik öncelikli).
+    # Yukarıdan aşağı taranır: eşitlikte yüksek (kesin) eşik kalır. Hepsini pozitif saymaktan
+    # iyi değilse olasılıklar ayırt edici değildir: genel eşik kullanılır
+    best, best_score = config.RECOMMEND_THRESHOLD, 0.0
+    for t in np.arange(0.95, 0.04, -0.05):
+        score = fbeta_score(y, prob >= t, beta=config.TRAIN_THRESHOLD_BETA, zero_division=0)
+        if score > best_score:
+            best, best_score = float(round(t, 2)), score
+    if best_score <= fbeta_score(y, np.ones(len(y), dtype=bool), beta=config.TRAIN_THRESHOLD_BETA, zero_division=0):
+        return config.RECOMMEND_THRESHOLD
+    return best
+
+def calibration_error(y, prob, bins=10):
+    # Beklenen kalibrasyon hatası: olasılık kovalarında |ortalama tahmin - gerçek oran|
+    edges = np.minimum((prob * bins).astype(int), bins - 1)
+    error = 0.0
+    for b in range(bins):
+        mask = edges == b
+        if mask.any():
+            error += mask.mean() * abs(prob[mask].mean() - y[mask].mean())
+    return error
+
+def fit_label(args):
+    # Tek etiketin arama + eğitimi (süreç havuzunda çalışır)
+    label, X, y, threads = args
+    classify = _is_classifier(label)
+    base = {"max_depth": 4, "learning_rate": 0.1}
+    minority = int(min(y.sum(), len(y) - y.sum())) if classify else len(y)
+    folds = min(config.TRAIN_FOLDS, minority)
+    if folds < 2:
+        # Tek sınıfa yakın etiket: CV yapılamaz, varsayılan parametrelerle eğitilir
+        clf = _xgb(base, 100, threads, classify=classify)
+        clf.fit(X, y)
+        return label, clf, {"params": base, "n_estimators": 100, "cv_log_loss": None,
+                            "threshold": config.RECOMMEND_THRESHOLD if classify else None}
+
+    grid = config.TRAIN_PARAM_GRID
+    best = None
+    for values in itertools.product(*grid.values()):
+        params = dict(zip(grid.keys(), values))
+        loss, n_estimators, oof = _cross_validate(X, y, params, folds, threads, classify)
+        if best is None or loss < best[0]:
+            best = (loss, params, n_estimators, oof)
+    loss, params, n_estimators, oof = best
+
+    clf = _xgb(params, n_estimators, threads, classify=classify)
+    clf.fit(X, y)
+    return label, clf, {"params": params, "n_estimators": n_estimators, "cv_log_loss": loss,
+                        "threshold": tune_threshold(y, oof) if classify else None}
+
+def report_classifier(model, X_test, y_test, fitted):
+    # Test: etiket başına kesinlik / duyarlılık / kalibrasyon (ayarlanmış eşikle)
+    probs = model.predict_proba(X_test.values)
+    predicted = np.column_stack([p[:, 1] >= model.thresholds_[label] for p, label in zip(probs, y_test.columns)])
+    print(f"\n{'Etiket':<40} {'Eşik':>5} {'Kesinlik':>9} {'Duyarlılık':>10} {'Brier':>7} {'ECE':>6}  Parametreler")
+    for i, label in enumerate(y_test.columns):
+        # Ölçülmemiş (NaN) etiketler değerlendirme dışı
+        mask = ~np.isnan(y_test[label].values)
+        if not mask.any(): continue
+        truth, prob, pred = y_test[label].values[mask], probs[i][mask, 1], predicted[mask, i]
+        info = fitted[label][1]
+        print(f"{label:<40} {info['threshold']:>5.2f} {precision_score(truth, pred, zero_division=0):>9.2%} "
+              f"{recall_score(truth, pred, zero_division=0):>10.2%} {brier_score_loss(truth, prob, pos_label=1):>7.3f} "
+              f"{calibration_error(truth, prob):>6.3f}  {info['params']} n={info['n_estimators']}")
+
+    complete = y_test.notna().all(axis=1).values
+    if complete.any():
+        acc = accuracy_score(y_test.values[complete].astype(int), predicted[complete].astype(int))
+        print(f"\n✅ Doğruluk: {acc:.2%} ({complete.sum()} tam etiketli satır)")
+
+def report_regressor(model, X_test, y_test, fitted):
+    # Test: hedef başına MAE / R²; base süre log ölçeğinden ms'ye çevrilerek de raporlanır
+    preds = model.predict(X_test.values)
+    print(f"\n{'Hedef':<40} {'MAE':>8} {'R²':>7}  Parametreler")
+    for i, target in enumerate(y_test.columns):
+        mask = ~np.isnan(y_test[target].values)
+        if not mask.any(): continue
+        truth, pred = y_test[target].values[mask], preds[mask, i]
+        info = fitted[target][1]
+        print(f"{target:<40} {mean_absolute_error(truth, pred):>8.3f} {r2_score(truth, pred) if mask.sum() > 1 else float('nan'):>7.3f}"
+              f"  {info['params']} n={info['n_estimators']}")
+        if target == "base_time":
+            print(f"{'  (ms)':<40} {mean_absolute_error(np.expm1(truth), np.expm1(pred)):>8.1f}")
 
 def train_model():
     print(f"--- MODEL EĞİTİMİ (SF={config.SCALE_FACTOR}) ---")
@@ -18,27 +140,65 @@ def train_model():
         return
 
     # Veriyi Hazırla
-    X = df.drop(columns=["query_id", "base_time"] + [c for c in df.columns if c.startswith("label_")])
-    y = df[[c for c in df.columns if c.startswith("label_")]]
+    # base_time / base_p95 / base_cost ölçüm sonucudur, özellik değil
+    X = df.drop(columns=["query_id", "base_time", "base_p95", "base_cost"] + [c for c in df.columns if c.startswith(("label_", "ratio_"))], errors="ignore")
+    if config.MODEL_MODE == "regress":
+        # Hedefler: log(1 + base süre ms) + indeks başına indeksli/base oranı
+        y = df[["base_time"] + [c for c in df.columns if c.startswith("ratio_")]].copy()
+        y["base_time"] = np.log1p(y["base_time"])
+    else:
+        y = df[[c for c in df.columns if c.startswith("label_")]]
 
     X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=0.2, random_state=42)
+    # Eğitim kümesinde hiç ölçülmemiş hedef (örn. doğrulama örneklemine düşmeyen bölümleme) eğitilemez
+    empty = [c for c in y.columns if not y_train[c].notna().any()]
+    if empty:
+        print(f"⚠️ Ölçümü olmayan hedefler atlandı: {', '.join(empty)}")
+        y, y_train, y_test = y.drop(columns=empty), y_train.drop(columns=empty), y_test.drop(columns=empty)
 
-    # XGBoost Eğitimi
-    print("XGBoost eğitiliyor...")
-    xgb = XGBClassifier(n_estimators=100, max_depth=4, learning_rate=0.1, random_state=42)
-    model = MultiOutputClassifier(xgb)
-    model.fit(X_train, y_train)
+    # XGBoost Eğitimi: etiketler süreçlere, kalan çekirdekler hist iş parçacıklarına
+    workers = min(config.TRAIN_WORKERS or os.cpu_count() or 1, len(y.columns))
+    threads = max(1, (os.cpu_count() or 1) // workers)
+    print(f"XGBoost eğitiliyor: {len(y.columns)} etiket | {workers} süreç x {threads} iş parçacığı | "
+          f"{config.TRAIN_FOLDS}-katlı CV | {int(np.prod([len(v) for v in config.TRAIN_PARAM_GRID.values()]))} kombinasyon")
+    # Ölçülmemiş hedefler (örn. what-if satırlarında base süre) o hedefin eğitiminden çıkarılır
+    jobs = []
+    for label in y.columns:
+        mask = y_train[label].notna().values
+        jobs.append((label, X_train.values[mask], y_train[label].values[mask], threads))
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        fitted = {label: (clf, info) for label, clf, info in pool.map(fit_label, jobs)}
 
-    # Test
-    acc = accuracy_score(y_test, model.predict(X_test))
-    print(f"\n✅ Doğruluk: {acc:.2%}")
+    if config.MODEL_MODE == "regress":
+        model = MultiOutputRegressor(XGBRegressor())
+        model.estimators_ = [fitted[label][0] for label in y.columns]
+        model.kind_ = "regress"
+        report_regressor(model, X_test, y_test, fitted)
+    else:
+        model = MultiOutputClassifier(XGBClassifier())
+        model.estimators_ = [fitted[label][0] for label in y.columns]
+        model.kind_ = "classify"
+        # index_recommender etiket başına eşiği bu sözlükten okur
+        model.thresholds_ = {label: fitted[label][1]["threshold"] for label in y.columns}
+        report_classifier(model, X_test, y_test, fitted)
 
     # Kaydet (Dinamik İsimlendirme)
     joblib.dump(model, config.MODEL_FILE)
     joblib.dump(list(X.columns), config.META_FEATURES)
     joblib.dump(list(y.columns), config.META_LABELS)
-    
+    # Etiketlerin hangi indeks tanımlarına karşılık geldiği (dinamik aday kümesi)
+    joblib.dump(load_candidates(), config.META_CANDIDATES)
+
     print(f"💾 Model Kaydedildi: {config.MODEL_FILE}")
 
+    # Hızlı çıkarım için düz ağaç dizileri (index_recommender pickle yüklemeden kullanır)
+    export_fast_model(model, list(X.columns), list(y.columns), load_candidates())
+    fast = FastModel()
+    if model.kind_ == "regress":
+        diff = abs(model.predict(X_test.values) - fast.predict(X_test.values)).max()
+    else:
+        diff = max(abs(a[:, 1] - b[:, 1]).max() for a, b in zip(model.predict_proba(X_test.values), fast.predict_proba(X_test.values)))
+    print(f"⚡ Hızlı Model Kaydedildi: {config.FAST_MODEL_FILE} (tahmin farkı: {diff:.1e})")
+
 if __name__ == "__main__":
-    train_model()
\ No newline at end of file
+    train_model()
@@ -0,0 +1,269 @@
+import os
+import copy
+import json
+import time
+import shutil
+import filecmp
+import argparse
+import numpy as np
+import pandas as pd
+import joblib
+import config
+from fast_model import export_fast_model
+from result_store import open_store, query_fingerprint, put_feedback, load_feedback, last_feedback_id
+
+# --- KAPALI DÖNGÜ ÇEVRİMİÇİ ÖĞRENME ---
+# index_recommender'ın doğrulama ölçümleri (base / önerilen indekslerle süre) ve
+# dışarıdan verilen üretim zaman akışı (--ingest) depoya etiketli örnek olarak yazılır.
+# Her döngüde (--watch ile zamanlanmış) aktif model:
+#   1. Son sürümden sonra gelen örneklerde bir önceki sürümden kötüyse geri alınır
+#   2. Yeterli yeni örnek varsa güncellenir: "continue" -> yalnızca yeni örneklerle XGBoost
+#      devam eğitimi (mevcut ağaçlara ONLINE_ROUNDS ağaç eklenir), "retrain" -> kayan pencere ile
+#      yeniden eğitim. Eğitim CSV'sinden örneklenen satırlar unutmayı azaltmak için eklenir.
+#   3. Yeni örneklerin en sonuncuları (ONLINE_HOLDOUT) ayrılır; aday model bunlarda
+#      ONLINE_MAX_DROP'tan fazla kötüleşirse reddedilir, aksi halde yeni sürüm olur.
+# Sürümler MODEL_VERSIONS_DIR'de saklanır; aktif sürüm MODEL_FILE'a kopyalanır ve
+# hızlı model (fast_model.py) yeniden dışa aktarılır.
+
+def sample_targets(base_ms, indexed):
+    # indexed: {indeks adı: ms}. Sınıflandırma etiketi ve regresyon hedefleri birlikte saklanır
+    targets = {"base_time": base_ms}
+    for name, ms in indexed.items():
+        targets[f"label_{name}"] = int(ms < base_ms * config.IMPROVEMENT_THRESHOLD)
+        targets[f"ratio_{name}"] = ms / base_ms if base_ms else 1.0
+    return targets
+
+def record_sample(store, source, sql, features, base_ms, indexed):
+    put_feedback(store, source, query_fingerprint(sql) if sql else None, features, sample_targets(base_ms, indexed))
+
+def ingest_feed(store, path):
+    # JSONL: {"sql": ..., "base_ms": ..., "indexes": {"idx_...": ms}} ("sql" yerine "features" de olabilir)
+    from index_recommender import get_connection
+    from plan_features import extract_plan_features
+    from stats_cache import refresh_if_stale
+    conn = None
+    count = 0
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip(): continue
+            item = json.loads(line)
+            features = item.get("features")
+            if features is None:
+                if conn is None:
+                    conn = get_connection()
+                    if not conn: return count
+                    refresh_if_stale(conn)
+                features, _ = extract_plan_features(conn, item["sql"])
+                if features is None: continue
+            record_sample(store, "feed", item.get("sql"), features, item["base_ms"], item.get("indexes", {}))
+            count += 1
+    if conn: conn.close()
+    return count
+
+# --- Sürümler ---
+
+def version_row(row):
+    return dict(zip(["version", "path", "feedback_id", "score", "previous_score", "status"], row)) if row else None
+
+def active_version(store):
+    return version_row(store.execute("SELECT version, path, feedback_id, score, previous_score, status FROM model_versions "
+                                     "WHERE status = 'active' ORDER BY version DESC LIMIT 1").fetchone())
+
+def previous_version(store, version):
+    return version_row(store.execute("SELECT version, path, feedback_id, score, previous_score, status FROM model_versions "
+                                     "WHERE status = 'superseded' AND version < ? ORDER BY version DESC LIMIT 1", (version,)).fetchone())
+
+def save_version(store, model, status, score=None, previous_score=None, feedback_id=None):
+    os.makedirs(config.MODEL_VERSIONS_DIR, exist_ok=True)
+    version = store.execute("SELECT coalesce(max(version), -1) + 1 FROM model_versions").fetchone()[0]
+    path = os.path.join(config.MODEL_VERSIONS_DIR, f"v{version}.pkl")
+    if isinstance(model, str):
+        shutil.copyfile(model, path)
+    else:
+        joblib.dump(model, path)
+    if status == "active":
+        store.execute("UPDATE model_versions SET status = 'superseded' WHERE status = 'active'")
+    store.execute("INSERT INTO model_versions (version, path, feedback_id, score, previous_score, status) VALUES (?, ?, ?, ?, ?, ?)",
+                  (version, path, last_feedback_id(store) if feedback_id is None else feedback_id, score, previous_score, status))
+    store.commit()
+    return version
+
+def ensure_registered(store):
+    # Çevrimdışı eğitilmiş (model_trainer) model henüz sürüm değilse temel sürüm olarak kaydedilir
+    active = active_version(store)
+    if active and filecmp.cmp(active["path"], config.MODEL_FILE, shallow=False):
+        return active
+    # Yeni çevrimdışı eğitim: eski sürümler (farklı özellik/etiket kümesi olabilir) geri alma hedefi olamaz
+    store.execute("UPDATE model_versions SET status = 'retired' WHERE status IN ('active', 'superseded')")
+    # Çevrimdışı eğitim (CSV) hiçbir geri bildirim örneğini görmedi: depodaki tüm örnekler yenidir
+    version = save_version(store, config.MODEL_FILE, "active", feedback_id=0)
+    print(f"   📌 Çevrimdışı model v{version} olarak kaydedildi.")
+    return active_version(store)
+
+def activate(path):
+    # Sürümü öneri sisteminin kullandığı dosyalara yaz (pickle + hızlı model)
+    shutil.copyfile(path, config.MODEL_FILE)
+    model = joblib.load(path)
+    candidates = joblib.load(config.META_CANDIDATES)
+    export_fast_model(model, joblib.load(config.META_FEATURES), joblib.load(config.META_LABELS), candidates)
+
+# --- Eğitim / değerlendirme ---
+
+def target_value(label, value):
+    # Regresyon base hedefi log ölçeğindedir (model_trainer ile aynı)
+    return np.log1p(value) if label == "base_time" else value
+
+def feedback_matrix(samples, features_col, label):
+    rows = [(f, t[label]) for _, f, t in samples if t.get(label) is not None]
+    X = np.array([[f.get(c, 0) for c in features_col] for f, _ in rows], dtype=float).reshape(len(rows), len(features_col))
+    y = np.array([target_value(label, v) for _, v in rows], dtype=float)
+    return X, y
+
+def replay_rows(features_col, labels, n):
+    # Eğitim CSV'sinden örneklem (n=None: tamamı)
+    if not os.path.exists(config.DATA_FILE):
+        return None
+    df = pd.read_csv(config.DATA_FILE)
+    if n is not None and len(df) > n:
+        df = df.sample(n=n, random_state=int(time.time()))
+    X = df.reindex(columns=features_col, fill_value=0).values.astype(float)
+    y = {label: np.array([target_value(label, v) for v in df[label]], dtype=float) for label in labels if label in df}
+    return X, y
+
+def update_model(model, features_col, labels, samples):
+    # Dönüş: (aday model, güncellenen etiket sayısı)
+    retrain = config.ONLINE_STRATEGY == "retrain"
+    replay = replay_rows(features_col, labels, None if retrain else config.ONLINE_REPLAY_ROWS)
+    classify = getattr(model, "kind_", "classify") == "classify"
+    candidate = copy.deepcopy(model)
+    updated = 0
+    for i, label in enumerate(labels):
+        X, y = feedback_matrix(samples, features_col, label)
+        if not len(y): continue
+        if replay and label in replay[1]:
+            mask = ~np.isnan(replay[1][label])
+            X, y = np.vstack([X, replay[0][mask]]), np.concatenate([y, replay[1][label][mask]])
+        if classify and len(set(y)) < 2: continue
+
+        est = model.estimators_[i]
+        params = {**est.get_params(), "early_stopping_rounds": None}
+        if retrain:
+            clf = type(est)(**params)
+            clf.fit(X, y)
+        else:
+            # Devam eğitimi: mevcut booster'a yeni ağaçlar eklenir
+            clf = type(est)(**{**params, "n_estimators": config.ONLINE_ROUNDS})
+            clf.fit(X, y, xgb_model=est.get_booster())
+        candidate.estimators_[i] = clf
+        updated += 1
+    return candidate, updated
+
+def evaluate(model, features_col, labels, samples):
+    # Sınıflandırma: etiket doğruluğu (etiket başına eşikle); regresyon: 1 - ortalama oran hatası
+    if not samples:
+        return None
+    X = np.array([[f.get(c, 0) for c in features_col] for _, f, _ in samples], dtype=float)
+    hits, total = 0.0, 0
+    if getattr(model, "kind_", "classify") == "classify":
+        thresholds = getattr(model, "thresholds_", {})
+        probs = model.predict_proba(X)
+        for i, label in enumerate(labels):
+            for j, (_, _, targets) in enumerate(samples):
+                if targets.get(label) is None: continue
+                predicted = int(probs[i][j, 1] >= thresholds.get(label, config.RECOMMEND_THRESHOLD))
+                hits += predicted == targets[label]
+                total += 1
+    else:
+        preds = model.predict(X)
+        for i, label in enumerate(labels):
+            if not label.startswith("ratio_"): continue
+            for j, (_, _, targets) in enumerate(samples):
+                if targets.get(label) is None: continue
+                hits += 1 - min(abs(np.clip(preds[j, i], 0, 1) - targets[label]), 1)
+                total += 1
+    return hits / total if total else None
+
+def run_cycle(store):
+    if not os.path.exists(config.MODEL_FILE):
+        print(f"Hata: {config.MODEL_FILE} bulunamadı. Önce model_trainer.py çalıştırılmalı.")
+        return
+    active = ensure_registered(store)
+    model = joblib.load(active["path"])
+    features_col = joblib.load(config.META_FEATURES)
+    labels = joblib.load(config.META_LABELS)
+    fresh = load_feedback(store, active["feedback_id"])
+
+    # 1. Otomatik geri alma: aktif sürüm, görmediği örneklerde öncekinden kötüyse
+    previous = previous_version(store, active["version"])
+    if previous and len(fresh) >= config.ONLINE_MIN_SAMPLES:
+        current = evaluate(model, features_col, labels, fresh)
+        before = evaluate(joblib.load(previous["path"]), features_col, labels, fresh)
+        if current is not None and before is not None and current < before - config.ONLINE_MAX_DROP:
+            store.execute("UPDATE model_versions SET status = 'rolled_back' WHERE version = ?", (active["version"],))
+            store.execute("UPDATE model_versions SET status = 'active' WHERE version = ?", (previous["version"],))
+            store.commit()
+            activate(previous["path"])
+            print(f"   ⏪ v{active['version']} geri alındı ({current:.3f} < {before:.3f}) -> v{previous['version']}")
+            return
+
+    # 2. Güncelleme
+    if len(fresh) < config.ONLINE_MIN_SAMPLES:
+        print(f"   ⏳ Yeni örnek: {len(fresh)}/{config.ONLINE_MIN_SAMPLES}, güncelleme bekliyor.")
+        return
+    holdout = fresh[-max(1, int(len(fresh) * config.ONLINE_HOLDOUT)):]
+    held = {fid for fid, _, _ in holdout}
+    # Devam eğitimi mevcut ağaçlara eklenir: yalnızca modelin görmediği örnekler (+ replay satırları);
+    # yeniden eğitim kayan pencerenin tamamını kullanır
+    samples = load_feedback(store)[-config.ONLINE_WINDOW:] if config.ONLINE_STRATEGY == "retrain" else fresh
+    window = [s for s in samples if s[0] not in held]
+    candidate, updated = update_model(model, features_col, labels, window)
+    if not updated:
+        print("   ⏳ Güncellenebilir etiket yok (tek sınıflı örnekler).")
+        return
+
+    old_score = evaluate(model, features_col, labels, holdout)
+    new_score = evaluate(candidate, features_col, labels, holdout)
+    if old_score is not None and new_score is not None and new_score < old_score - config.ONLINE_MAX_DROP:
+        version = save_version(store, candidate, "rejected", new_score, old_score, active["feedback_id"])
+        print(f"   ❌ Aday v{version} reddedildi: ayrılan örneklerde {new_score:.3f} < {old_score:.3f}")
+        return
+    version = save_version(store, candidate, "active", new_score, old_score)
+    activate(os.path.join(config.MODEL_VERSIONS_DIR, f"v{version}.pkl"))
+    print(f"   ✅ v{version} aktif: {updated} etiket güncellendi ({config.ONLINE_STRATEGY}), "
+          f"{len(window)} örnek | skor {old_score if old_score is not None else float('nan'):.3f} -> "
+          f"{new_score if new_score is not None else float('nan'):.3f}")
+
+def print_status(store):
+    print(f"{'Sürüm':>5} {'Durum':<12} {'Örnek id':>8} {'Skor':>7} {'Önceki':>7}  Tarih")
+    for version, status, fid, score, prev, created in store.execute(
+            "SELECT version, status, feedback_id, score, previous_score, created_at FROM model_versions ORDER BY version"):
+        print(f"{version:>5} {status:<12} {fid:>8} {score if score is not None else float('nan'):>7.3f} "
+              f"{prev if prev is not None else float('nan'):>7.3f}  {created}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Doğrulama ve üretim ölçümlerinden çevrimiçi model güncelleme")
+    parser.add_argument("--ingest", help="Üretim zaman akışı (JSONL) depoya eklenir")
+    parser.add_argument("--watch", action="store_true", help="ONLINE_INTERVAL_S aralıklarla sürekli çalış")
+    parser.add_argument("--status", action="store_true", help="Model sürümlerini listele")
+    args = parser.parse_args()
+
+    print(f"--- ÇEVRİMİÇİ ÖĞRENME (SF={config.SCALE_FACTOR}) ---")
+    store = open_store()
+    if args.status:
+        print_status(store)
+    elif args.ingest:
+        print(f"   📥 {ingest_feed(store, args.ingest)} örnek eklendi: {args.ingest}")
+    elif args.watch:
+        try:
+            while True:
+                print(f"\n[{time.strftime('%Y-%m-%d %H:%M:%S')}] Güncelleme döngüsü")
+                run_cycle(store)
+                time.sleep(config.ONLINE_INTERVAL_S)
+        except KeyboardInterrupt:
+            pass
+    else:
+        run_cycle(store)
+    store.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+import os
+import multiprocessing as mp
+import config
+from executor import get_executor
+from measurement import measure_query
+
+# --- PARALEL ÖLÇÜM HAVUZU ---
+# Her işçi süreç kendi kalıcı DB bağlantısını tutar (süreç başına havuz).
+# Aynı tabloya aynı anda giren işçi sayısı semaforla sınırlanır ki
+# ölçümler birbirinin I/O ve buffer kullanımını bozmasın.
+
+TPCH_TABLES = ["lineitem", "orders", "customer", "part", "partsupp", "supplier", "nation", "region"]
+
+_conn = None
+_table_locks = None
+
+def _init_worker(counter, table_locks):
+    global _conn, _table_locks
+    with counter.get_lock():
+        worker_id = counter.value
+        counter.value += 1
+
+    # İşçiyi tek bir çekirdeğe sabitle (yalnızca Linux)
+    if config.PIN_WORKERS and hasattr(os, "sched_setaffinity"):
+        cores = sorted(os.sched_getaffinity(0))
+        os.sched_setaffinity(0, {cores[worker_id % len(cores)]})
+
+    _table_locks = table_locks
+    try:
+        _conn = get_executor().connect()
+    except Exception as e:
+        print(f"   ⚠️ İşçi #{worker_id} bağlantı hatası: {e}")
+        _conn = None
+
+def _measure_task(task):
+    key, sql, tables, limit_ms = task
+    if _conn is None:
+        return key, None
+
+    # Kilitler sıralı alınır, böylece çok tablolu sorgularda deadlock olmaz
+    locks = [_table_locks[t] for t in sorted(set(tables)) if t in _table_locks]
+    for lock in locks: lock.acquire()
+    try:
+        return key, measure_query(_conn, sql, tables, limit_ms=limit_ms)
+    finally:
+        for lock in reversed(locks): lock.release()
+
+def create_pool(worker_count=None):
+    worker_count = worker_count or config.WORKER_COUNT
+    counter = mp.Value("i", 0)
+    table_locks = {t: mp.BoundedSemaphore(config.MAX_WORKERS_PER_TABLE) for t in TPCH_TABLES}
+    return mp.Pool(worker_count, initializer=_init_worker, initargs=(counter, table_locks))
+
+def measure_parallel(pool, tasks, on_result=None):
+    # tasks: [(anahtar, sql, [tablolar], limit_ms), ...] -> {anahtar: ölçüm sonucu}
+    # on_result ana süreçte, her sonuç geldiğinde çağrılır (checkpoint)
+    results = {}
+    for n, (key, result) in enumerate(pool.imap_unordered(_measure_task, tasks)):
+        print(f"   [{n+1}/{len(tasks)}] paralel ölçüm...", end="\r")
+        results[key] = result
+        if on_result and result is not None:
+            on_result(key, result)
+    return results
@@ -0,0 +1,72 @@
+import re
+import config
+
+# --- TARİH ARALIĞI BÖLÜMLEME (lineitem / orders) ---
+# ("part_lineitem_shipdate", "lineitem", "l_shipdate", "", "partition") tanımı için
+# tablonun yıllık RANGE bölümlü bir kopyası kurulur (STRUCTURE_DATE_DOMAIN yılları
+# + DEFAULT bölüm), mevcut indeksler (PK dahil) benzersiz olmayan bölümlü indeks
+# olarak yeniden oluşturulur ve tek işlemde isim değiştirilerek asıl tablonun yerine
+# geçirilir. Sorgular değişmeden bölümlü tabloya gider. Kaldırırken asıl tablo geri
+# döner. Yabancı anahtarlar kopyaya taşınmaz (yalnızca okuma ölçümü içindir).
+
+def base_name(index_def):
+    return f"{index_def[0]}_base"
+
+def is_swapped(conn, index_def):
+    cur = conn.cursor()
+    cur.execute("SELECT to_regclass(%s) IS NOT NULL", (base_name(index_def),))
+    swapped = cur.fetchone()[0]
+    cur.close()
+    return swapped
+
+def create_partitioned(conn, index_def):
+    name, table, column = index_def[0], index_def[1], index_def[2]
+    if is_swapped(conn, index_def):
+        return
+    first, last = [int(d[:4]) for d in config.STRUCTURE_DATE_DOMAIN]
+    cur = conn.cursor()
+    cur.execute("SELECT pg_get_indexdef(indexrelid) FROM pg_index WHERE indrelid = %s::regclass", (table,))
+    index_defs = [row[0] for row in cur.fetchall()]
+    cur.execute("BEGIN")
+    try:
+        cur.execute(f"CREATE TABLE {name} (LIKE {table} INCLUDING DEFAULTS) PARTITION BY RANGE ({column})")
+        for year in range(first, last + 1):
+            cur.execute(f"CREATE TABLE {name}_y{year} PARTITION OF {name} FOR VALUES FROM ('{year}-01-01') TO ('{year + 1}-01-01')")
+        cur.execute(f"CREATE TABLE {name}_default PARTITION OF {name} DEFAULT")
+        cur.execute(f"INSERT INTO {name} SELECT * FROM {table}")
+        # Bölümlü tabloda UNIQUE bölüm anahtarını içermeli: PK kolonları düz indeks olur
+        for ddl in index_defs:
+            cur.execute(re.sub(r"^CREATE (UNIQUE )?INDEX \S+ ON \S+", f"CREATE INDEX ON {name}", ddl))
+        cur.execute(f"ALTER TABLE {table} RENAME TO {base_name(index_def)}")
+        cur.execute(f"ALTER TABLE {name} RENAME TO {table}")
+        cur.execute("COMMIT")
+    except Exception:
+        cur.execute("ROLLBACK")
+        raise
+    cur.execute(f"ANALYZE {table}")
+    cur.close()
+
+def drop_partitioned(conn, index_def):
+    table = index_def[1]
+    # Yalnızca yer değiştirme yapılmışsa ve yerindeki tablo gerçekten bölümlüyse
+    if not is_swapped(conn, index_def):
+        return
+    cur = conn.cursor()
+    cur.execute("SELECT relkind FROM pg_class WHERE oid = %s::regclass", (table,))
+    if cur.fetchone()[0] != "p":
+        cur.close()
+        raise RuntimeError(f"{table} bölümlü değil, geri alma durduruldu")
+    cur.execute("BEGIN")
+    cur.execute(f"DROP TABLE {table}")
+    cur.execute(f"ALTER TABLE {base_name(index_def)} RENAME TO {table}")
+    cur.execute("COMMIT")
+    cur.close()
+
+def partitioned_size(conn, index_def):
+    # Bölümler + bölüm indeksleri (bayt)
+    cur = conn.cursor()
+    cur.execute("SELECT coalesce(sum(pg_total_relation_size(inhrelid)), 0) FROM pg_inherits WHERE inhparent = %s::regclass",
+                (index_def[1],))
+    size = cur.fetchone()[0]
+    cur.close()
+    return size
@@ -0,0 +1,116 @@
+import re
+from candidate_generator import index_columns, load_candidates
+from stats_cache import get_column_distinct, get_reltuples
+from executor import get_executor
+
+# --- PLAN AĞACINDAN ÖZELLİK ÇIKARIMI ---
+# Elle yazılmış meta sözlükleri yerine, herhangi bir SQL metni için
+# EXPLAIN (FORMAT JSON) planı gezilir; operatör bazlı tahmini satır, maliyet,
+# tarama/join tipi, predikat seçiciliği ve dokunulan kolonlar çıkarılır.
+
+TPCH_TABLES = ["lineitem", "orders", "customer", "part", "partsupp", "supplier", "nation", "region"]
+SCAN_NODES = ["Seq Scan", "Index Scan", "Index Only Scan", "Bitmap Heap Scan"]
+JOIN_NODES = {"Hash Join": "hash_join_count", "Merge Join": "merge_join_count", "Nested Loop": "nested_loop_count"}
+CONDITION_KEYS = ["Filter", "Index Cond", "Recheck Cond", "Hash Cond", "Merge Cond", "Join Filter", "Sort Key", "Group Key"]
+COLUMN_PATTERN = re.compile(r"\b((?:l|o|c|p|ps|s|n|r)_[a-z]+)\b")
+
+def candidate_columns(candidates=None):
+    candidates = candidates if candidates is not None else load_candidates()
+    return sorted({c for idx in candidates for c in index_columns(idx)})
+
+def feature_columns(candidates=None):
+    cols = ["query_type"] + [f"table_{t}" for t in TPCH_TABLES]
+    cols += ["join_count", "plan_total_cost", "plan_rows", "node_count",
+             "seq_scan_count", "index_scan_count", "bitmap_scan_count",
+             "hash_join_count", "merge_join_count", "nested_loop_count",
+             "sort_count", "agg_count", "max_scan_rows", "min_scan_selectivity", "col_distinct_count"]
+    cols += [f"col_{c}" for c in candidate_columns(candidates)]
+    return cols
+
+def get_plan(conn, sql):
+    try:
+        return get_executor().explain(conn, sql)
+    except Exception as e:
+        print(f"\n   ⚠️ EXPLAIN Error: {e}")
+        return None
+
+def walk_plan(plan, workers=0):
+    # (düğüm, paralel işçi sayısı) çiftlerini derinlik öncelikli üretir
+    workers = plan.get("Workers Planned", workers)
+    yield plan, workers
+    for child in plan.get("Plans", []):
+        yield from walk_plan(child, workers)
+
+def node_columns(node):
+    text = " ".join(str(node.get(k, "")) for k in CONDITION_KEYS)
+    return sorted(set(COLUMN_PATTERN.findall(text)))
+
+def plan_operators(conn, plan):
+    operators = []
+    for node, workers in walk_plan(plan):
+        est_rows = node.get("Plan Rows", 0)
+        # Paralel düğümlerde Plan Rows işçi başınadır (lider dahil)
+        if node.get("Parallel Aware"):
+            est_rows *= workers + 1
+        op = {
+            "node_type": node.get("Node Type"),
+            "relation": node.get("Relation Name"),
+            "est_rows": est_rows,
+            "startup_cost": node.get("Startup Cost"),
+            "total_cost": node.get("Total Cost"),
+            "join_type": node.get("Join Type"),
+            "index_name": node.get("Index Name"),
+            "columns": node_columns(node),
+            "selectivity": None
+        }
+        if op["node_type"] in SCAN_NODES and op["relation"]:
+            total = get_reltuples(conn, op["relation"])
+            op["selectivity"] = min(est_rows / total, 1.0) if total else None
+        operators.append(op)
+    return operators
+
+def extract_plan_features(conn, sql, candidates=None):
+    # Dönüş: (özellik sözlüğü, operatör listesi) veya plan alınamazsa (None, [])
+    plan = get_plan(conn, sql)
+    if plan is None:
+        return None, []
+    operators = plan_operators(conn, plan)
+
+    features = {c: 0 for c in feature_columns(candidates)}
+    features["query_type"] = 0 if plan.get("Node Type") == "ModifyTable" else 1
+    features["plan_total_cost"] = plan.get("Total Cost", 0)
+    features["plan_rows"] = plan.get("Plan Rows", 0)
+    features["node_count"] = len(operators)
+    features["min_scan_selectivity"] = 1.0
+
+    filtered = set()
+    for op in operators:
+        node_type = op["node_type"]
+        if op["relation"] in TPCH_TABLES:
+            features[f"table_{op['relation']}"] = 1
+        if node_type == "Seq Scan":
+            features["seq_scan_count"] += 1
+        elif node_type in ("Index Scan", "Index Only Scan"):
+            features["index_scan_count"] += 1
+        elif node_type == "Bitmap Heap Scan":
+            features["bitmap_scan_count"] += 1
+        if node_type in JOIN_NODES:
+            features[JOIN_NODES[node_type]] += 1
+        if node_type in ("Sort", "Incremental Sort"):
+            features["sort_count"] += 1
+        if node_type == "Aggregate":
+            features["agg_count"] += 1
+        if node_type in SCAN_NODES:
+            features["max_scan_rows"] = max(features["max_scan_rows"], op["est_rows"])
+            if op["selectivity"] is not None:
+                features["min_scan_selectivity"] = min(features["min_scan_selectivity"], op["selectivity"])
+            filtered.update((op["relation"], c) for c in op["columns"])
+        # Aday listesinde olmayan kolonlar da işaretlenir; model kaydettiği kolonları seçer
+        for col in op["columns"]:
+            features[f"col_{col}"] = 1
+
+    features["join_count"] = sum(features[k] for k in JOIN_NODES.values())
+    # Filtrelenen kolonlar arasında en yüksek farklı değer sayısı
+    if filtered:
+        features["col_distinct_count"] = max(get_column_distinct(conn, t, c) for t, c in filtered)
+    return features, operators
@@ -0,0 +1,175 @@
+import os
+import io
+import time
+import argparse
+import subprocess
+import statistics
+import config
+from tpch_loader import _TrimmedReader
+from measurement import _percentile
+from candidate_generator import load_candidates
+from training_data_generator import manage_index
+from result_store import open_store, config_key, get_result, put_result, refresh_cost
+from executor import get_executor, postgres_only
+
+# --- TPC-H YENİLEME FONKSİYONLARI (RF1 / RF2) ---
+# dbgen -U ile üretilen güncelleme setleri kullanılır:
+#   RF1: orders.tbl.uN + lineitem.tbl.uN -> tek işlemde COPY ile toplu ekleme
+#   RF2: delete.N anahtarları -> tek işlemde parti parti DELETE (önce lineitem)
+# Ölçümden sonra veritabanı eski haline getirilir (RF1 satırları silinir,
+# RF2'nin sildiği satırlar önceden alınan kopyadan geri yüklenir), böylece aynı
+# set her indeks konfigürasyonu altında tekrar tekrar zamanlanabilir.
+
+REFRESH_TABLES = [("orders", "o_orderkey"), ("lineitem", "l_orderkey")]
+
+def update_set_paths(n):
+    return {"orders": os.path.join(config.REFRESH_DIR, f"orders.tbl.u{n}"),
+            "lineitem": os.path.join(config.REFRESH_DIR, f"lineitem.tbl.u{n}"),
+            "delete": os.path.join(config.REFRESH_DIR, f"delete.{n}")}
+
+def ensure_update_sets(count):
+    # Eksik set varsa dbgen -U ile hepsi (1..count) yeniden üretilir
+    if all(os.path.exists(p) for n in range(1, count + 1) for p in update_set_paths(n).values()):
+        return True
+    os.makedirs(config.REFRESH_DIR, exist_ok=True)
+    print(f"   🧬 dbgen -U {count}: güncelleme setleri üretiliyor -> {config.REFRESH_DIR}")
+    cmd = [os.path.abspath(os.path.join(config.DBGEN_DIR, "dbgen")), "-q", "-f",
+           "-s", str(config.SCALE_FACTOR), "-U", str(count), "-b", "dists.dss"]
+    env = dict(os.environ, DSS_PATH=os.path.abspath(config.REFRESH_DIR))
+    proc = subprocess.run(cmd, cwd=config.DBGEN_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    if proc.returncode != 0:
+        print(f"   ⚠️ dbgen hatası: {proc.stderr.decode(errors='ignore').strip()}")
+        return False
+    return True
+
+def read_keys(path):
+    # Güncelleme dosyalarında ilk kolon sipariş anahtarıdır ("1|...")
+    with open(path, encoding="utf-8") as f:
+        return sorted({int(line.split("|", 1)[0]) for line in f if line.strip()})
+
+def rf1(conn, n):
+    # Dönüş: (süre ms, eklenen satır)
+    paths = update_set_paths(n)
+    rows = 0
+    cur = conn.cursor()
+    start = time.perf_counter()
+    cur.execute("BEGIN")
+    for table, _ in REFRESH_TABLES:
+        with open(paths[table], encoding="utf-8") as f:
+            cur.copy_expert(f"COPY {table} FROM STDIN WITH (DELIMITER '|')", _TrimmedReader(f))
+            rows += cur.rowcount
+    cur.execute("COMMIT")
+    elapsed = (time.perf_counter() - start) * 1000
+    cur.close()
+    return elapsed, rows
+
+def snapshot_deleted(conn, n):
+    # RF2'nin sileceği satırların kopyası (ölçüm dışı), geri yükleme için
+    keys = read_keys(update_set_paths(n)["delete"])
+    snapshot = {}
+    cur = conn.cursor()
+    for table, key in REFRESH_TABLES:
+        buf = io.StringIO()
+        cur.copy_expert(cur.mogrify(f"COPY (SELECT * FROM {table} WHERE {key} = ANY(%s)) TO STDOUT", (keys,)).decode(), buf)
+        snapshot[table] = buf.getvalue()
+    cur.close()
+    return snapshot
+
+def rf2(conn, n):
+    # Dönüş: (süre ms, silinen satır)
+    keys = read_keys(update_set_paths(n)["delete"])
+    batch = config.REFRESH_DELETE_BATCH
+    rows = 0
+    cur = conn.cursor()
+    start = time.perf_counter()
+    cur.execute("BEGIN")
+    # Yabancı anahtar sırası: önce lineitem, sonra orders
+    for table, key in reversed(REFRESH_TABLES):
+        for i in range(0, len(keys), batch):
+            cur.execute(f"DELETE FROM {table} WHERE {key} = ANY(%s)", (keys[i:i + batch],))
+            rows += cur.rowcount
+    cur.execute("COMMIT")
+    elapsed = (time.perf_counter() - start) * 1000
+    cur.close()
+    return elapsed, rows
+
+def undo_refresh(conn, n, snapshot=None, inserted=True):
+    # RF1 eklemelerini siler, RF2 silmelerini kopyadan geri yükler
+    cur = conn.cursor()
+    cur.execute("BEGIN")
+    if inserted:
+        keys = read_keys(update_set_paths(n)["orders"])
+        for table, key in reversed(REFRESH_TABLES):
+            cur.execute(f"DELETE FROM {table} WHERE {key} = ANY(%s)", (keys,))
+    for table, _ in REFRESH_TABLES:
+        if snapshot and snapshot.get(table):
+            cur.copy_expert(f"COPY {table} FROM STDIN", io.StringIO(snapshot[table]))
+    cur.execute("COMMIT")
+    cur.close()
+
+def abort(conn):
+    # Yarım kalan BEGIN'i kapat (autocommit bağlantıda rollback() etkisizdir)
+    try:
+        conn.cursor().execute("ROLLBACK")
+    except Exception:
+        pass
+
+def time_refresh_pair(conn, n):
+    # Tek set için RF1 + RF2 süreleri; veritabanı sonunda eski haline döner
+    snapshot = snapshot_deleted(conn, n)
+    result = {}
+    try:
+        result["RF1"], result["inserted"] = rf1(conn, n)
+        result["RF2"], result["deleted"] = rf2(conn, n)
+    finally:
+        abort(conn)
+        # Yalnızca gerçekten işlenmiş (COMMIT) adımlar geri alınır
+        undo_refresh(conn, n, snapshot if "RF2" in result else None, inserted="RF1" in result)
+    return result
+
+def main():
+    parser = argparse.ArgumentParser(description="TPC-H RF1/RF2 yenileme fonksiyonlarını indeks konfigürasyonları altında zamanla")
+    parser.add_argument("--sets", type=int, default=config.REFRESH_SETS, help="Kullanılacak güncelleme seti sayısı")
+    args = parser.parse_args()
+
+    print(f"--- YENİLEME FONKSİYONLARI (SF={config.SCALE_FACTOR}) ---")
+    if not postgres_only("Yenileme fonksiyonları"): return
+    if not ensure_update_sets(args.sets):
+        return
+    try:
+        conn = get_executor().connect()
+    except Exception as e:
+        print(f"Bağlantı hatası: {e}")
+        return
+
+    store = open_store()
+    for idx in [None] + load_candidates():
+        name = idx[0] if idx else "base"
+        cfg = config_key(idx)
+        if all(get_result(store, rf, cfg, "refresh") for rf in ("RF1", "RF2")):
+            print(f"   💾 {name}: depoda mevcut.")
+            continue
+
+        if idx: manage_index(conn, "CREATE", idx)
+        try:
+            timings = [time_refresh_pair(conn, n) for n in range(1, args.sets + 1)]
+        finally:
+            if idx: manage_index(conn, "DROP", idx)
+
+        for rf in ("RF1", "RF2"):
+            samples = [t[rf] for t in timings]
+            put_result(store, rf, cfg, "refresh", {"median": statistics.median(samples), "p95": _percentile(samples, 0.95)})
+        print(f"   ▶ {name}: RF1 {statistics.median(t['RF1'] for t in timings):.0f} ms | "
+              f"RF2 {statistics.median(t['RF2'] for t in timings):.0f} ms "
+              f"({timings[0]['inserted']} ekleme / {timings[0]['deleted']} silme)")
+
+    base = refresh_cost(store)
+    for idx in load_candidates():
+        cost = refresh_cost(store, idx)
+        if base and cost:
+            print(f"   {idx[0]}: yazma maliyeti x{cost / base:.2f}")
+    store.close()
+    conn.close()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import argparse
+import config
+from result_store import query_fingerprint, is_dml
+from executor import get_executor
+
+# --- KALICI ÖLÇÜM SONUCU ÖNBELLEĞİ (MEMOİZASYON) ---
+# measure_query sonuçları şu anahtarla saklanır:
+#   normalize sorgu parmak izi + dokunulan tablolardaki aktif indeks tanımları
+#   + veri sürümü (son ANALYZE, relpages/reltuples, n_mod_since_analyze) + önbellek modu
+# Aynı SQL aynı indeks kümesiyle değişmemiş veri üzerinde tekrar ölçülmez.
+# DML (UPDATE/INSERT/DELETE) ölçümleri önbelleğe alınmaz: her koşu veriyi/bakım maliyetini etkiler.
+# İndeksler isimden bağımsız DDL ile anahtarlanır (aynı indeks yeniden kurulunca da isabet eder).
+# Kayıt sayısı RESULT_CACHE_MAX_ENTRIES'i aşınca en uzun süredir kullanılmayanlar (LRU) silinir.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS measure_cache (
+    key TEXT PRIMARY KEY, fingerprint TEXT, index_config TEXT, data_version TEXT,
+    result TEXT, created_at REAL, last_used REAL
+);
+CREATE INDEX IF NOT EXISTS measure_cache_lru ON measure_cache (last_used);
+"""
+
+_db = None
+_db_pid = None
+
+def _open():
+    # Paralel işçiler fork sonrası kendi SQLite bağlantısını açar
+    global _db, _db_pid
+    if _db is None or _db_pid != os.getpid():
+        _db = sqlite3.connect(config.RESULT_CACHE_FILE, timeout=30)
+        _db.execute("PRAGMA journal_mode=WAL")
+        _db.executescript(SCHEMA)
+        _db_pid = os.getpid()
+    return _db
+
+def table_signature(conn, tables):
+    # Dönüş: (indeks konfigürasyonu, veri sürümü) metinleri
+    rows = get_executor().table_signature(conn, tables)
+    index_config = " | ".join(f"{name}: {indexes or '-'}" for name, _, _, indexes in rows)
+    data_version = " | ".join(f"{name}@{analyzed}/{changes}" for name, analyzed, changes, _ in rows)
+    return index_config, data_version
+
+def cacheable(sql):
+    return not is_dml(sql)
+
+def cache_key(conn, sql, tables, cache_mode):
+    fingerprint = query_fingerprint(sql)
+    index_config, data_version = table_signature(conn, tables)
+    key = hashlib.sha1("\n".join([fingerprint, index_config, data_version, cache_mode]).encode()).hexdigest()
+    return key, fingerprint, index_config, data_version
+
+def lookup(key):
+    db = _open()
+    row = db.execute("SELECT result FROM measure_cache WHERE key = ?", (key,)).fetchone()
+    if row is None:
+        return None
+    db.execute("UPDATE measure_cache SET last_used = ? WHERE key = ?", (time.time(), key))
+    db.commit()
+    return dict(json.loads(row[0]), cached=True)
+
+def store(key, fingerprint, index_config, data_version, result):
+    db = _open()
+    now = time.time()
+    db.execute("INSERT OR REPLACE INTO measure_cache VALUES (?, ?, ?, ?, ?, ?, ?)",
+               (key, fingerprint, index_config, data_version, json.dumps(result), now, now))
+    # LRU tahliyesi: sınırı aşan en eski kullanılanlar
+    db.execute("""DELETE FROM measure_cache WHERE key IN (
+                    SELECT key FROM measure_cache ORDER BY last_used DESC LIMIT -1 OFFSET ?)""",
+               (config.RESULT_CACHE_MAX_ENTRIES,))
+    db.commit()
+
+def main():
+    parser = argparse.ArgumentParser(description="Ölçüm sonucu önbelleği")
+    parser.add_argument("--clear", action="store_true", help="Tüm kayıtları sil")
+    args = parser.parse_args()
+
+    db = _open()
+    if args.clear:
+        db.execute("DELETE FROM measure_cache")
+        db.commit()
+        db.execute("VACUUM")
+        print(f"🗑️  Önbellek temizlendi: {config.RESULT_CACHE_FILE}")
+        return
+    count, queries = db.execute("SELECT count(*), count(DISTINCT fingerprint) FROM measure_cache").fetchone()
+    size = os.path.getsize(config.RESULT_CACHE_FILE) / 1024 ** 2
+    print(f"--- ÖLÇÜM ÖNBELLEĞİ: {config.RESULT_CACHE_FILE} ---")
+    print(f"Kayıt: {count}/{config.RESULT_CACHE_MAX_ENTRIES} | Farklı sorgu: {queries} | Boyut: {size:.1f} MB")
+
+if __name__ == "__main__":
+    main()
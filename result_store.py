@@ -0,0 +1,140 @@
+import re
+import json
+import sqlite3
+import hashlib
+import config
+from candidate_generator import index_ddl
+
+# --- SÜREKLİ (APPEND-ONLY) ÖLÇÜM DEPOSU ---
+# Her ölçüm, alındığı anda SQLite'a yazılır (checkpoint). Anahtar:
+# (sorgu parmak izi, indeks konfigürasyonu, mod). Çöken bir koşu tekrar
+# başlatıldığında depodaki çiftler atlanır; yeni sorgu/aday eklendiğinde
+# yalnızca eksik çiftler ölçülür. İş yükü de depoya yazılır ki yeniden
+# başlatmada aynı (rastgele üretilmiş) sorgular kullanılsın.
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS workload (
+    pos INTEGER PRIMARY KEY, q_type TEXT, sql TEXT, meta TEXT
+);
+CREATE TABLE IF NOT EXISTS results (
+    fingerprint TEXT, config TEXT, mode TEXT,
+    median REAL, p95 REAL, cost REAL, uses_index INTEGER, timed_out INTEGER,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (fingerprint, config, mode)
+);
+CREATE TABLE IF NOT EXISTS builds (
+    config TEXT PRIMARY KEY, build_ms REAL, size_bytes REAL,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS feedback (
+    id INTEGER PRIMARY KEY AUTOINCREMENT, source TEXT, fingerprint TEXT,
+    features TEXT, targets TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS model_versions (
+    version INTEGER PRIMARY KEY, path TEXT, feedback_id INTEGER,
+    score REAL, previous_score REAL, status TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP
+);
+CREATE TABLE IF NOT EXISTS contention (
+    run_key TEXT, config TEXT, stats TEXT,
+    created_at TEXT DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (run_key, config)
+);
+"""
+
+BASE_CONFIG = ""
+
+def open_store(path=None):
+    store = sqlite3.connect(path or config.RESULT_STORE)
+    store.execute("PRAGMA journal_mode=WAL")
+    store.executescript(SCHEMA)
+    return store
+
+def query_fingerprint(sql):
+    # Literaller korunur (farklı parametre = farklı ölçüm); yalnızca boşluk/harf farkı yok sayılır
+    normalized = re.sub(r"\s+", " ", sql.strip().rstrip(";")).lower()
+    return hashlib.sha1(normalized.encode()).hexdigest()
+
+def is_dml(sql):
+    # Baştaki /* TPC-H ... */ etiketi atlanır
+    return re.match(r"^\s*(?:/\*.*?\*/\s*)?(UPDATE|INSERT|DELETE)\b", sql, re.I | re.S) is not None
+
+def config_key(index_def=None):
+    # İsim değil DDL anahtardır: aynı indeks farklı adla üretilse de eşleşir
+    return BASE_CONFIG if index_def is None else index_ddl(index_def, with_name=False)
+
+def get_result(store, fingerprint, cfg, mode):
+    row = store.execute("SELECT median, p95, cost, uses_index, timed_out FROM results WHERE fingerprint = ? AND config = ? AND mode = ?",
+                        (fingerprint, cfg, mode)).fetchone()
+    if row is None:
+        return None
+    return {"median": row[0], "p95": row[1], "cost": row[2], "uses_index": bool(row[3]), "timed_out": bool(row[4])}
+
+def put_result(store, fingerprint, cfg, mode, result):
+    store.execute("INSERT OR IGNORE INTO results (fingerprint, config, mode, median, p95, cost, uses_index, timed_out) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                  (fingerprint, cfg, mode, result.get("median"), result.get("p95"), result.get("cost"),
+                   int(bool(result.get("uses_index"))), int(bool(result.get("timed_out")))))
+    store.commit()
+
+def load_workload(store):
+    rows = store.execute("SELECT q_type, sql, meta FROM workload ORDER BY pos").fetchall()
+    return [(q_type, sql, json.loads(meta)) for q_type, sql, meta in rows]
+
+def append_workload(store, items, start_pos):
+    store.executemany("INSERT INTO workload (pos, q_type, sql, meta) VALUES (?, ?, ?, ?)",
+                      [(start_pos + n, q_type, sql, json.dumps(meta)) for n, (q_type, sql, meta) in enumerate(items)])
+    store.commit()
+
+def put_build(store, cfg, build):
+    # Fiziksel yapının (indeks / BRIN / bölümleme) son kurulum süresi ve boyutu
+    store.execute("INSERT OR REPLACE INTO builds (config, build_ms, size_bytes) VALUES (?, ?, ?)",
+                  (cfg, build["build_ms"], build["size_bytes"]))
+    store.commit()
+
+def get_build(store, cfg):
+    row = store.execute("SELECT build_ms, size_bytes FROM builds WHERE config = ?", (cfg,)).fetchone()
+    return {"build_ms": row[0], "size_bytes": row[1]} if row else None
+
+def put_feedback(store, source, fingerprint, features, targets):
+    # Öneri doğrulamasından / üretim zaman akışından gelen etiketli örnek
+    store.execute("INSERT INTO feedback (source, fingerprint, features, targets) VALUES (?, ?, ?, ?)",
+                  (source, fingerprint, json.dumps(features), json.dumps(targets)))
+    store.commit()
+
+def load_feedback(store, after_id=0):
+    # Dönüş: [(id, özellikler, hedefler), ...] (eskiden yeniye)
+    rows = store.execute("SELECT id, features, targets FROM feedback WHERE id > ? ORDER BY id", (after_id,))
+    return [(fid, json.loads(features), json.loads(targets)) for fid, features, targets in rows]
+
+def last_feedback_id(store):
+    return store.execute("SELECT coalesce(max(id), 0) FROM feedback").fetchone()[0]
+
+def put_contention(store, run_key, cfg, stats):
+    store.execute("INSERT OR REPLACE INTO contention (run_key, config, stats) VALUES (?, ?, ?)",
+                  (run_key, cfg, json.dumps(stats)))
+    store.commit()
+
+def latest_contention(store):
+    # En son tekrar oynatma koşusunun {konfigürasyon: istatistik} sözlüğü
+    row = store.execute("SELECT run_key FROM contention WHERE config = ? ORDER BY created_at DESC, rowid DESC LIMIT 1", (BASE_CONFIG,)).fetchone()
+    if row is None:
+        return {}
+    return {cfg: json.loads(stats) for cfg, stats in
+            store.execute("SELECT config, stats FROM contention WHERE run_key = ?", (row[0],))}
+
+def dml_slowdown(stats, base):
+    # İndeksin yazma yükündeki bedeli: DML p95 oranı
+    if not stats or not base or not base["dml"].get("p95") or not stats["dml"].get("p95"):
+        return None
+    return stats["dml"]["p95"] / base["dml"]["p95"]
+
+def refresh_cost(store, idx_def=None):
+    # Depodaki RF1+RF2 medyan toplamı (ms); yoksa None
+    total = 0.0
+    for name in ("RF1", "RF2"):
+        result = get_result(store, name, config_key(idx_def), "refresh")
+        if result is None:
+            return None
+        total += result["median"]
+    return total
@@ -0,0 +1,71 @@
+import time
+import config
+from executor import get_executor
+
+# --- KATALOG İSTATİSTİK ÖNBELLEĞİ ---
+# pg_stats, pg_class ve indeks boyutları tek seferde toplu yüklenir, aramalar
+# bellekten yapılır. ANALYZE, DDL (indeks ekleme/silme) veya veri değişikliği
+# sürüm damgasını değiştirir; refresh_if_stale() bunu tek sorguyla fark edip
+# önbelleği yeniden yükler. manage_index gibi DDL yapan kodlar invalidate() çağırır.
+# Katalog sorguları arka uca aittir (executor.py); DuckDB'de SUMMARIZE ve depolama blokları kullanılır.
+# Yükleme başarısız olursa STATS_RETRY_S boyunca tekrar denenmez (aramalar varsayılan değerlerle döner).
+
+_cache = {"loaded": False, "columns": {}, "tables": {}, "indexes": {}, "version": None, "failed_at": None}
+
+def _data_version(conn):
+    return get_executor().data_version(conn)
+
+def _backing_off():
+    return _cache["failed_at"] is not None and time.time() - _cache["failed_at"] < config.STATS_RETRY_S
+
+def load(conn):
+    try:
+        _cache["columns"], _cache["tables"], _cache["indexes"] = get_executor().load_stats(conn)
+        _cache["version"] = _data_version(conn)
+        _cache["loaded"] = True
+        _cache["failed_at"] = None
+    except Exception as e:
+        # Hata hatırlanır: her aramada yeniden yükleme ve uyarı tekrarlanmaz
+        _cache["failed_at"] = time.time()
+        print(f"\n   ⚠️ İstatistik önbelleği yüklenemedi ({config.STATS_RETRY_S} sn sonra tekrar denenecek): {e}")
+
+def invalidate():
+    # Tüm önbellek düşer; bir sonraki aramada katalog sorguları (tablo başına istatistik,
+    # boyut ve indeks listesi) toplu olarak yeniden çalıştırılır.
+    _cache["columns"], _cache["tables"], _cache["indexes"] = {}, {}, {}
+    _cache["loaded"] = False
+    _cache["failed_at"] = None
+
+def refresh_if_stale(conn):
+    if _backing_off():
+        return
+    try:
+        if not _cache["loaded"] or _data_version(conn) != _cache["version"]:
+            load(conn)
+    except Exception as e:
+        print(f"\n   ⚠️ İstatistik sürüm kontrolü hatası: {e}")
+
+def _ensure_loaded(conn):
+    if not _cache["loaded"] and not _backing_off():
+        load(conn)
+
+def get_column_distinct(conn, table, column):
+    _ensure_loaded(conn)
+    n = _cache["columns"].get((table, column))
+    if n:
+        # Negatif n_distinct satır sayısına oran demektir; büyük bir sabitle temsil edilir
+        return n if n > 0 else 100000
+    return 1000
+
+def get_reltuples(conn, table):
+    _ensure_loaded(conn)
+    return _cache["tables"].get(table, (0, 0, "0 MB"))[0]
+
+def get_table_stats(conn, table):
+    _ensure_loaded(conn)
+    rows, _, pretty = _cache["tables"].get(table, (0, 0, "0 MB"))
+    return rows, pretty
+
+def get_index_size(conn, index_name):
+    _ensure_loaded(conn)
+    return _cache["indexes"].get(index_name, (None, 0))[1]
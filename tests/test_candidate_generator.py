@@ -0,0 +1,75 @@
+import random
+from collections import Counter
+import config
+import candidate_generator
+from candidate_generator import (parse_query_columns, query_candidates, generate_candidates, index_name,
+                                 covered_by_unique, index_columns, index_include)
+from workload import WorkloadGenerator
+
+Q6 = ("SELECT sum(l_extendedprice * l_discount) FROM lineitem WHERE l_shipdate >= '1994-01-01' "
+      "AND l_shipdate < '1995-01-01' AND l_discount BETWEEN 0.05 AND 0.07 AND l_quantity < 24")
+ORDERS = "SELECT o_orderkey FROM orders WHERE o_orderstatus = 'F' AND o_orderdate > '1995-01-01' AND o_totalprice > 1000"
+
+def classic_workload(n=20):
+    state = random.getstate()
+    random.seed(1)
+    mix, config.WORKLOAD_MIX = config.WORKLOAD_MIX, "classic"
+    try:
+        gen = WorkloadGenerator()
+        return [sql for _ in range(n) for _, sql, _ in gen.generate_set_1() + gen.generate_set_2()]
+    finally:
+        config.WORKLOAD_MIX = mix
+        random.setstate(state)
+
+def test_parse_query_columns_splits_eq_and_range():
+    usage = parse_query_columns(ORDERS)["orders"]
+    assert usage["eq"] == ["o_orderstatus"]
+    assert usage["range"] == ["o_orderdate", "o_totalprice"]
+    assert usage["select"] == ["o_orderkey"]
+
+def test_composite_key_keeps_one_range_column():
+    for table, key, include in query_candidates(ORDERS):
+        assert len([c for c in key if c in ("o_orderdate", "o_totalprice")]) <= 1
+    assert ("orders", ("o_orderstatus", "o_orderdate"), ("o_totalprice",)) in query_candidates(ORDERS)
+    assert ("lineitem", ("l_shipdate",), ("l_discount", "l_quantity")) in query_candidates(Q6)
+
+def test_index_name_distinguishes_include_lists():
+    a = index_name("lineitem", ("l_shipdate",), ("l_discount", "l_quantity"))
+    b = index_name("lineitem", ("l_shipdate",), ("l_discount", "l_quantity", "l_extendedprice"))
+    assert a != b
+    assert a != index_name("lineitem", ("l_shipdate",), ())
+
+def test_index_name_fits_postgres_limit():
+    name = index_name("lineitem", ("l_shipdate", "l_commitdate", "l_receiptdate"),
+                      ("l_extendedprice", "l_discount", "l_quantity", "l_returnflag"))
+    assert len(name) <= 63
+    assert name != index_name("lineitem", ("l_shipdate", "l_commitdate", "l_receiptdate"),
+                              ("l_extendedprice", "l_discount", "l_quantity", "l_linestatus"))
+
+def test_generated_candidate_names_are_unique():
+    candidates = generate_candidates(classic_workload())
+    assert candidates
+    assert not [n for n, k in Counter(c[0] for c in candidates).items() if k > 1]
+    # İsim, tanımdan yeniden üretilebilir (etiket kolonları ve DDL aynı tanımı gösterir)
+    for c in candidates:
+        assert c[0] == index_name(c[1], index_columns(c), index_include(c))
+
+def test_covered_by_unique_checks_prefix():
+    pk = [("l_orderkey", "l_linenumber")]
+    assert covered_by_unique(("l_orderkey",), pk)
+    assert covered_by_unique(("l_orderkey", "l_linenumber"), pk)
+    assert not covered_by_unique(("l_orderkey", "l_suppkey"), pk)
+    assert not covered_by_unique(("l_linenumber",), pk)
+
+def test_generate_candidates_drops_primary_key_prefixes(monkeypatch):
+    class Executor:
+        def unique_keys(self, conn):
+            return [("orders", ("o_orderkey",)), ("customer", ("c_custkey",)),
+                    ("lineitem", ("l_orderkey", "l_linenumber"))]
+    monkeypatch.setattr(candidate_generator, "get_executor", lambda: Executor())
+    monkeypatch.setattr(candidate_generator, "get_column_distinct", lambda conn, table, column: 10 ** 6)
+    sqls = classic_workload()
+    names = [c[0] for c in generate_candidates(sqls, conn=object())]
+    for pk_name in ("idx_orders_orderkey", "idx_customer_custkey", "idx_lineitem_orderkey"):
+        assert pk_name not in names
+    assert "idx_orders_orderkey" in [c[0] for c in generate_candidates(sqls)]
@@ -0,0 +1,40 @@
+import numpy as np
+import pytest
+
+xgboost = pytest.importorskip("xgboost")
+from sklearn.multioutput import MultiOutputClassifier, MultiOutputRegressor
+from fast_model import export_fast_model, FastModel
+
+def training_data(seed=0, n=400):
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n, 5))
+    X[rng.random(X.shape) < 0.05] = np.nan
+    return X, rng
+
+def test_classifier_margin_parity(tmp_path):
+    X, rng = training_data()
+    y = np.column_stack([(np.nan_to_num(X[:, 0]) > 0).astype(int),
+                         (np.nan_to_num(X[:, 1]) + np.nan_to_num(X[:, 2]) > 0.5).astype(int)])
+    model = MultiOutputClassifier(xgboost.XGBClassifier(n_estimators=30, max_depth=4, tree_method="hist")).fit(X, y)
+    path = str(tmp_path / "fast.npz")
+    export_fast_model(model, [f"x{i}" for i in range(5)], ["label_a", "label_b"], [], path)
+    fast = FastModel(path)
+
+    test = training_data(seed=1, n=200)[0]
+    for i, est in enumerate(model.estimators_):
+        np.testing.assert_allclose(fast.margins(test)[i], est.predict(test, output_margin=True), atol=1e-4)
+    for ref, got in zip(model.predict_proba(test), fast.predict_proba(test)):
+        np.testing.assert_allclose(got, ref, atol=1e-5)
+
+def test_regressor_parity(tmp_path):
+    X, rng = training_data()
+    y = np.column_stack([np.nan_to_num(X[:, 0]) * 2 + rng.normal(scale=0.1, size=len(X)), np.nan_to_num(X[:, 3]) ** 2])
+    model = MultiOutputRegressor(xgboost.XGBRegressor(n_estimators=30, max_depth=4, tree_method="hist")).fit(X, y)
+    model.kind_ = "regress"
+    path = str(tmp_path / "fast.npz")
+    export_fast_model(model, [f"x{i}" for i in range(5)], ["base_time", "ratio_a"], [], path)
+    fast = FastModel(path)
+
+    test = training_data(seed=2, n=200)[0]
+    assert fast.kind_ == "regress"
+    np.testing.assert_allclose(fast.predict(test), model.predict(test), atol=1e-4)
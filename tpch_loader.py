@@ -0,0 +1,262 @@
+import os
+import re
+import time
+import shutil
+import tempfile
+import threading
+import subprocess
+import multiprocessing as mp
+import config
+
+# --- PARALEL DBGEN -> POSTGRES YÜKLEYİCİ ---
+# Her tablo -C/-S ile parçalara bölünür. Her parça için dbgen'in çıktı dosyası
+# yerine bir FIFO (named pipe) açılır; dbgen FIFO'ya yazar, işçi aynı anda
+# COPY ... FROM STDIN ile okur. Diske ara .tbl dosyası yazılmaz.
+# BACKEND = "duckdb": dbgen küçük ölçekte geçici dizine .tbl yazar, tablolar gömülü
+# DuckDB dosyasına COPY ile alınır (sunucu, FIFO ve işçi havuzu gerekmez).
+
+# (dbgen -T kodu, tablo adı, parçalanabilir mi)
+TABLE_SPECS = [
+    ("L", "lineitem", True),
+    ("O", "orders", True),
+    ("S", "partsupp", True),
+    ("P", "part", True),
+    ("c", "customer", True),
+    ("s", "supplier", True),
+    ("n", "nation", False),
+    ("r", "region", False),
+]
+
+_conn = None
+
+class _TrimmedReader:
+    # dbgen her satırı '|' ile bitirir; COPY fazladan boş kolon görmesin diye kırpılır
+    def __init__(self, f):
+        self.f = f
+
+    def read(self, size=-1):
+        lines = self.f.readlines(size if size and size > 0 else -1)
+        return "".join(l[:-2] + "\n" if l.endswith("|\n") else l for l in lines)
+
+    def readline(self, size=-1):
+        line = self.f.readline(size)
+        return line[:-2] + "\n" if line.endswith("|\n") else line
+
+def _unblock_fifo(proc, fifo, done):
+    # dbgen FIFO'yu hiç açmadan çıkarsa okuyucu open() içinde sonsuza dek bekler;
+    # süreç bitince FIFO yazma ucundan açılıp kapatılarak okuyucuya EOF verilir.
+    # Okuyucu henüz open()'a girmemişse (ENXIO) kısa aralıklarla tekrar denenir.
+    proc.wait()
+    while not done.is_set():
+        try:
+            os.close(os.open(fifo, os.O_WRONLY | os.O_NONBLOCK))
+            return
+        except OSError:
+            time.sleep(0.05)
+
+def _init_worker():
+    global _conn
+    import psycopg2
+    try:
+        _conn = psycopg2.connect(**config.get_db_config())
+        _conn.autocommit = True
+    except Exception as e:
+        print(f"   ⚠️ Yükleyici bağlantı hatası: {e}")
+        _conn = None
+
+def _load_chunk(task):
+    code, table, step, chunks = task
+    if _conn is None:
+        return table, step, 0, 0, "Bağlantı yok"
+
+    tmp_dir = tempfile.mkdtemp(prefix="tpch_fifo_")
+    file_name = f"{table}.tbl.{step}" if chunks > 1 else f"{table}.tbl"
+    fifo = os.path.join(tmp_dir, file_name)
+    os.mkfifo(fifo)
+
+    cmd = [os.path.abspath(os.path.join(config.DBGEN_DIR, "dbgen")), "-q", "-f",
+           "-s", str(config.SCALE_FACTOR), "-T", code, "-b", "dists.dss"]
+    if chunks > 1:
+        cmd += ["-C", str(chunks), "-S", str(step)]
+    env = dict(os.environ, DSS_PATH=tmp_dir)
+
+    start = time.time()
+    error = None
+    rows = 0
+    proc = subprocess.Popen(cmd, cwd=config.DBGEN_DIR, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+    done = threading.Event()
+    threading.Thread(target=_unblock_fifo, args=(proc, fifo, done), daemon=True).start()
+    try:
+        # dbgen FIFO'yu yazmak için açana kadar open() bekler
+        with open(fifo, "r") as f:
+            cur = _conn.cursor()
+            cur.copy_expert(f"COPY {table} FROM STDIN WITH (DELIMITER '|')", _TrimmedReader(f))
+            rows = cur.rowcount
+            cur.close()
+    except Exception as e:
+        error = str(e)
+        proc.kill()
+    finally:
+        done.set()
+        _, stderr = proc.communicate()
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    if error is None and proc.returncode != 0:
+        error = stderr.decode(errors="ignore").strip() or f"dbgen çıkış kodu {proc.returncode}"
+    return table, step, rows, time.time() - start, error
+
+def _run_ddl(sql):
+    try:
+        cur = _conn.cursor()
+        cur.execute(sql)
+        cur.close()
+        return sql, None
+    except Exception as e:
+        return sql, str(e)
+
+def ensure_database():
+    import psycopg2
+    db_conf = config.get_db_config()
+    try:
+        conn = psycopg2.connect(**dict(db_conf, dbname="postgres"))
+        conn.autocommit = True
+        cur = conn.cursor()
+        cur.execute("SELECT 1 FROM pg_database WHERE datname = %s", (db_conf["dbname"],))
+        if not cur.fetchone():
+            print(f"   🆕 Veritabanı oluşturuluyor: {db_conf['dbname']}")
+            cur.execute(f"CREATE DATABASE {db_conf['dbname']}")
+        cur.close()
+        conn.close()
+        return True
+    except Exception as e:
+        print(f"Bağlantı hatası: {e}")
+        return False
+
+def create_schema(conn):
+    with open(os.path.join(config.DBGEN_DIR, "dss.ddl")) as f:
+        ddl = f.read()
+    cur = conn.cursor()
+    for _, table, _ in TABLE_SPECS:
+        cur.execute(f"DROP TABLE IF EXISTS {table} CASCADE")
+    for stmt in ddl.split(";"):
+        # Küçük harf: Postgres zaten katlar, DuckDB katalogda yazıldığı gibi saklar
+        stmt = "\n".join(l for l in stmt.splitlines() if not l.strip().startswith("--")).strip().lower()
+        if stmt:
+            cur.execute(stmt)
+    cur.close()
+
+def ri_statements():
+    # dss.ri DB2 sözdizimindedir; Postgres'e çevrilip PK ve FK listeleri olarak döner
+    with open(os.path.join(config.DBGEN_DIR, "dss.ri")) as f:
+        text = "\n".join(l for l in f.read().splitlines() if not l.strip().startswith("--"))
+    pks, fks = [], []
+    for stmt in text.split(";"):
+        stmt = " ".join(stmt.split()).replace("TPCD.", "")
+        if not stmt.upper().startswith("ALTER TABLE"):
+            continue
+        fk = re.match(r"ALTER TABLE (\w+) ADD FOREIGN KEY (\w+) (\([\w,]+\)) references (\w+)", stmt, re.I)
+        if fk:
+            fks.append(f"ALTER TABLE {fk.group(1)} ADD CONSTRAINT {fk.group(2)} FOREIGN KEY {fk.group(3)} REFERENCES {fk.group(4)}")
+        else:
+            pks.append(stmt)
+    return pks, fks
+
+def load_embedded():
+    import duckdb
+    print(f"--- TPC-H GÖMÜLÜ YÜKLEYİCİ (DuckDB, SF={config.SCALE_FACTOR}) ---")
+    print(f"Hedef: {config.DB_NAME}")
+
+    if not os.path.exists(os.path.join(config.DBGEN_DIR, "dbgen")):
+        print(f"Hata: {config.DBGEN_DIR}/dbgen bulunamadı. Önce 'make' ile derleyin.")
+        return
+
+    start = time.time()
+    tmp_dir = tempfile.mkdtemp(prefix="tpch_tbl_")
+    try:
+        print("1. dbgen .tbl dosyalarını üretiyor...")
+        cmd = [os.path.abspath(os.path.join(config.DBGEN_DIR, "dbgen")), "-q", "-f",
+               "-s", str(config.SCALE_FACTOR), "-b", "dists.dss"]
+        proc = subprocess.run(cmd, cwd=config.DBGEN_DIR, env=dict(os.environ, DSS_PATH=tmp_dir),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.PIPE)
+        if proc.returncode != 0:
+            print(f"Hata: {proc.stderr.decode(errors='ignore').strip() or f'dbgen çıkış kodu {proc.returncode}'}")
+            return
+
+        for path in (config.DB_NAME, config.DB_NAME + ".wal"):
+            if os.path.exists(path): os.remove(path)
+        conn = duckdb.connect(config.DB_NAME)
+        print("2. Şema oluşturuluyor (dss.ddl)...")
+        create_schema(conn)
+
+        # dbgen satır sonundaki '|' DuckDB COPY'de sorun çıkarmaz; kısıtlar (dss.ri) kurulmaz
+        print("3. Tablolar yükleniyor...")
+        for _, table, _ in TABLE_SPECS:
+            conn.execute(f"COPY {table} FROM '{os.path.join(tmp_dir, table + '.tbl')}' (DELIMITER '|')")
+            rows = conn.execute(f"SELECT count(*) FROM {table}").fetchone()[0]
+            print(f"   ✅ {table}: {rows:,} satır")
+
+        print("4. ANALYZE çalıştırılıyor...")
+        conn.execute("ANALYZE")
+        conn.execute("CHECKPOINT")
+        conn.close()
+    finally:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+    print(f"\n✅ Yükleme tamamlandı: {time.time() - start:.1f}s")
+
+def main():
+    if config.BACKEND == "duckdb":
+        load_embedded()
+        return
+    import psycopg2
+    print(f"--- TPC-H PARALEL YÜKLEYİCİ (SF={config.SCALE_FACTOR}) ---")
+    print(f"Hedef DB: {config.DB_NAME} | İşçi: {config.LOAD_WORKERS} | Parça: {config.LOAD_CHUNKS}")
+
+    if not os.path.exists(os.path.join(config.DBGEN_DIR, "dbgen")):
+        print(f"Hata: {config.DBGEN_DIR}/dbgen bulunamadı. Önce 'make' ile derleyin.")
+        return
+    if not ensure_database(): return
+
+    conn = psycopg2.connect(**config.get_db_config())
+    conn.autocommit = True
+
+    print("1. Şema oluşturuluyor (dss.ddl)...")
+    create_schema(conn)
+
+    tasks = []
+    for code, table, splittable in TABLE_SPECS:
+        chunks = config.LOAD_CHUNKS if splittable else 1
+        tasks += [(code, table, step, chunks) for step in range(1, chunks + 1)]
+
+    print(f"2. {len(tasks)} parça dbgen -> COPY akışı ile yükleniyor...")
+    start = time.time()
+    total_rows = 0
+    with mp.Pool(config.LOAD_WORKERS, initializer=_init_worker) as pool:
+        for table, step, rows, elapsed, error in pool.imap_unordered(_load_chunk, tasks):
+            if error:
+                print(f"   ⚠️ {table}.{step}: {error}")
+            else:
+                total_rows += rows
+                print(f"   ✅ {table}.{step}: {rows:,} satır ({elapsed:.1f}s)")
+        print(f"   📦 Toplam {total_rows:,} satır, {time.time() - start:.1f}s")
+
+        # 3. Kısıtlar: PK'lar farklı tablolarda paralel, FK'lar sırayla (kilit çakışması)
+        pks, fks = ri_statements()
+        print(f"3. {len(pks)} PK paralel, {len(fks)} FK sıralı oluşturuluyor (dss.ri)...")
+        for sql, error in pool.imap_unordered(_run_ddl, pks):
+            if error: print(f"   ⚠️ {sql}: {error}")
+    for sql in fks:
+        try:
+            cur = conn.cursor()
+            cur.execute(sql)
+            cur.close()
+        except Exception as e:
+            print(f"   ⚠️ {sql}: {e}")
+
+    print("4. ANALYZE çalıştırılıyor...")
+    cur = conn.cursor()
+    cur.execute("ANALYZE")
+    cur.close()
+    conn.close()
+    print(f"\n✅ Yükleme tamamlandı: {time.time() - start:.1f}s")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,267 @@
+import os
+import re
+import json
+import random
+from datetime import date, timedelta
+import config
+
+# --- TPC-H 22 SORGU ŞABLONLARI (qgen eşdeğeri) ---
+# dbgen/queries/*.sql şablonları okunur, :1 :2 ... parametreleri qgen'in
+# (varsub.c) dağılımlarıyla Python'da üretilir. Değer listeleri dists.dss'ten
+# (ağırlıklarıyla) alınır. Her sorgu iki biçimde verilebilir:
+#   - literal SQL (EXPLAIN, aday üretimi, parmak izi için)
+#   - sunucu tarafı hazır ifade: PREPARE tpch_qN AS ... $1 / EXECUTE tpch_qN (...)
+# Literal SQL'in başındaki /* TPC-H Qn params=[...] */ etiketi, ölçüm anında
+# aynı sorgunun EXECUTE biçimine çevrilmesini sağlar (süreçler arası da çalışır).
+
+QUERY_COUNT = 22
+# Postgres tek ifade çalıştırabilsin diye Q15 için view yerine CTE varyantı
+VARIANTS = {15: "15a.sql"}
+TPCH_TABLES = ["lineitem", "orders", "customer", "part", "partsupp", "supplier", "nation", "region"]
+
+# n_regionkey (nation tablosu ile aynı eşleme)
+NATION_REGION = {
+    "ALGERIA": 0, "ARGENTINA": 1, "BRAZIL": 1, "CANADA": 1, "EGYPT": 4, "ETHIOPIA": 0,
+    "FRANCE": 3, "GERMANY": 3, "INDIA": 2, "INDONESIA": 2, "IRAN": 4, "IRAQ": 4,
+    "JAPAN": 2, "JORDAN": 4, "KENYA": 0, "MOROCCO": 0, "MOZAMBIQUE": 0, "PERU": 1,
+    "CHINA": 2, "ROMANIA": 3, "SAUDI ARABIA": 4, "VIETNAM": 2, "RUSSIA": 3,
+    "UNITED KINGDOM": 3, "UNITED STATES": 1,
+}
+REGIONS = ["AFRICA", "AMERICA", "ASIA", "EUROPE", "MIDDLE EAST"]
+
+# qgen -d (varsub.c defaults): dbgen/answers/q*.out bu parametrelerle SF=1'de üretilmiştir
+VALIDATION_PARAMS = {
+    1: ["90"], 2: ["15", "BRASS", "EUROPE"], 3: ["BUILDING", "1995-03-15"], 4: ["1993-07-01"],
+    5: ["ASIA", "1994-01-01"], 6: ["1994-01-01", ".06", "24"], 7: ["FRANCE", "GERMANY"],
+    8: ["BRAZIL", "AMERICA", "ECONOMY ANODIZED STEEL"], 9: ["green"], 10: ["1993-10-01"],
+    11: ["GERMANY", "0.0001"], 12: ["MAIL", "SHIP", "1994-01-01"], 13: ["special", "requests"],
+    14: ["1995-09-01"], 15: ["1996-01-01"],
+    16: ["Brand#45", "MEDIUM POLISHED", "49", "14", "23", "45", "19", "3", "36", "9"],
+    17: ["Brand#23", "MED BOX"], 18: ["300"], 19: ["Brand#12", "Brand#23", "Brand#34", "1", "10", "20"],
+    20: ["forest", "1994-01-01", "CANADA"], 21: ["SAUDI ARABIA"], 22: ["13", "31", "23", "29", "30", "18", "17"],
+}
+
+PARAM_PATTERN = re.compile(r":(\d+)")
+QUOTED_PATTERN = re.compile(r"(\b(?:date|interval)\s+)?'([^']*)'(\s+(?:day|month|year)\b)?", re.I)
+TAG_PATTERN = re.compile(r"^/\* TPC-H Q(\d+) params=(\[.*?\]) \*/")
+
+_templates = {}
+_dists = {}
+_permutations = []
+
+# --- Şablon ve dağılım okuma ---
+
+def _template_path(qnum):
+    if qnum in VARIANTS:
+        return os.path.join(config.DBGEN_DIR, "variants", VARIANTS[qnum])
+    return os.path.join(config.DBGEN_DIR, "queries", f"{qnum}.sql")
+
+def load_template(qnum):
+    # qgen yönergeleri ayıklanır: ":x"/":o" atılır, ":n N" LIMIT'e çevrilir
+    if qnum in _templates:
+        return _templates[qnum]
+    lines, limit = [], -1
+    with open(_template_path(qnum), encoding="utf-8") as f:
+        for line in f:
+            stripped = line.strip()
+            if stripped.startswith("--") or stripped in (":x", ":o") or not stripped:
+                continue
+            if stripped.startswith(":n"):
+                limit = int(stripped.split()[1])
+                continue
+            lines.append(line.rstrip())
+    sql = "\n".join(lines).strip().rstrip(";")
+    # ANSI "interval '90' day (3)" Postgres'te geçersiz; hassasiyet kaldırılır
+    sql = re.sub(r"(\bday)\s*\(\d+\)", r"\1", sql, flags=re.I)
+    if limit > 0:
+        sql += f"\nlimit {limit}"
+    _templates[qnum] = sql
+    return sql
+
+def read_dist(name):
+    # dists.dss: "begin <isim>" ... "değer|ağırlık" ... "end <isim>" (büyük/küçük harf duyarsız)
+    if name in _dists:
+        return _dists[name]
+    values, weights, inside = [], [], False
+    with open(os.path.join(config.DBGEN_DIR, "dists.dss"), encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            lower = line.lower()
+            if lower == f"begin {name.lower()}":
+                inside = True
+            elif lower == f"end {name.lower()}":
+                break
+            elif inside and "|" in line and not lower.startswith("count|"):
+                value, weight = line.rsplit("|", 1)
+                values.append(value)
+                weights.append(int(weight))
+    _dists[name] = (values, weights)
+    return _dists[name]
+
+def stream_order(stream):
+    # TPC-H Ek A sorgu sırası (qgen permute.h); akış 0 = güç testi
+    if not _permutations:
+        with open(os.path.join(config.DBGEN_DIR, "permute.h"), encoding="utf-8") as f:
+            for row in re.findall(r"\{([\d,\s]+)\}", f.read()):
+                _permutations.append([int(q) for q in row.split(",")])
+    return _permutations[stream % len(_permutations)]
+
+def pick(name, rng=random):
+    values, weights = read_dist(name)
+    return rng.choices(values, weights=weights)[0]
+
+def _month(offset, first_year=1993):
+    return f"{first_year + offset // 12}-{offset % 12 + 1:02d}-01"
+
+def _year(rng):
+    return f"19{rng.randint(93, 97)}-01-01"
+
+def _brand(rng):
+    return f"Brand#{rng.randint(1, 5)}{rng.randint(1, 5)}"
+
+def _distinct(rng, name, count):
+    picked = []
+    while len(picked) < count:
+        value = pick(name, rng)
+        if value not in picked:
+            picked.append(value)
+    return picked
+
+# --- Parametre üretimi (varsub.c ile aynı aralıklar) ---
+
+def generate_params(qnum, rng=random):
+    if qnum == 1:
+        return [str(rng.randint(60, 120))]
+    if qnum == 2:
+        return [str(rng.randint(1, 50)), pick("p_types", rng).split()[-1], pick("regions", rng)]
+    if qnum == 3:
+        return [pick("msegmnt", rng), str(date(1995, 3, 1) + timedelta(days=rng.randint(0, 30)))]
+    if qnum == 4:
+        return [_month(rng.randint(0, 57))]
+    if qnum == 5:
+        return [pick("regions", rng), _year(rng)]
+    if qnum == 6:
+        return [_year(rng), f"0.0{rng.randint(2, 9)}", str(rng.randint(24, 25))]
+    if qnum == 7:
+        return _distinct(rng, "nations2", 2)
+    if qnum == 8:
+        nation = pick("nations2", rng)
+        return [nation, REGIONS[NATION_REGION[nation]], pick("p_types", rng)]
+    if qnum == 9:
+        return [pick("colors", rng)]
+    if qnum == 10:
+        return [_month(rng.randint(1, 24))]
+    if qnum == 11:
+        return [pick("nations2", rng), f"{0.0001 / config.SCALE_FACTOR:.10f}"]
+    if qnum == 12:
+        return _distinct(rng, "smode", 2) + [_year(rng)]
+    if qnum == 13:
+        return [pick("Q13a", rng), pick("Q13b", rng)]
+    if qnum == 14:
+        return [_month(rng.randint(0, 59))]
+    if qnum == 15:
+        return [_month(rng.randint(0, 57))]
+    if qnum == 16:
+        # Tip öneki (son kelime hariç) + 1..50 arasından 8 farklı boyut
+        return [_brand(rng), pick("p_types", rng).rsplit(" ", 1)[0]] + [str(s) for s in rng.sample(range(1, 51), 8)]
+    if qnum == 17:
+        return [_brand(rng), pick("p_cntr", rng)]
+    if qnum == 18:
+        return [str(rng.randint(312, 315))]
+    if qnum == 19:
+        return [_brand(rng), _brand(rng), _brand(rng),
+                str(rng.randint(1, 10)), str(rng.randint(10, 20)), str(rng.randint(20, 30))]
+    if qnum == 20:
+        return [pick("colors", rng), _year(rng), pick("nations2", rng)]
+    if qnum == 21:
+        return [pick("nations2", rng)]
+    if qnum == 22:
+        return [str(10 + c) for c in rng.sample(range(25), 7)]
+    raise ValueError(f"Geçersiz TPC-H sorgu numarası: {qnum}")
+
+# --- Literal ve hazır ifade biçimleri ---
+
+def render(qnum, params):
+    sql = PARAM_PATTERN.sub(lambda m: params[int(m.group(1)) - 1], load_template(qnum))
+    return f"/* TPC-H Q{qnum} params={json.dumps(params)} */\n{sql}"
+
+def _quoted_to_expr(match):
+    prefix, body, unit = match.group(1), match.group(2), match.group(3)
+    if not PARAM_PATTERN.search(body):
+        return match.group(0)
+    # '%:1%:2%' -> ('%' || CAST($1 AS text) || '%' || ...)
+    pieces = []
+    for n, part in enumerate(PARAM_PATTERN.split(body)):
+        if n % 2:
+            pieces.append(f"CAST(${part} AS text)")
+        elif part:
+            pieces.append(f"'{part}'")
+    expr = pieces[0] if len(pieces) == 1 else "(" + " || ".join(pieces) + ")"
+    if prefix and prefix.strip().lower() == "date":
+        return f"CAST({expr} AS date){unit or ''}"
+    if prefix and prefix.strip().lower() == "interval":
+        return f"CAST({expr} || ' {unit.strip() if unit else 'day'}' AS interval)"
+    return expr if len(pieces) > 1 else f"${PARAM_PATTERN.search(body).group(1)}"
+
+def parameterized(qnum):
+    # Şablonun $n yer tutuculu hali (PREPARE gövdesi)
+    sql = QUOTED_PATTERN.sub(_quoted_to_expr, load_template(qnum))
+    return re.sub(r"(?<![:\w]):(\d+)", r"$\1", sql)
+
+def statement_name(qnum):
+    return f"tpch_q{qnum}"
+
+def parse_tag(sql):
+    match = TAG_PATTERN.match(sql.lstrip())
+    if not match:
+        return None, None
+    return int(match.group(1)), json.loads(match.group(2))
+
+def prepare(conn, qnum):
+    # Bağlantı başına bir kez PREPARE; indeks değişince Postgres planı kendisi geçersiz kılar
+    name = statement_name(qnum)
+    cur = conn.cursor()
+    cur.execute("SELECT 1 FROM pg_prepared_statements WHERE name = %s", (name,))
+    if cur.fetchone() is None:
+        cur.execute(f"PREPARE {name} AS {parameterized(qnum)}")
+    cur.close()
+    return name
+
+def prepared_statement(conn, sql):
+    # Etiketli literal SQL -> "EXECUTE tpch_qN (...)"; etiket yoksa SQL aynen döner
+    qnum, params = parse_tag(sql)
+    if qnum is None:
+        return sql
+    try:
+        name = prepare(conn, qnum)
+        cur = conn.cursor()
+        statement = cur.mogrify(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params).decode()
+        cur.close()
+        return statement
+    except Exception as e:
+        print(f"\n   ⚠️ PREPARE hatası (Q{qnum}): {e}")
+        return sql
+
+# --- İş yükü meta bilgisi ---
+
+def template_tables(qnum):
+    # Tırnak içi metinler ('%Customer%Complaints%' gibi) tablo sayılmaz
+    text = re.sub(r"'[^']*'", "''", load_template(qnum).lower())
+    return [t for t in TPCH_TABLES if re.search(rf"\b{t}\b", text)]
+
+def query_meta(qnum, params):
+    text = load_template(qnum).lower()
+    tables = template_tables(qnum)
+    join_count = max(len(re.findall(r"\b[a-z]+_(?:[a-z]+key)\s*=\s*[a-z0-9.]*_[a-z]+key\b", text)), len(tables) - 1)
+    if join_count >= 2:
+        label = "JOIN_HEAVY"
+    elif "group by" in text:
+        label = "AGG_HEAVY"
+    else:
+        label = "SCAN_HEAVY"
+    return {"tables": tables, "filter_range_days": 0, "join_count": join_count,
+            "query_type_label": label, "tpch_query": qnum, "params": params}
+
+def generate(qnum, rng=random):
+    params = generate_params(qnum, rng)
+    return render(qnum, params), query_meta(qnum, params)
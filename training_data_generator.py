@@ -1,140 +1,148 @@
-import psycopg2
-import time
 import os
 import csv
 import copy
+import time
+import random
+import hashlib
 from workload import WorkloadGenerator
 import config  # Config dosyasını dahil ettik
+from candidate_generator import generate_candidates, structure_candidates, save_candidates
+from executor import get_executor
+from plan_features import TPCH_TABLES, extract_plan_features, feature_columns
+from stats_cache import invalidate, refresh_if_stale
+from measurement import measure_query
+from result_cache import table_signature
+from parallel_collector import create_pool, measure_parallel
+from result_store import open_store, query_fingerprint, config_key, get_result, put_result, load_workload, append_workload, latest_contention, dml_slowdown, refresh_cost, put_build, BASE_CONFIG
+from whatif import hypopg_available, explain_cost, create_hypo_index, drop_hypo_index, reset_hypo_indexes, plan_uses_index
 
 def get_db_connection():
     try:
-        conn = psycopg2.connect(**config.get_db_config())
-        conn.autocommit = True
-        return conn
+        return get_executor().connect()
     except Exception as e:
         print(f"Bağlantı hatası: {e}")
         return None
 
-def measure_time(conn, sql):
-    try:
-        cur = conn.cursor()
-        start = time.time()
-        cur.execute(sql)
-        elapsed = (time.time() - start) * 1000
-        cur.close()
-        return elapsed
-    except:
-        return None
-
 def manage_index(conn, action, index_def):
-    name, table, col = index_def
+    # CREATE dönüşü: {"build_ms", "size_bytes"} (hata durumunda None)
+    # DDL arka uca aittir (executor.py; Postgres'te tarih aralığı bölümleme dahil)
+    name = index_def[0]
+    executor = get_executor()
+    build = None
     try:
-        cur = conn.cursor()
-        cur.execute("SET statement_timeout = 0;")
         if action == "CREATE":
             print(f"   🔨 Oluşturuluyor: {name}...", end="", flush=True)
-            cur.execute(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({col})")
-            print(" Tamam.")
+            start = time.perf_counter()
+            executor.create_index(conn, index_def)
+            build_ms = (time.perf_counter() - start) * 1000
+            size = executor.index_size(conn, index_def)
+            build = {"build_ms": build_ms, "size_bytes": size}
+            print(f" Tamam ({build_ms / 1000:.1f} sn, {size / 1024 ** 2:.1f} MB).")
         elif action == "DROP":
             print(f"   🗑️  Siliniyor: {name}...", end="", flush=True)
-            cur.execute(f"DROP INDEX IF EXISTS {name}")
+            executor.drop_index(conn, index_def)
             print(" Tamam.")
-        cur.close()
+        invalidate()
     except Exception as e:
         print(f"\n   ⚠️ Index Error: {e}")
+    return build
 
-def get_column_stats(conn, table, column):
-    try:
-        cur = conn.cursor()
-        cur.execute(f"SELECT n_distinct FROM pg_stats WHERE tablename = '{table}' AND attname = '{column}'")
-        res = cur.fetchone()
-        cur.close()
-        if res and res[0]:
-            return res[0] if res[0] > 0 else 100000 
-        return 1000
-    except: return 0
-
-def extract_features(conn, q_id, q_type, meta):
-    features = {
-        "query_id": q_id,
-        "query_type": 1 if q_type == "SELECT" else 0,
-        "table_lineitem": 1 if "lineitem" in meta["tables"] else 0,
-        "table_orders": 1 if "orders" in meta["tables"] else 0,
-        "table_customer": 1 if "customer" in meta["tables"] else 0,
-        "join_count": meta.get("join_count", 0),
-        "filter_range_width": meta.get("filter_range_days", 0),
-        "col_distinct_count": 0
-    }
-    if meta.get("tables"):
-        tbl = meta["tables"][0]
-        col = "l_shipdate" if tbl == "lineitem" else "c_mktsegment"
-        features["col_distinct_count"] = get_column_stats(conn, tbl, col)
-    return features
+def extract_features(conn, q_id, sql, candidates=None):
+    # Özellikler meta sözlüğünden değil, sorgunun EXPLAIN planından çıkarılır
+    features, _ = extract_plan_features(conn, sql, candidates)
+    if features is None:
+        return None
+    return {"query_id": q_id, **features}
 
-def main():
-    # Sayıyı config'den alıyoruz
-    target_count = config.QUERY_COUNT
-    
-    print(f"--- BATCH EĞİTİM VERİSİ TOPLAYICI ---")
-    print(f"Hedef DB: {config.DB_NAME} (SF={config.SCALE_FACTOR})")
-    print(f"Hedef Sorgu Sayısı: {target_count}")
-    
-    conn = get_db_connection()
-    if not conn: return
+def query_tables(row):
+    return [t for t in TPCH_TABLES if row.get(f"table_{t}")]
 
-    # 1. BÜYÜK İŞ YÜKÜ OLUŞTUR
-    gen = WorkloadGenerator()
-    workload = []
-    
-    print("1. İş yükü havuzu oluşturuluyor...")
-    while len(workload) < target_count:
-        batch = gen.generate_set_1() + gen.generate_set_2()
-        workload.extend(batch)
-    
-    workload = workload[:target_count]
-    
-    data_rows = []
+def run_measurements(conn, pool, tasks, on_result=None):
+    # tasks: [(anahtar, sql, [tablolar], limit_ms), ...] -> {anahtar: ölçüm sonucu}
+    # on_result(anahtar, sonuç) her ölçüm biter bitmez çağrılır (checkpoint)
+    if pool:
+        return measure_parallel(pool, tasks, on_result)
 
-    # 2. BASELINE ÖLÇÜMLERİ
-    print("\n2. İndekssiz (Base) süreler ölçülüyor...")
-    for i, (q_type, sql, meta) in enumerate(workload):
-        print(f"   [{i+1}/{target_count}] Base ölçüm...", end="\r")
-        base_time = measure_time(conn, sql)
-        
-        if base_time is None: continue
+    results = {}
+    for n, (key, sql, tables, limit_ms) in enumerate(tasks):
+        print(f"   [{n+1}/{len(tasks)}] ölçülüyor...", end="\r")
+        results[key] = measure_query(conn, sql, tables, limit_ms=limit_ms)
+        if on_result and results[key] is not None:
+            on_result(key, results[key])
+    return results
 
-        row = extract_features(conn, i, q_type, meta)
-        row["base_time"] = base_time
-        row["_sql"] = sql 
-        
-        for idx in config.CANDIDATE_INDEXES:
+def latency_ratio(result, base_time):
+    # İndeksli / base süre oranı (regresyon hedefi). Eşikle kesilen koşunun gerçek
+    # süresi bilinmez: ölçülebilir kazanç yok sayılır (oran 1)
+    if not result or result.get("timed_out") or not base_time:
+        return 1.0
+    return result["median"] / base_time
+
+def checkpoint(store, rows, cfg, mode):
+    # Ölçüm sonucunu anında depoya yazan geri çağırma fonksiyonu üretir
+    def on_result(i, result):
+        put_result(store, rows[i]["_fp"], cfg, mode, result)
+    return on_result
+
+def base_rows(conn, workload, candidates):
+    rows = []
+    for i, (q_type, sql, meta) in enumerate(workload):
+        row = extract_features(conn, i, sql, candidates)
+        if row is None: continue
+        row["_sql"] = sql
+        row["_fp"] = query_fingerprint(sql)
+        for idx in candidates:
             row[f"label_{idx[0]}"] = 0
-            
+            row[f"ratio_{idx[0]}"] = 1.0
+        rows.append(row)
+    return rows
+
+def collect_physical(conn, workload, candidates, store, pool=None):
+    refresh_if_stale(conn)
+    rows = base_rows(conn, workload, candidates)
+
+    # 2. BASELINE ÖLÇÜMLERİ (depoda olanlar atlanır)
+    print("\n2. İndekssiz (Base) süreler ölçülüyor...")
+    base = {i: get_result(store, row["_fp"], BASE_CONFIG, "physical") for i, row in enumerate(rows)}
+    pending = [(i, row["_sql"], query_tables(row), None) for i, row in enumerate(rows) if base[i] is None]
+    print(f"   💾 Depodan: {len(rows) - len(pending)} | Ölçülecek: {len(pending)}")
+    base.update(run_measurements(conn, pool, pending, checkpoint(store, rows, BASE_CONFIG, "physical")))
+
+    data_rows = []
+    for i, row in enumerate(rows):
+        if base.get(i) is None: continue
+        row["base_time"] = base[i]["median"]
+        row["base_p95"] = base[i]["p95"]
         data_rows.append(row)
     
     print(f"\n   ✅ {len(data_rows)} geçerli sorgu için base süreler alındı.")
 
     # 3. TOPLU İNDEKS TESTİ
-    for idx_def in config.CANDIDATE_INDEXES:
+    for idx_def in candidates:
         idx_name = idx_def[0]
+        cfg = config_key(idx_def)
         print(f"\n3. Test Ediliyor: {idx_name}")
-        
-        manage_index(conn, "CREATE", idx_def)
-        
-        improvement_count = 0
-        for i, row in enumerate(data_rows):
-            print(f"   -> Sorgu {i+1}/{len(data_rows)} deneniyor...", end="\r")
-            
-            target_table = idx_def[1]
-            tables_in_query = []
-            if row["table_lineitem"]: tables_in_query.append("lineitem")
-            if row["table_orders"]: tables_in_query.append("orders")
-            if row["table_customer"]: tables_in_query.append("customer")
-            
-            if target_table not in tables_in_query:
-                continue
 
-            indexed_time = measure_time(conn, row["_sql"])
+        targets = [i for i, row in enumerate(data_rows) if idx_def[1] in query_tables(row)]
+        indexed = {i: get_result(store, data_rows[i]["_fp"], cfg, "physical") for i in targets}
+        # Eşiği geçemeyecek koşular statement_timeout ile erken kesilir
+        pending = [(i, data_rows[i]["_sql"], query_tables(data_rows[i]), data_rows[i]["base_time"] * config.IMPROVEMENT_THRESHOLD)
+                   for i in targets if indexed[i] is None]
+
+        # Tüm çiftler depodaysa indeks hiç kurulmaz
+        if pending:
+            build = manage_index(conn, "CREATE", idx_def)
+            if build: put_build(store, cfg, build)
+            indexed.update(run_measurements(conn, pool, pending, checkpoint(store, data_rows, cfg, "physical")))
+            manage_index(conn, "DROP", idx_def)
+        else:
+            print("   💾 Tüm ölçümler depoda, indeks kurulmadı.")
+
+        improvement_count = 0
+        for i, result in indexed.items():
+            row = data_rows[i]
+            indexed_time = result["median"] if result else None
+            row[f"ratio_{idx_name}"] = latency_ratio(result, row["base_time"])
             
             if indexed_time:
                 # Eşik değerini de config'den alıyoruz
@@ -143,29 +151,236 @@ def main():
                     improvement_count += 1
         
         print(f"\n   ✅ {idx_name}: {improvement_count} sorguda iyileşme sağladı.")
-        
-        manage_index(conn, "DROP", idx_def)
 
-    # 4. KAYDET
-    print(f"\n4. CSV'ye Kaydediliyor: {config.DATA_FILE}")
+    return data_rows
+
+def whatif_mode(conn):
+    # Planlayıcı maliyeti veri sürümüne (ANALYZE, boyut, değişiklikler, mevcut indeksler) bağlıdır:
+    # what-if sonuçları bu sürümle anahtarlanır, yeniden yükleme/yenileme sonrası tekrar hesaplanır
+    index_config, data_version = table_signature(conn, TPCH_TABLES)
+    return "whatif:" + hashlib.sha1(f"{index_config}\n{data_version}".encode()).hexdigest()[:12]
+
+def whatif_cost(conn, store, row, cfg, mode, oid=None):
+    cached = get_result(store, row["_fp"], cfg, mode)
+    if cached is not None:
+        return cached
+    cost, plan = explain_cost(conn, row["_sql"])
+    if cost is None:
+        return None
+    result = {"cost": cost, "uses_index": oid is not None and plan_uses_index(plan, oid)}
+    put_result(store, row["_fp"], cfg, mode, result)
+    return result
+
+def collect_whatif(conn, workload, candidates, store):
+    refresh_if_stale(conn)
+    rows = base_rows(conn, workload, candidates)
+    mode = whatif_mode(conn)
+
+    # 2. BASELINE MALİYETLERİ (Sorgu çalıştırılmaz)
+    print("\n2. İndekssiz (Base) planlayıcı maliyetleri alınıyor...")
+    reset_hypo_indexes(conn)
+    data_rows = []
+    for row in rows:
+        base = whatif_cost(conn, store, row, BASE_CONFIG, mode)
+        if base is None: continue
+        row["base_time"] = None
+        row["base_cost"] = base["cost"]
+        data_rows.append(row)
+
+    print(f"   ✅ {len(data_rows)} geçerli sorgu için base maliyet alındı.")
+
+    # 3. SANAL İNDEKS TESTİ
+    for idx_def in candidates:
+        idx_name = idx_def[0]
+        cfg = config_key(idx_def)
+        targets = [row for row in data_rows if idx_def[1] in query_tables(row)]
+        # Sanal indeks yalnızca depoda eksik çift varsa oluşturulur
+        oid = None
+        if any(get_result(store, row["_fp"], cfg, mode) is None for row in targets):
+            oid = create_hypo_index(conn, idx_def)
+            if oid is None:
+                # Sanal karşılığı olmayan yapı (bölümleme) / HypoPG hatası: tahmin yok, hedef
+                # ölçülmemiş (NaN) kalır; yalnızca doğrulama örneklemindeki ölçümler etiket olur
+                for row in targets:
+                    row[f"label_{idx_name}"] = None
+                    row[f"ratio_{idx_name}"] = None
+                print(f"   🧪 {idx_name} (sanal): desteklenmiyor, yalnızca fiziksel doğrulama.")
+                continue
+
+        improvement_count = 0
+        for row in targets:
+            # Planlayıcı maliyet oranı süre oranı değildir: ratio_ yalnızca fiziksel doğrulamada
+            # yazılır, doğrulanmayan satırlarda ölçülmemiş (NaN) kalır
+            row[f"ratio_{idx_name}"] = None
+            result = whatif_cost(conn, store, row, cfg, mode, oid)
+            # Planlayıcı indeksi seçmiyorsa maliyet farkı gürültüdür
+            if result is not None and result["uses_index"]:
+                if result["cost"] < (row["base_cost"] * config.IMPROVEMENT_THRESHOLD):
+                    row[f"label_{idx_name}"] = 1
+                    improvement_count += 1
+
+        if oid is not None:
+            drop_hypo_index(conn, oid)
+        print(f"   🧪 {idx_name} (sanal): {improvement_count} sorguda iyileşme tahmini.")
+
+    # 4. FİZİKSEL DOĞRULAMA (Küçük örneklem)
+    sample = random.sample(data_rows, min(config.WHATIF_VERIFY_SAMPLE, len(data_rows)))
+    if sample:
+        verify_sample(conn, sample, candidates, store)
+
+    return data_rows
+
+def verify_sample(conn, sample, candidates, store):
+    print(f"\n4. Doğrulama: {len(sample)} sorgu fiziksel olarak ölçülüyor...")
+    for row in sample:
+        base = get_result(store, row["_fp"], BASE_CONFIG, "physical")
+        if base is None:
+            base = measure_query(conn, row["_sql"], query_tables(row))
+            if base: put_result(store, row["_fp"], BASE_CONFIG, "physical", base)
+        row["base_time"] = base["median"] if base else None
+        row["base_p95"] = base["p95"] if base else None
+
+    agree, total = 0, 0
+    for idx_def in candidates:
+        idx_name = idx_def[0]
+        cfg = config_key(idx_def)
+        targets = [r for r in sample if r["base_time"] is not None and idx_def[1] in query_tables(r)]
+        if not targets: continue
+
+        results = {id(r): get_result(store, r["_fp"], cfg, "physical") for r in targets}
+        missing = [r for r in targets if results[id(r)] is None]
+        if missing:
+            build = manage_index(conn, "CREATE", idx_def)
+            if build: put_build(store, cfg, build)
+            for row in missing:
+                limit_ms = row["base_time"] * config.IMPROVEMENT_THRESHOLD
+                result = measure_query(conn, row["_sql"], query_tables(row), limit_ms=limit_ms)
+                if result:
+                    put_result(store, row["_fp"], cfg, "physical", result)
+                results[id(row)] = result
+            manage_index(conn, "DROP", idx_def)
+
+        for row in targets:
+            result = results[id(row)]
+            if result is None: continue
+            measured = 1 if result["median"] < (row["base_time"] * config.IMPROVEMENT_THRESHOLD) else 0
+            if row[f"label_{idx_name}"] is not None:
+                total += 1
+                if measured == row[f"label_{idx_name}"]:
+                    agree += 1
+            # Ölçülen değer gerçek etikettir
+            row[f"label_{idx_name}"] = measured
+            row[f"ratio_{idx_name}"] = latency_ratio(result, row["base_time"])
+
+    if total:
+        print(f"   ✅ What-if / ölçüm uyumu: {agree}/{total} (%{agree / total * 100:.1f})")
+
+def apply_write_costs(store, data_rows, candidates):
+    # Yazma tarafı ölçümleri varsa (contention_replay.py çekişme tekrarı,
+    # refresh_functions.py RF1/RF2 süreleri): DML'i fazla yavaşlatan indeksin
+    # okuma kazancı etiketlere yansıtılmaz
+    contention = latest_contention(store)
+    base_refresh = refresh_cost(store)
+    for idx_def in candidates:
+        reasons = []
+        slowdown = dml_slowdown(contention.get(config_key(idx_def)), contention.get(BASE_CONFIG))
+        if slowdown is not None and slowdown > config.CONTENTION_MAX_DML_SLOWDOWN:
+            reasons.append(f"DML p95 x{slowdown:.2f} (çekişme)")
+        idx_refresh = refresh_cost(store, idx_def)
+        if base_refresh and idx_refresh and idx_refresh / base_refresh > config.REFRESH_MAX_SLOWDOWN:
+            reasons.append(f"RF1+RF2 x{idx_refresh / base_refresh:.2f}")
+        if not reasons: continue
+        cleared = sum(1 for row in data_rows if row[f"label_{idx_def[0]}"] == 1)
+        for row in data_rows:
+            row[f"label_{idx_def[0]}"] = 0
+            row[f"ratio_{idx_def[0]}"] = 1.0
+        print(f"   ✍️  {idx_def[0]}: {', '.join(reasons)} -> {cleared} pozitif etiket sıfırlandı.")
+
+def load_or_extend_workload(store, target_count):
+    # Depodaki iş yükü yeniden kullanılır; hedef büyüdüyse yalnızca eksik kısım üretilir
+    gen = WorkloadGenerator()
+    workload = load_workload(store)
+    if workload:
+        print(f"   💾 Depodan {len(workload)} sorgu yüklendi.")
+
+    extra = []
+    while len(workload) + len(extra) < target_count:
+        batch = gen.generate_set_1() + gen.generate_set_2()
+        extra.extend(batch)
+    extra = extra[:max(target_count - len(workload), 0)]
+    if extra:
+        append_workload(store, extra, len(workload))
+        workload += extra
+    return workload[:target_count]
+
+def main():
+    # Sayıyı config'den alıyoruz
+    target_count = config.QUERY_COUNT
+    
+    print(f"--- BATCH EĞİTİM VERİSİ TOPLAYICI ---")
+    print(f"Hedef DB: {config.DB_NAME} (SF={config.SCALE_FACTOR}, {config.BACKEND})")
+    print(f"Hedef Sorgu Sayısı: {target_count}")
+    
+    conn = get_db_connection()
+    if not conn: return
+    store = open_store()
+
+    # 1. BÜYÜK İŞ YÜKÜ OLUŞTUR (veya depodan devam et)
+    print("1. İş yükü havuzu oluşturuluyor...")
+    workload = load_or_extend_workload(store, target_count)
+
+    # Aday indeksler: iş yükünden otomatik üretilir veya config'deki sabit liste
+    executor = get_executor()
+    if config.CANDIDATE_MODE == "auto":
+        candidates = generate_candidates([sql for _, sql, _ in workload], conn)
+        if config.STRUCTURE_CANDIDATES:
+            candidates += structure_candidates([sql for _, sql, _ in workload])
+    else:
+        candidates = list(config.CANDIDATE_INDEXES)
+    # Arka ucun kuramadığı yapılar (DuckDB: INCLUDE, BRIN, kısmi indeks, bölümleme) etiket olmaz
+    skipped = [c[0] for c in candidates if not executor.supports(c)]
+    if skipped:
+        candidates = [c for c in candidates if executor.supports(c)]
+        print(f"   ⏭️  {len(skipped)} aday {executor.name} arka ucunda desteklenmiyor: {', '.join(skipped)}")
+    if config.CANDIDATE_MODE == "auto":
+        save_candidates(candidates)
+        print(f"   🧩 {len(candidates)} aday indeks üretildi -> {config.CANDIDATES_FILE}")
+
+    if config.WHATIF_MODE and hypopg_available(conn):
+        print("   🧪 What-if modu: indeksler HypoPG ile sanal olarak test edilecek.")
+        data_rows = collect_whatif(conn, workload, candidates, store)
+    elif config.WORKER_COUNT > 1 and executor.parallel:
+        print(f"   ⚙️  Paralel mod: {config.WORKER_COUNT} işçi süreç.")
+        with create_pool() as pool:
+            data_rows = collect_physical(conn, workload, candidates, store, pool)
+    else:
+        data_rows = collect_physical(conn, workload, candidates, store)
+
+    apply_write_costs(store, data_rows, candidates)
+
+    # 5. KAYDET (CSV her zaman depodan eksiksiz yeniden üretilir)
+    print(f"\n5. CSV'ye Kaydediliyor: {config.DATA_FILE}")
     
     final_rows = []
     for r in data_rows:
         r_clean = copy.deepcopy(r)
         del r_clean["_sql"]
+        del r_clean["_fp"]
         final_rows.append(r_clean)
 
-    fieldnames = ["query_id", "query_type", "table_lineitem", "table_orders", "table_customer", 
-                  "join_count", "filter_range_width", "col_distinct_count", "base_time"]
-    for idx in config.CANDIDATE_INDEXES: fieldnames.append(f"label_{idx[0]}")
+    fieldnames = ["query_id"] + feature_columns(candidates) + ["base_time", "base_p95", "base_cost"]
+    for idx in candidates: fieldnames.append(f"label_{idx[0]}")
+    # Ölçülen indeksli/base süre oranı (model_trainer regresyon modu)
+    for idx in candidates: fieldnames.append(f"ratio_{idx[0]}")
 
     with open(config.DATA_FILE, 'w', newline='') as f:
-        writer = csv.DictWriter(f, fieldnames=fieldnames)
+        writer = csv.DictWriter(f, fieldnames=fieldnames, extrasaction="ignore")
         writer.writeheader()
         writer.writerows(final_rows)
 
+    store.close()
     conn.close()
     print("\n--- BATCH EĞİTİM SETİ TAMAMLANDI ---")
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,79 @@
+# --- WHAT-IF (HİPOTETİK) İNDEKS YARDIMCILARI ---
+# HypoPG eklentisi ile indeksleri diske yazmadan planlayıcıya tanıtır,
+# sorguları yalnızca EXPLAIN (çalıştırmadan) ile maliyetlendirir.
+
+from candidate_generator import index_ddl, index_method
+from executor import get_executor
+
+def hypopg_available(conn):
+    if not get_executor().whatif:
+        print(f"   ⚠️ HypoPG kullanılamıyor: {get_executor().name} arka ucunda yok")
+        return False
+    try:
+        cur = conn.cursor()
+        cur.execute("CREATE EXTENSION IF NOT EXISTS hypopg;")
+        cur.close()
+        return True
+    except Exception as e:
+        print(f"   ⚠️ HypoPG kullanılamıyor: {e}")
+        return False
+
+def explain_cost(conn, sql):
+    # ANALYZE yok: sorgu çalıştırılmaz, sadece planlayıcı maliyeti alınır
+    try:
+        plan = get_executor().explain(conn, sql)
+        return plan.get("Total Cost"), plan
+    except Exception as e:
+        print(f"\n   ⚠️ EXPLAIN Error: {e}")
+        return None, None
+
+def create_hypo_index(conn, index_def):
+    name = index_def[0]
+    if index_method(index_def) == "partition":
+        # HypoPG sanal bölümleme desteklemez: yalnızca fiziksel ölçümle değerlendirilir
+        return None
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT indexrelid FROM hypopg_create_index(%s)", (index_ddl(index_def, with_name=False),))
+        oid = cur.fetchone()[0]
+        cur.close()
+        return oid
+    except Exception as e:
+        print(f"\n   ⚠️ Hypo Index Error ({name}): {e}")
+        return None
+
+def drop_hypo_index(conn, oid):
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT hypopg_drop_index(%s)", (oid,))
+        cur.close()
+    except Exception as e:
+        print(f"\n   ⚠️ Hypo Drop Error: {e}")
+
+def reset_hypo_indexes(conn):
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT hypopg_reset()")
+        cur.close()
+    except Exception:
+        pass
+
+def plan_uses_index(plan, oid):
+    # HypoPG indeks isimleri "<oid>btree_tablo_kolon" biçimindedir
+    if plan is None:
+        return False
+    if f"<{oid}>" in str(plan.get("Index Name", "")):
+        return True
+    return any(plan_uses_index(child, oid) for child in plan.get("Plans", []))
+
+def hypo_index_size(conn, oid):
+    # HypoPG'nin tahmini indeks boyutu (byte)
+    try:
+        cur = conn.cursor()
+        cur.execute("SELECT hypopg_relation_size(%s)", (oid,))
+        size = cur.fetchone()[0]
+        cur.close()
+        return size or 0
+    except Exception as e:
+        print(f"\n   ⚠️ Hypo Size Error: {e}")
+        return 0
@@ -1,5 +1,7 @@
 import random
 from datetime import date, timedelta
+import config
+import tpch_queries
 
 class WorkloadGenerator:
     def __init__(self):
@@ -41,6 +43,16 @@ class WorkloadGenerator:
         meta = {"tables": ["lineitem"], "filter_range_days": 0, "join_count": 0, "query_type_label": "DML"}
         return sql.strip(), meta
 
+    def generate_tpch(self, qnum):
+        # dbgen/queries şablonu + qgen dağılımlarıyla parametre (Q1..Q22)
+        return tpch_queries.generate(qnum)
+
+    def generate_tpch_stream(self):
+        # 22 sorgunun hepsi, karışık sırada (TPC-H sorgu akışı gibi)
+        order = list(range(1, tpch_queries.QUERY_COUNT + 1))
+        random.shuffle(order)
+        return [("SELECT", *self.generate_tpch(q)) for q in order]
+
     def generate_set_1(self):
         workload = []
         for _ in range(5): workload.append(("SELECT", *self._get_random_select()))
@@ -57,6 +69,8 @@ class WorkloadGenerator:
         return [("UPDATE", *self._get_random_dml()) for _ in range(3)]
 
     def _get_random_select(self):
+        if config.WORKLOAD_MIX == "tpch22":
+            return self.generate_tpch(random.randint(1, tpch_queries.QUERY_COUNT))
         dice = random.random()
         if dice < 0.33: return self.generate_q6()
         elif dice < 0.66: return self.generate_q1()
@@ -0,0 +1,169 @@
+import re
+import json
+import argparse
+import config
+from workload import WorkloadGenerator
+from candidate_generator import generate_candidates, index_columns, index_include, index_ddl
+from plan_features import get_plan, walk_plan
+from stats_cache import refresh_if_stale, get_reltuples
+from executor import get_executor, postgres_only
+from whatif import hypopg_available, explain_cost, create_hypo_index, reset_hypo_indexes, hypo_index_size
+
+# --- İŞ YÜKÜ SEVİYESİ İNDEKS SEÇİCİ ---
+# Tek sorgu için eşik geçen her indeksi eklemek yerine, ağırlıklı iş yükünün
+# toplam maliyetini (SELECT planlayıcı maliyeti + DML indeks bakım maliyeti)
+# disk bütçesi altında en aza indiren indeks kümesi açgözlü (fayda/MB) seçilir.
+# Maliyetler HypoPG ile sanal konfigürasyonlar üzerinden alınır, böylece
+# indekslerin birbirini gereksiz kılması (etkileşim) da hesaba katılır.
+
+DML_PATTERN = re.compile(r"^\s*(UPDATE|INSERT|DELETE)\s", re.I)
+UPDATE_SET_PATTERN = re.compile(r"\bSET\s+(.*?)\s+WHERE\b", re.I | re.S)
+
+def get_connection():
+    try:
+        return get_executor().connect()
+    except Exception as e:
+        print(f"Bağlantı hatası: {e}")
+        return None
+
+def read_workload(path):
+    # JSONL: her satır {"sql": ..., "weight": ...}
+    workload = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.strip():
+                item = json.loads(line)
+                workload.append((float(item.get("weight", 1.0)), item["sql"]))
+    return workload
+
+def generated_workload():
+    gen = WorkloadGenerator()
+    return [(1.0, sql) for _, sql, _ in gen.generate_set_1()]
+
+def dml_rows(conn, sql):
+    # DML'in etkileyeceği tahmini satır sayısı ve tablo (ModifyTable altındaki tarama)
+    plan = get_plan(conn, sql)
+    if plan is None:
+        return None, 0
+    for node, _ in walk_plan(plan):
+        if node.get("Node Type") == "ModifyTable":
+            children = node.get("Plans", [])
+            return node.get("Relation Name"), children[0].get("Plan Rows", 0) if children else 1
+    return None, 0
+
+def maintenance_cost(index_def, dml_info):
+    # Her DML satırı için indeks başına sabit bir bakım maliyeti (planlayıcı birimi).
+    # UPDATE yalnızca SET kolonlarını içeren indeksleri etkiler (aksi halde HOT güncelleme mümkündür).
+    table, cols = index_def[1], index_columns(index_def) + index_include(index_def)
+    cost = 0.0
+    for weight, kind, dml_table, rows, set_cols in dml_info:
+        if dml_table != table: continue
+        if kind == "UPDATE" and not set(cols) & set(set_cols): continue
+        cost += weight * rows * config.INDEX_MAINTENANCE_COST_PER_ROW
+    return cost
+
+def workload_cost(conn, selects, index_set):
+    # Verilen sanal indeks kümesi aktifken SELECT'lerin ağırlıklı planlayıcı maliyeti
+    reset_hypo_indexes(conn)
+    for idx in index_set:
+        create_hypo_index(conn, idx)
+    total = 0.0
+    for weight, sql in selects:
+        cost, _ = explain_cost(conn, sql)
+        total += weight * (cost or 0)
+    return total
+
+def select_indexes(conn, workload, candidates, budget_bytes):
+    selects, dml_info = [], []
+    for weight, sql in workload:
+        match = DML_PATTERN.match(sql)
+        if match:
+            table, rows = dml_rows(conn, sql)
+            set_match = UPDATE_SET_PATTERN.search(sql)
+            set_cols = re.findall(r"(\w+)\s*=", set_match.group(1)) if set_match else []
+            dml_info.append((weight, match.group(1).upper(), table, rows, set_cols))
+        else:
+            selects.append((weight, sql))
+
+    # Aday boyutları (tek tek sanal olarak kurularak)
+    sizes = {}
+    for idx in candidates:
+        reset_hypo_indexes(conn)
+        oid = create_hypo_index(conn, idx)
+        sizes[idx] = hypo_index_size(conn, oid) if oid else 0
+
+    chosen, used = [], 0
+    current = workload_cost(conn, selects, chosen)
+    base_cost = current
+    report = []
+
+    while True:
+        best = None
+        for idx in candidates:
+            if idx in chosen or used + sizes[idx] > budget_bytes: continue
+            select_cost = workload_cost(conn, selects, chosen + [idx])
+            benefit = current - select_cost - maintenance_cost(idx, dml_info)
+            if benefit <= 0: continue
+            # Açgözlü sırt çantası: MB başına net fayda
+            score = benefit / max(sizes[idx] / 1024 ** 2, 1.0)
+            if best is None or score > best[0]:
+                best = (score, idx, benefit, select_cost)
+        if best is None: break
+
+        _, idx, benefit, select_cost = best
+        chosen.append(idx)
+        used += sizes[idx]
+        current = select_cost
+        report.append({
+            # Tam tanım (INCLUDE, yöntem, kısmi predikat dahil) ve yeniden kurulabilir DDL
+            "index": idx[0], "table": idx[1], "column": idx[2], "definition": list(idx), "ddl": index_ddl(idx),
+            "benefit": benefit,
+            "maintenance_cost": maintenance_cost(idx, dml_info),
+            "size_mb": sizes[idx] / 1024 ** 2,
+            "build_time_s": estimate_build_time(conn, idx, sizes[idx])
+        })
+
+    reset_hypo_indexes(conn)
+    return report, base_cost
+
+def estimate_build_time(conn, index_def, size_bytes):
+    # Kaba tahmin: tablo okuma + sıralama + indeks yazma hızları config'den
+    rows = get_reltuples(conn, index_def[1])
+    return rows / config.INDEX_BUILD_ROWS_PER_SEC + size_bytes / (config.INDEX_BUILD_MB_PER_SEC * 1024 ** 2)
+
+def main():
+    parser = argparse.ArgumentParser(description="İş yükü seviyesi indeks seçici")
+    parser.add_argument("--workload", help="JSONL iş yükü ({\"sql\", \"weight\"}); verilmezse Set 1 üretilir")
+    parser.add_argument("--budget-mb", type=float, default=config.ADVISOR_DISK_BUDGET_MB)
+    args = parser.parse_args()
+
+    print(f"--- İŞ YÜKÜ İNDEKS DANIŞMANI (SF={config.SCALE_FACTOR}) ---")
+    if not postgres_only("İş yükü danışmanı (HypoPG)"): return
+    conn = get_connection()
+    if not conn: return
+    if not hypopg_available(conn):
+        print("Hata: Danışman sanal konfigürasyonlar için HypoPG gerektirir.")
+        return
+
+    workload = read_workload(args.workload) if args.workload else generated_workload()
+    print(f"İş yükü: {len(workload)} ifade | Disk bütçesi: {args.budget_mb:.0f} MB")
+
+    refresh_if_stale(conn)
+    # Adaylar iş yükünün kendisinden üretilir (çok kolonlu / kapsayan indeksler dahil)
+    candidates = generate_candidates([sql for _, sql in workload], conn) if config.CANDIDATE_MODE == "auto" else config.CANDIDATE_INDEXES
+    report, base_cost = select_indexes(conn, workload, candidates, args.budget_mb * 1024 ** 2)
+    conn.close()
+
+    if not report:
+        print("❌ Öneri Yok (Bütçe içinde net fayda sağlayan indeks yok).")
+        return
+
+    total_benefit = sum(r["benefit"] for r in report)
+    print(f"\n✅ Seçilen indeksler (toplam net fayda: %{total_benefit / max(base_cost, 1) * 100:.1f}):")
+    for r in report:
+        print(f"   -> {r['index']} ({r['table']}.{r['column']}): fayda={r['benefit']:.0f} "
+              f"bakım={r['maintenance_cost']:.0f} boyut={r['size_mb']:.1f} MB kurulum≈{r['build_time_s']:.0f}s")
+        print(f"      {r['ddl']};")
+
+if __name__ == "__main__":
+    main()